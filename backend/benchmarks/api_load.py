@@ -0,0 +1,230 @@
+"""Load and latency benchmark for every /api route
+
+Drives concurrent requests against the FastAPI app in-process (httpx's ASGI
+transport, no sockets) backed by mongomock-motor or a real mongod, and
+reports p50/p95/p99 latency, throughput and per-request allocation.
+
+Usage:
+    python benchmarks/api_load.py run --requests 2000 --concurrency 50
+    python benchmarks/api_load.py run --mongo-url mongodb://localhost:27017
+    python benchmarks/api_load.py compare benchmarks/baselines/a.json benchmarks/baselines/b.json
+"""
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+import typer
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+sys.path.insert(0, str(BACKEND_DIR))
+
+CONTACT_PAYLOAD = {
+    "name": "Load Test",
+    "email": "load.test@example.com",
+    "company": "Benchmark Inc",
+    "subject": "Benchmark",
+    "message": "Synthetic message generated by the load benchmark.",
+}
+
+# Browser user agents the requests rotate through; httpx's default one is classified as a bot
+# and would be filtered out before the ingest path
+BROWSER_AGENTS = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_2) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+    "Version/17.2 Mobile/15E148 Safari/604.1",
+)
+
+# name -> (method, path, request kwargs)
+ROUTES = {
+    "root": ("GET", "/api/", {}),
+    "track_view": ("POST", "/api/track-view", {}),
+    "contact": ("POST", "/api/contact", {"json": CONTACT_PAYLOAD}),
+    "download_resume": ("GET", "/api/download-resume", {}),
+    "analytics": ("GET", "/api/analytics", {}),
+}
+
+cli = typer.Typer(help="Latency/throughput benchmark for the portfolio API")
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def drive(client, method, path, kwargs, total, concurrency):
+    """Fire total requests with at most concurrency in flight; return latencies and error count"""
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for number in remaining:
+            headers = {"User-Agent": BROWSER_AGENTS[number % len(BROWSER_AGENTS)]}
+            started = time.perf_counter()
+            response = await client.request(method, path, headers=headers, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def allocation_per_request(client, method, path, kwargs, samples):
+    """Mean peak Python allocation of a single request, measured sequentially under tracemalloc"""
+    tracemalloc.start()
+    try:
+        peaks = []
+        for _ in range(samples):
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            await client.request(method, path, **kwargs)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return sum(peaks) / len(peaks) if peaks else 0
+
+
+async def benchmark(routes, total, concurrency, warmup, alloc_samples, mongo_url):
+    import httpx
+    import server
+
+    if mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        mongo = AsyncIOMotorClient(mongo_url)
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        mongo = AsyncMongoMockClient()
+    server.client = mongo
+    server.db = mongo["portfolio_benchmark"]
+
+    results = {}
+    transport = httpx.ASGITransport(app=server.app, client=("203.0.113.10", 40000))
+    async with server.app.router.lifespan_context(server.app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark", headers={"User-Agent": BROWSER_AGENTS[0]}
+        ) as client:
+            for name in routes:
+                method, path, kwargs = ROUTES[name]
+                await drive(client, method, path, kwargs, warmup, 1)
+                latencies, errors, elapsed = await drive(client, method, path, kwargs, total, concurrency)
+                latencies.sort()
+                results[name] = {
+                    "method": method,
+                    "path": path,
+                    "requests": total,
+                    "errors": errors,
+                    "rps": round(total / elapsed, 1),
+                    "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+                    "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+                    "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+                    "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+                    "alloc_bytes_per_request": round(
+                        await allocation_per_request(client, method, path, kwargs, alloc_samples)
+                    ),
+                }
+                typer.echo(
+                    f"{name:<16} {results[name]['rps']:>9} rps  p50 {results[name]['p50_ms']:>8} ms  "
+                    f"p95 {results[name]['p95_ms']:>8} ms  p99 {results[name]['p99_ms']:>8} ms  "
+                    f"{results[name]['alloc_bytes_per_request']:>9} B/req  errors {errors}"
+                )
+    if mongo_url:
+        await mongo.drop_database("portfolio_benchmark")
+    return results
+
+
+@cli.command()
+def run(
+    requests: int = typer.Option(1000, help="Requests per route"),
+    concurrency: int = typer.Option(50, help="Requests in flight per route"),
+    warmup: int = typer.Option(20, help="Unmeasured requests per route before timing"),
+    alloc_samples: int = typer.Option(50, help="Sequential requests sampled for allocation"),
+    route: Optional[List[str]] = typer.Option(None, help=f"Routes to run (default all): {', '.join(ROUTES)}"),
+    mongo_url: Optional[str] = typer.Option(None, help="Real mongod to use instead of mongomock-motor"),
+    output: Optional[Path] = typer.Option(None, help="Baseline JSON to write (default baselines/<commit>.json)"),
+):
+    """Benchmark the API and save the results as a baseline"""
+    routes = route or list(ROUTES)
+    unknown = set(routes) - set(ROUTES)
+    if unknown:
+        raise typer.BadParameter(f"Unknown routes: {', '.join(sorted(unknown))}")
+    os.environ.setdefault("RESUME_CACHE_DIR", str(BASELINE_DIR.parent / ".cache" / "resume"))
+    # Every benchmark request comes from one address; measure the handlers, not the limiter
+    for name in ("RATE_LIMIT_CONTACT", "RATE_LIMIT_TRACK_VIEW", "RATE_LIMIT_DOWNLOAD"):
+        os.environ.setdefault(name, "off")
+    # ...nor view dedup, which would drop all but the first view per user agent
+    os.environ.setdefault("VIEW_DEDUP_WINDOW", "0")
+    results = asyncio.run(benchmark(routes, requests, concurrency, warmup, alloc_samples, mongo_url))
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mongo": "mongod" if mongo_url else "mongomock-motor",
+            "requests": requests,
+            "concurrency": concurrency,
+        },
+        "routes": results,
+    }
+    output = output or BASELINE_DIR / f"{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    typer.echo(f"Saved baseline to {output}")
+
+
+@cli.command()
+def compare(
+    baseline: Path,
+    candidate: Path,
+    metric: str = typer.Option("p95_ms", help="Latency metric used for the regression check"),
+    threshold: float = typer.Option(20.0, help="Fail when the metric regresses by more than this percentage"),
+):
+    """Diff two baselines and exit non-zero on a latency regression"""
+    before = json.loads(baseline.read_text())["routes"]
+    after = json.loads(candidate.read_text())["routes"]
+    regressed = []
+    typer.echo(f"{'route':<16} {'rps':>18} {metric:>22} {'B/req':>20}")
+    for name in sorted(set(before) & set(after)):
+        old, new = before[name], after[name]
+        change = (new[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+        if change > threshold:
+            regressed.append(name)
+        typer.echo(
+            f"{name:<16} {old['rps']:>8} -> {new['rps']:<8} {old[metric]:>9} -> {new[metric]:<9}({change:+.1f}%) "
+            f"{old['alloc_bytes_per_request']:>8} -> {new['alloc_bytes_per_request']:<8}"
+        )
+    if regressed:
+        typer.echo(f"{metric} regressed by more than {threshold}% on: {', '.join(regressed)}")
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,95 @@
+"""Micro-benchmark of GeoIP enrichment on the ingest path
+
+Builds a synthetic range database (the same fixture the tests use) in a
+temporary directory, then measures CPU per lookup for addresses never seen
+before (a bisect of the memory-mapped file) and for a hot set of repeat
+visitors (served by the LRU). Nothing touches the network or Mongo.
+
+Usage:
+    python benchmarks/geoip.py run --ranges 500000 --lookups 200000 --output geoip.json
+    python benchmarks/geoip.py compare before.json after.json --threshold 20
+"""
+import ipaddress
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+import typer
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+cli = typer.Typer(help="GeoIP enrichment micro-benchmark")
+
+
+def cpu_per_call_us(fn, addresses):
+    started = time.process_time()
+    for address in addresses:
+        fn(address)
+    return (time.process_time() - started) / len(addresses) * 1e6
+
+
+@cli.command()
+def run(
+    ranges: int = typer.Option(500000, help="Ranges in the synthetic database"),
+    lookups: int = typer.Option(200000, help="Lookups per measurement"),
+    hot_set: int = typer.Option(1000, help="Distinct addresses in the repeat-visitor measurement"),
+    output: Optional[Path] = typer.Option(None, help="Write results to this JSON file"),
+):
+    """Measure CPU per lookup, cold (database) and warm (LRU)"""
+    from geoip import GeoIPEnricher, RangeDatabase, build_range_database, fixture_ranges
+
+    rng = random.Random(1)
+    v4 = [str(ipaddress.IPv4Address(rng.getrandbits(32))) for _ in range(lookups)]
+    v6 = [str(ipaddress.IPv6Address((0x2400 << 112) | rng.getrandbits(100))) for _ in range(lookups // 10)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "geoip.bin"
+        started = time.perf_counter()
+        build_range_database(fixture_ranges(ranges), path)
+        build_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        database = RangeDatabase(path)
+        open_us = (time.perf_counter() - started) * 1e6
+        enricher = GeoIPEnricher(database, max_entries=hot_set)
+        hot = [v4[i % hot_set] for i in range(lookups)]
+        report = {
+            "ranges": ranges,
+            "database_bytes": path.stat().st_size,
+            "build_seconds": round(build_seconds, 2),
+            "open_us": round(open_us, 1),
+            "ipv4_cold_us": round(cpu_per_call_us(database.lookup, v4), 2),
+            "ipv6_cold_us": round(cpu_per_call_us(database.lookup, v6), 2),
+            "cached_us": round(cpu_per_call_us(enricher.lookup, hot), 2),
+        }
+        database.close()
+    for name, value in report.items():
+        typer.echo(f"{name:<16} {value}")
+    if output:
+        output.write_text(json.dumps(report, indent=2) + "\n")
+
+
+@cli.command()
+def compare(
+    baseline: Path,
+    candidate: Path,
+    threshold: float = typer.Option(20.0, help="Fail when a lookup gets slower by more than this percentage"),
+):
+    """Diff two GeoIP reports and exit non-zero on a regression"""
+    before = json.loads(baseline.read_text())
+    after = json.loads(candidate.read_text())
+    failed = False
+    for name in ("ipv4_cold_us", "ipv6_cold_us", "cached_us"):
+        old, new = before[name], after[name]
+        change = (new - old) / old * 100 if old else 0.0
+        typer.echo(f"{name:<16} {old:>8} us -> {new:<8} us ({change:+.1f}%)")
+        failed = failed or change > threshold
+    if failed:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,128 @@
+"""Micro-benchmark of response serialization on the contact create and list paths
+
+Compares, per request and in CPU time, the previous path (validate into
+ContactMessage models, FastAPI's response_model validation and
+jsonable_encoder, stdlib json via JSONResponse) with the current one
+(model_construct + a single model_dump on create, raw documents on list,
+orjson via ORJSONResponse). Nothing touches the network or Mongo.
+
+Usage:
+    python benchmarks/serialization.py run --iterations 2000 --items 100 --output serialization.json
+    python benchmarks/serialization.py compare before.json after.json --threshold 20
+"""
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+import typer
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+cli = typer.Typer(help="Response serialization micro-benchmark")
+
+CONTACT_PAYLOAD = {
+    "name": "Serialization Benchmark",
+    "email": "bench@example.com",
+    "company": "Benchmark Inc",
+    "subject": "Benchmark",
+    "message": "Synthetic message generated by the serialization benchmark.",
+}
+
+
+def cpu_per_call_us(fn, iterations):
+    fn()  # warm caches (validators, encoders) outside the measurement
+    started = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - started) / iterations * 1e6
+
+
+def build_paths(items):
+    from fastapi._compat import ModelField
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from fastapi.utils import create_response_field
+    from pydantic import TypeAdapter
+
+    from models import ContactMessage, ContactMessageCreate
+
+    contact_field = create_response_field(name="response", type_=ContactMessage)
+    documents = [ContactMessage(**CONTACT_PAYLOAD).model_dump() for _ in range(items)]
+    list_adapter = TypeAdapter(list[ContactMessage])
+
+    def serialize(field: ModelField, value):
+        # What FastAPI does with a response_model: validate, then dump to JSON-able data
+        validated, errors = field.validate(value, {}, loc=("response",))
+        if errors:
+            raise ValueError(errors)
+        return field.serialize(validated, mode="json", by_alias=True)
+
+    def create_before():
+        data = ContactMessageCreate(**CONTACT_PAYLOAD)
+        message = ContactMessage(**data.model_dump())
+        message.model_dump()  # inserted document
+        return JSONResponse(jsonable_encoder(serialize(contact_field, message))).body
+
+    def create_after():
+        data = ContactMessageCreate(**CONTACT_PAYLOAD)
+        body = ContactMessage.model_construct(**data.model_dump()).model_dump()
+        return ORJSONResponse(body).body
+
+    def list_before():
+        messages = [ContactMessage(**document) for document in documents]
+        return JSONResponse(jsonable_encoder(list_adapter.dump_python(messages, mode="json"))).body
+
+    def list_after():
+        return ORJSONResponse({"items": documents, "next_cursor": None}).body
+
+    return {
+        "create": (create_before, create_after),
+        "list": (list_before, list_after),
+    }
+
+
+@cli.command()
+def run(
+    iterations: int = typer.Option(2000, help="Calls per path"),
+    items: int = typer.Option(100, help="Documents per list response"),
+    output: Optional[Path] = typer.Option(None, help="Write results to this JSON file"),
+):
+    """Measure CPU per request for the old and new serialization paths"""
+    report = {}
+    for name, (before, after) in build_paths(items).items():
+        old, new = cpu_per_call_us(before, iterations), cpu_per_call_us(after, iterations)
+        report[name] = {
+            "before_us": round(old, 1),
+            "after_us": round(new, 1),
+            "saved_us": round(old - new, 1),
+            "speedup": round(old / new, 2) if new else None,
+        }
+        typer.echo(f"{name:<8} {old:>9.1f} us -> {new:>8.1f} us per request ({old / new:.1f}x)")
+    if output:
+        output.write_text(json.dumps(report, indent=2) + "\n")
+
+
+@cli.command()
+def compare(
+    baseline: Path,
+    candidate: Path,
+    threshold: float = typer.Option(20.0, help="Fail when a current path gets slower by more than this percentage"),
+):
+    """Diff two serialization reports and exit non-zero on a regression"""
+    before = json.loads(baseline.read_text())
+    after = json.loads(candidate.read_text())
+    failed = False
+    for name in before:
+        old, new = before[name]["after_us"], after[name]["after_us"]
+        change = (new - old) / old * 100 if old else 0.0
+        typer.echo(f"{name:<8} {old:>9} us -> {new:<9} us ({change:+.1f}%)")
+        failed = failed or change > threshold
+    if failed:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,134 @@
+"""Cold-start benchmark: import time of server.py and time-to-first-200 on /api/
+
+Each sample runs in a fresh interpreter so nothing is warm. Import time is
+the cumulative figure reported by ``python -X importtime`` for the server
+module; time-to-first-200 is measured from spawning uvicorn until GET /api/
+first answers 200.
+
+Usage:
+    python benchmarks/startup.py run --samples 5 --output startup.json
+    python benchmarks/startup.py compare before.json after.json --threshold 20
+"""
+import json
+import os
+import platform
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import typer
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+cli = typer.Typer(help="Cold-start benchmark for the portfolio API")
+
+
+def _env():
+    env = dict(os.environ)
+    # The app does not connect to Mongo until a request needs it
+    env.setdefault("MONGO_URL", "mongodb://127.0.0.1:27017")
+    env.setdefault("DB_NAME", "portfolio_startup_benchmark")
+    return env
+
+
+def import_time_ms():
+    """Cumulative import time of the server module in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True, check=True,
+    )
+    match = re.search(r"^import time:\s+\d+ \|\s+(\d+) \| server$", result.stderr, re.MULTILINE)
+    return int(match.group(1)) / 1000 if match else float("nan")
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_200_ms(timeout=30.0):
+    """Spawn uvicorn and poll /api/ until the first 200"""
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/", timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except (urllib.error.URLError, ConnectionError, OSError):
+                pass
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+            time.sleep(0.005)
+        raise RuntimeError(f"/api/ did not answer 200 within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def summarize(samples):
+    return {
+        "median_ms": round(statistics.median(samples), 1),
+        "min_ms": round(min(samples), 1),
+        "max_ms": round(max(samples), 1),
+        "samples": [round(sample, 1) for sample in samples],
+    }
+
+
+@cli.command()
+def run(
+    samples: int = typer.Option(5, help="Fresh-process samples per measurement"),
+    output: Optional[Path] = typer.Option(None, help="Write results to this JSON file"),
+):
+    """Measure import time and time-to-first-200"""
+    imports = [import_time_ms() for _ in range(samples)]
+    first_200 = [time_to_first_200_ms() for _ in range(samples)]
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "import_server": summarize(imports),
+        "time_to_first_200": summarize(first_200),
+    }
+    typer.echo(json.dumps(report, indent=2))
+    if output:
+        output.write_text(json.dumps(report, indent=2) + "\n")
+
+
+@cli.command()
+def compare(
+    baseline: Path,
+    candidate: Path,
+    threshold: float = typer.Option(20.0, help="Fail when a median regresses by more than this percentage"),
+):
+    """Diff two startup reports and exit non-zero on a regression"""
+    before = json.loads(baseline.read_text())
+    after = json.loads(candidate.read_text())
+    failed = False
+    for name in ("import_server", "time_to_first_200"):
+        old, new = before[name]["median_ms"], after[name]["median_ms"]
+        change = (new - old) / old * 100 if old else 0.0
+        typer.echo(f"{name:<20} {old:>9} ms -> {new:<9} ms ({change:+.1f}%)")
+        failed = failed or change > threshold
+    if failed:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    cli()
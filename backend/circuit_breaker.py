@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling through while the breaker is open"""
+
+
+class CircuitBreaker:
+    """Fail fast around a dependency that keeps failing or stalling
+
+    Every call is bounded by ``call_timeout``. After ``failure_threshold``
+    consecutive failures the breaker opens and calls raise CircuitOpen
+    immediately; once ``reset_timeout`` seconds have passed a single probe
+    call is let through (half-open) and its outcome closes or re-opens it.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=10.0, call_timeout=2.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.call_timeout = call_timeout
+        self.clock = clock
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if self.clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    async def call(self, fn, *args, **kwargs):
+        state = self.state
+        if state == self.OPEN or (state == self.HALF_OPEN and self._probing):
+            raise CircuitOpen("Circuit breaker is open")
+        self._probing = state == self.HALF_OPEN
+        try:
+            result = await asyncio.wait_for(fn(*args, **kwargs), self.call_timeout)
+        except Exception:
+            self._record_failure()
+            raise
+        finally:
+            self._probing = False
+        self._record_success()
+        return result
+
+    def _record_success(self):
+        if self._opened_at is not None:
+            logger.info("Circuit breaker closed")
+        self.failures = 0
+        self._opened_at = None
+
+    def _record_failure(self):
+        self.failures += 1
+        if self._opened_at is not None or self.failures >= self.failure_threshold:
+            if self._opened_at is None:
+                logger.warning(f"Circuit breaker opened after {self.failures} consecutive failures")
+            self._opened_at = self.clock()
@@ -0,0 +1,212 @@
+import hashlib
+import ipaddress
+import logging
+import uuid
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Event collections stored in the compact schema (contact messages are left as they are)
+COMPACT_COLLECTIONS = ("portfolio_views", "resume_downloads")
+
+# Dimension collection: {_id: user_agent_id(ua), ua: "<full user agent>"}
+USER_AGENT_COLLECTION = "user_agents"
+
+# Documents still carrying any of these in text form are in the legacy schema
+LEGACY_QUERY = {
+    "$or": [
+        {"id": {"$type": "string"}},
+        {"ip_address": {"$type": "string"}},
+        {"user_agent": {"$exists": True}},
+    ]
+}
+
+
+def user_agent_id(user_agent):
+    """Short, stable reference for a user agent: a signed 64-bit hash (one BSON int64)"""
+    digest = hashlib.blake2b(user_agent.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def pack_uuid(value):
+    from bson.binary import Binary
+
+    if not isinstance(value, str):
+        return value
+    try:
+        return Binary.from_uuid(uuid.UUID(value))
+    except ValueError:
+        return value
+
+
+def unpack_uuid(value):
+    from bson.binary import Binary
+
+    return str(value.as_uuid()) if isinstance(value, Binary) else value
+
+
+def pack_ip(value):
+    """4 bytes for IPv4, 16 for IPv6; anything unparsable is kept as text"""
+    from bson.binary import Binary
+
+    if not isinstance(value, str):
+        return value
+    try:
+        return Binary(ipaddress.ip_address(value).packed)
+    except ValueError:
+        return value
+
+
+def unpack_ip(value):
+    if isinstance(value, (bytes, bytearray)):
+        return str(ipaddress.ip_address(bytes(value)))
+    return value
+
+
+class LRUCache:
+    """Least-recently-used mapping holding at most ``max_entries`` items"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, default=None):
+        try:
+            self._items.move_to_end(key)
+        except KeyError:
+            return default
+        return self._items[key]
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        if len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+
+class UserAgentDirectory:
+    """Interns user agents into the user_agents dimension collection
+
+    Both directions go through one LRU of id -> user agent, so a busy worker
+    only writes or reads a user agent the first time it sees it.
+    """
+
+    def __init__(self, db=None, max_entries=10000, collection_name=USER_AGENT_COLLECTION):
+        self.db = db
+        self.collection_name = collection_name
+        self.cache = LRUCache(max_entries)
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name]
+
+    async def intern(self, user_agents):
+        """Make sure every user agent is stored; returns {user_agent: id}"""
+        from pymongo import UpdateOne
+
+        ids = {ua: user_agent_id(ua) for ua in set(user_agents) if ua}
+        missing = {ua_id: ua for ua, ua_id in ids.items() if ua_id not in self.cache}
+        if missing:
+            await self.collection.bulk_write(
+                [UpdateOne({"_id": ua_id}, {"$setOnInsert": {"ua": ua}}, upsert=True) for ua_id, ua in missing.items()],
+                ordered=False,
+            )
+            for ua_id, ua in missing.items():
+                self.cache.put(ua_id, ua)
+        return ids
+
+    async def resolve(self, ids):
+        """{id: user_agent} for the given ids; unknown ids are left out"""
+        found = {}
+        missing = []
+        for ua_id in set(ids):
+            ua = self.cache.get(ua_id)
+            if ua is None:
+                missing.append(ua_id)
+            else:
+                found[ua_id] = ua
+        if missing:
+            async for doc in self.collection.find({"_id": {"$in": missing}}):
+                self.cache.put(doc["_id"], doc["ua"])
+                found[doc["_id"]] = doc["ua"]
+        return found
+
+
+class EventCodec:
+    """Converts analytics events between the API shape and the compact stored shape
+
+    Stored: ``id`` as a BSON binary UUID, ``ip_address`` as packed bytes and
+    ``user_agent`` replaced by ``ua``, a reference into user_agents. Decoding
+    accepts both schemas, so collections can be migrated while in use.
+    """
+
+    def __init__(self, user_agents):
+        self.user_agents = user_agents
+
+    async def encode(self, collection, documents):
+        """Stored form of documents for collection (usable as an EventBuffer encoder)"""
+        if collection not in COMPACT_COLLECTIONS:
+            return documents
+        ua_ids = await self.user_agents.intern(
+            doc["user_agent"] for doc in documents if isinstance(doc.get("user_agent"), str)
+        )
+        stored = []
+        for document in documents:
+            compact = {key: value for key, value in document.items() if key != "user_agent"}
+            if "id" in compact:
+                compact["id"] = pack_uuid(compact["id"])
+            if "ip_address" in compact:
+                compact["ip_address"] = pack_ip(compact["ip_address"])
+            user_agent = document.get("user_agent")
+            if isinstance(user_agent, str) and user_agent:
+                compact["ua"] = ua_ids[user_agent]
+            stored.append(compact)
+        return stored
+
+    async def decode(self, collection, documents):
+        """API-shaped documents (string id, text IP, full user agent) from either schema"""
+        if collection not in COMPACT_COLLECTIONS:
+            return documents
+        user_agents = await self.user_agents.resolve(doc["ua"] for doc in documents if "ua" in doc)
+        decoded = []
+        for document in documents:
+            plain = {key: value for key, value in document.items() if key != "ua"}
+            if "id" in plain:
+                plain["id"] = unpack_uuid(plain["id"])
+            if "ip_address" in plain:
+                plain["ip_address"] = unpack_ip(plain["ip_address"])
+            if "ua" in document:
+                plain["user_agent"] = user_agents.get(document["ua"])
+            else:
+                plain.setdefault("user_agent", None)
+            decoded.append(plain)
+        return decoded
+
+
+async def migrate_collection(db, codec, collection, batch_size=1000):
+    """Rewrite legacy documents of collection in the compact schema, batch_size at a time"""
+    from pymongo import ReplaceOne
+
+    converted = 0
+    last_id = None
+    while True:
+        query = LEGACY_QUERY if last_id is None else {"$and": [LEGACY_QUERY, {"_id": {"$gt": last_id}}]}
+        batch = await db[collection].find(query).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+        plain = await codec.decode(collection, batch)
+        stored = await codec.encode(collection, plain)
+        await db[collection].bulk_write(
+            [ReplaceOne({"_id": doc["_id"]}, doc) for doc in stored],
+            ordered=False,
+        )
+        converted += len(batch)
+        logger.info(f"Compacted {converted} {collection} documents")
+    return converted
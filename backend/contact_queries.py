@@ -0,0 +1,139 @@
+import base64
+import json
+from datetime import datetime
+
+from models import ContactMessage
+
+# Newest first, with id as the tie-breaker so the order is total
+CONTACT_SORT = [("created_at", -1), ("id", -1)]
+
+CONTACT_FIELDS = frozenset(ContactMessage.model_fields)
+
+# Always projected: the keyset cursor is built from these
+CURSOR_FIELDS = ("created_at", "id")
+
+
+def encode_cursor(document):
+    """Opaque cursor pointing just past document in CONTACT_SORT order"""
+    raw = json.dumps([document["created_at"].isoformat(), document["id"]])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on anything malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, message_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), str(message_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def contact_messages_filter(is_read=None, email=None, cursor=None):
+    """Mongo filter for a page of contact messages"""
+    query = {}
+    if is_read is not None:
+        query["is_read"] = is_read
+    if email is not None:
+        query["email"] = email
+    if cursor is not None:
+        created_at, message_id = decode_cursor(cursor)
+        # The $lte bound lets the created_at index bound the scan; the $or breaks ties on id
+        query["created_at"] = {"$lte": created_at}
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"id": {"$lt": message_id}},
+        ]
+    return query
+
+
+def encode_search_cursor(document):
+    """Opaque cursor pointing just past document in search order (score, then CONTACT_SORT)"""
+    raw = json.dumps([document["score"], document["created_at"].isoformat(), document["id"]])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_search_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, created_at, message_id = json.loads(base64.urlsafe_b64decode(padded))
+        return float(score), datetime.fromisoformat(created_at), str(message_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def contact_search_pipeline(text, limit, is_read=None, email=None, cursor=None, projection=None):
+    """Aggregation for one page of contact messages matching text, best match first
+
+    The $text match is served by the contact_text_search index; only the
+    matching messages are scored and sorted. Cursors are only meaningful for
+    the search they came from.
+    """
+    query = contact_messages_filter(is_read=is_read, email=email)
+    query["$text"] = {"$search": text}
+    pipeline = [
+        {"$match": query},
+        {"$addFields": {"score": {"$meta": "textScore"}}},
+    ]
+    if cursor is not None:
+        score, created_at, message_id = decode_search_cursor(cursor)
+        pipeline.append({"$match": {"$or": [
+            {"score": {"$lt": score}},
+            {"score": score, "created_at": {"$lt": created_at}},
+            {"score": score, "created_at": created_at, "id": {"$lt": message_id}},
+        ]}})
+    pipeline.append({"$sort": {"score": -1, "created_at": -1, "id": -1}})
+    pipeline.append({"$limit": limit})
+    projection = dict(projection or {"_id": 0})
+    if len(projection) > 1:
+        projection["score"] = 1
+    pipeline.append({"$project": projection})
+    return pipeline
+
+
+def contact_selection(ids=None, is_read=None, email=None, text=None, before=None):
+    """Filter selecting contact messages by id list and/or query; raises ValueError if it would select everything"""
+    query = contact_messages_filter(is_read=is_read, email=email)
+    if ids:
+        query["id"] = {"$in": list(ids)}
+    if text:
+        query["$text"] = {"$search": text}
+    if before is not None:
+        query["created_at"] = {"$lt": before}
+    if not query:
+        raise ValueError("Select messages by ids or at least one filter")
+    return query
+
+
+def contact_bulk_requests(operations, chunk_size=10000):
+    """pymongo write models for [(action, message ids)], to be sent as one bulk_write
+
+    Each id list is split into $in chunks of chunk_size so no single
+    operation gets near the BSON document size limit.
+    """
+    from pymongo import DeleteMany, UpdateMany
+
+    requests = []
+    for action, ids in operations:
+        for start in range(0, len(ids), chunk_size):
+            query = {"id": {"$in": ids[start:start + chunk_size]}}
+            if action == "delete":
+                requests.append(DeleteMany(query))
+            elif action in ("mark_read", "mark_unread"):
+                requests.append(UpdateMany(query, {"$set": {"is_read": action == "mark_read"}}))
+            else:
+                raise ValueError(f"Unknown action: {action}")
+    return requests
+
+
+def contact_messages_projection(fields=None):
+    """Projection for a comma-separated field list; None means every field"""
+    if not fields:
+        return {"_id": 0}
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - CONTACT_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    projection = {field: 1 for field in requested.union(CURSOR_FIELDS)}
+    projection["_id"] = 0
+    return projection
@@ -0,0 +1,253 @@
+import array
+import bisect
+import functools
+import ipaddress
+import mmap
+import os
+import random
+import socket
+import struct
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+GeoInfo = namedtuple("GeoInfo", ["country", "asn"])
+
+UNKNOWN = GeoInfo(None, None)
+
+# Range database file (little-endian): a header, then per IP version a column
+# of range starts (bisected in place) followed by the matching fixed-size records
+RANGE_MAGIC = b"PFGEO\x01"
+RANGE_HEADER = struct.Struct("<6sxxII")  # magic, IPv4 range count, IPv6 range count
+V4_RECORD = struct.Struct("<II2s")  # last address, asn (0 = unknown), ISO country (b"\0\0" = unknown)
+V6_RECORD = struct.Struct("<16s16sI2s")  # first and last address (big-endian), asn, country
+# IPv6 starts are bisected on their upper 64 bits, then on the full address
+
+# IPv4 ranges that are never routed on the internet, as (network, netmask)
+V4_NON_PUBLIC = tuple(
+    (int(network.network_address), int(network.netmask))
+    for network in map(ipaddress.IPv4Network, (
+        "0.0.0.0/8", "10.0.0.0/8", "100.64.0.0/10", "127.0.0.0/8", "169.254.0.0/16",
+        "172.16.0.0/12", "192.168.0.0/16", "224.0.0.0/3",
+    ))
+)
+
+V4_MAPPED_PREFIX = b"\0" * 10 + b"\xff\xff"
+
+
+def _geo(asn, country):
+    return GeoInfo(country.decode("ascii") if country != b"\0\0" else None, asn or None)
+
+
+class RangeDatabase:
+    """Country/ASN lookups in a sorted range file, memory-mapped read-only
+
+    Range starts are stored as native integer columns and bisected in place
+    through memoryviews, so opening is O(1), nothing is parsed up front and
+    the pages are shared by every worker through the page cache. An IPv4
+    lookup is a C-level bisect plus one record read. Build files with
+    ``build_range_database``.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, v4_count, v6_count = RANGE_HEADER.unpack_from(self._map, 0)
+        if magic != RANGE_MAGIC:
+            raise ValueError(f"{self.path} is not a GeoIP range database")
+        if sys.byteorder != "little":
+            raise ValueError("GeoIP range databases can only be read on little-endian hosts")
+        offset = RANGE_HEADER.size
+        self._v4_starts = memoryview(self._map)[offset:offset + 4 * v4_count].cast("I")
+        offset += 4 * v4_count
+        self._v4_records = offset
+        offset += V4_RECORD.size * v4_count
+        self._v6_starts = memoryview(self._map)[offset:offset + 8 * v6_count].cast("Q")
+        offset += 8 * v6_count
+        self._v6_records = offset
+        offset += V6_RECORD.size * v6_count
+        if len(self._map) != offset:
+            raise ValueError(f"{self.path} is truncated")
+
+    def lookup(self, address):
+        try:
+            packed = socket.inet_pton(socket.AF_INET, address)
+        except OSError:
+            return self._lookup_v6(address)
+        key = int.from_bytes(packed, "big")
+        for network, mask in V4_NON_PUBLIC:
+            if key & mask == network:
+                return UNKNOWN
+        index = bisect.bisect_right(self._v4_starts, key) - 1
+        if index < 0:
+            return UNKNOWN
+        last, asn, country = V4_RECORD.unpack_from(self._map, self._v4_records + index * V4_RECORD.size)
+        return _geo(asn, country) if key <= last else UNKNOWN
+
+    def _lookup_v6(self, address):
+        try:
+            key = socket.inet_pton(socket.AF_INET6, address)
+        except OSError:
+            raise ValueError(f"Not an IP address: {address!r}")
+        if key[:12] == V4_MAPPED_PREFIX:
+            return self.lookup(socket.inet_ntop(socket.AF_INET, key[12:]))
+        # Only global unicast (2000::/3) is routed on the internet
+        if key[0] & 0xE0 != 0x20:
+            return UNKNOWN
+        high = int.from_bytes(key[:8], "big")
+        # Ranges sharing the upper 64 bits are told apart by their full start address
+        low, index = bisect.bisect_left(self._v6_starts, high), bisect.bisect_right(self._v6_starts, high)
+        while index > low and self._v6_record(index - 1)[0] > key:
+            index -= 1
+        if index == 0:
+            return UNKNOWN
+        first, last, asn, country = self._v6_record(index - 1)
+        return _geo(asn, country) if key <= last else UNKNOWN
+
+    def _v6_record(self, index):
+        return V6_RECORD.unpack_from(self._map, self._v6_records + index * V6_RECORD.size)
+
+    def close(self):
+        self._v4_starts.release()
+        self._v6_starts.release()
+        self._map.close()
+
+
+class MaxMindDatabase:
+    """Lookups in MaxMind DB files (GeoLite2/GeoIP2 Country or City, and ASN), opened with MODE_MMAP
+
+    Needs the optional ``maxminddb`` package.
+    """
+
+    def __init__(self, country_path=None, asn_path=None):
+        import maxminddb
+
+        self._country = maxminddb.open_database(str(country_path), maxminddb.MODE_MMAP) if country_path else None
+        self._asn = maxminddb.open_database(str(asn_path), maxminddb.MODE_MMAP) if asn_path else None
+
+    def lookup(self, address):
+        country = asn = None
+        ip = ipaddress.ip_address(address)
+        if not ip.is_global:
+            return UNKNOWN
+        if self._country is not None:
+            record = self._country.get(ip) or {}
+            country = (record.get("country") or record.get("registered_country") or {}).get("iso_code")
+        if self._asn is not None:
+            asn = (self._asn.get(ip) or {}).get("autonomous_system_number")
+        return GeoInfo(country, asn)
+
+    def close(self):
+        for reader in (self._country, self._asn):
+            if reader is not None:
+                reader.close()
+
+
+def open_database(path, asn_path=None):
+    """A RangeDatabase, or a MaxMindDatabase for .mmdb files"""
+    if str(path).endswith(".mmdb") or (asn_path and str(asn_path).endswith(".mmdb")):
+        return MaxMindDatabase(path, asn_path)
+    return RangeDatabase(path)
+
+
+class GeoIPEnricher:
+    """Country and ASN for client addresses, memoized in an LRU of ``max_entries`` addresses
+
+    Without a database every address is unknown, so enrichment can be
+    switched off by not configuring one. Private, loopback and unparsable
+    addresses are never looked up.
+    """
+
+    def __init__(self, database=None, max_entries=50000):
+        self.database = database
+        self.lookup = functools.lru_cache(maxsize=max_entries)(self._lookup)
+
+    def _lookup(self, address):
+        if self.database is None or not address:
+            return UNKNOWN
+        try:
+            return self.database.lookup(address)
+        except ValueError:
+            return UNKNOWN
+
+
+def build_range_database(ranges, path):
+    """Write a range database from (first address, last address, country or None, asn or None) rows
+
+    Ranges of one IP version must not overlap. The file is written to a
+    temporary name and renamed into place, so open readers are unaffected.
+    """
+    tables = {4: [], 6: []}
+    for first, last, country, asn in ranges:
+        first, last = ipaddress.ip_address(first), ipaddress.ip_address(last)
+        if first.version != last.version or first > last:
+            raise ValueError(f"Invalid range {first} - {last}")
+        tables[first.version].append((first, last, asn or 0, (country or "").upper().encode("ascii") or b"\0\0"))
+    for rows in tables.values():
+        rows.sort()
+        for previous, row in zip(rows, rows[1:]):
+            if row[0] <= previous[1]:
+                raise ValueError(f"Overlapping ranges at {row[0]}")
+    if sys.byteorder != "little":
+        raise ValueError("GeoIP range databases can only be built on little-endian hosts")
+    v4_starts = array.array("I", (int(first) for first, _, _, _ in tables[4]))
+    v6_starts = array.array("Q", (int(first) >> 64 for first, _, _, _ in tables[6]))
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(RANGE_HEADER.pack(RANGE_MAGIC, len(tables[4]), len(tables[6])))
+        f.write(v4_starts.tobytes())
+        for _, last, asn, country in tables[4]:
+            f.write(V4_RECORD.pack(int(last), asn, country))
+        f.write(v6_starts.tobytes())
+        for first, last, asn, country in tables[6]:
+            f.write(V6_RECORD.pack(first.packed, last.packed, asn, country))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(tables[4]) + len(tables[6])
+
+
+def read_ip2asn(path):
+    """(first, last, country, asn) rows from an ip2asn-combined TSV (range_start, range_end, AS number, country, AS name)"""
+    import gzip
+
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 4:
+                continue
+            first, last, asn, country = fields[:4]
+            yield first, last, None if country in ("", "None") else country, int(asn) or None
+
+
+FIXTURE_COUNTRIES = ("US", "IN", "DE", "GB", "FR", "JP", "BR", "CA", "AU", "NL")
+
+
+def fixture_ranges(count=10000, seed=0):
+    """Synthetic, deterministic ranges over public IPv4 and IPv6 space, for tests and benchmarks"""
+    rng = random.Random(seed)
+    v4_count = max(1, count * 3 // 4)
+    # Unicast IPv4 (1.0.0.0 - 223.255.255.255)
+    v4_base, v4_end = 1 << 24, 224 << 24
+    step = (v4_end - v4_base) // v4_count
+    for i in range(v4_count):
+        first = v4_base + i * step
+        yield (
+            str(ipaddress.IPv4Address(first)),
+            str(ipaddress.IPv4Address(first + rng.randrange(1, step))),
+            rng.choice(FIXTURE_COUNTRIES),
+            rng.randrange(1, 400000),
+        )
+    base = int(ipaddress.IPv6Address("2400::"))
+    for i in range(count - v4_count):
+        first = base + (i << 96)
+        yield (
+            str(ipaddress.IPv6Address(first)),
+            str(ipaddress.IPv6Address(first + (1 << 95))),
+            rng.choice(FIXTURE_COUNTRIES),
+            rng.randrange(1, 400000),
+        )
@@ -0,0 +1,71 @@
+"""Production gunicorn settings: gunicorn -c gunicorn.conf.py server:app
+
+The app is imported once in the master (preload_app) and the resume
+artifacts are rendered into the shared cache before workers fork. Each
+worker then runs its own lifespan: Mongo client, event buffer, render pool.
+
+Metrics are kept per worker; with more than one worker METRICS_MODE is set
+to 'workers', so whichever worker answers a /metrics scrape renders every
+worker's samples, each labelled worker="<pid>" (aggregate with sum without
+(worker)). Scrape the one service address. The view dedup window and
+(set to 'shared' here as well) the rate limiter's buckets live in the
+shared cache directory, so they hold across workers.
+
+Send HUP to the master for a graceful restart of the workers; with
+preload_app new code is only picked up by a full restart (or USR2 + WINCH
++ QUIT on the old master).
+"""
+import math
+import os
+
+
+def cpu_quota():
+    """CPUs granted by the cgroup quota (v2, then v1), or None if unlimited"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def default_workers():
+    cpus = os.cpu_count() or 1
+    quota = cpu_quota()
+    if quota:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8001')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", default_workers()))
+if workers > 1:
+    os.environ.setdefault("METRICS_MODE", "workers")
+    os.environ.setdefault("RATE_LIMIT_BACKEND", "shared")
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+accesslog = "-"
+
+
+def when_ready(arbiter):
+    import sys
+    app_module = sys.modules.get("server")
+    if app_module is not None:
+        try:
+            app_module.prerender_artifacts()
+        except Exception as e:
+            arbiter.log.warning(f"Pre-rendering resume artifacts failed: {e}")
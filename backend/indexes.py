@@ -0,0 +1,131 @@
+import logging
+import os
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# keys: [(field, direction)]; options: extra createIndexes options (unique, partialFilterExpression, ...)
+IndexSpec = namedtuple("IndexSpec", ["name", "keys", "options"])
+
+# Hourly rollups older than this are expired by a TTL index; day and total rollups are kept
+ROLLUP_HOUR_RETENTION_DAYS = int(os.environ.get('ROLLUP_HOUR_RETENTION_DAYS', '400'))
+
+# Relative weight of each searchable contact message field in the text score
+CONTACT_SEARCH_WEIGHTS = {"subject": 5, "name": 3, "email": 3, "company": 2, "message": 1}
+
+
+def declared_indexes(rollup_hour_retention_days=ROLLUP_HOUR_RETENTION_DAYS):
+    """Every index the backend's queries rely on, per collection"""
+    return {
+        "portfolio_views": [
+            # Time-range matches (timeseries) and the archiver's (visited_at, _id) scan
+            IndexSpec("visited_at_1__id_1", [("visited_at", 1), ("_id", 1)], {}),
+            IndexSpec("ip_address_1", [("ip_address", 1)], {}),
+            # Spool replay upserts by id
+            IndexSpec("id_1", [("id", 1)], {}),
+        ],
+        "resume_downloads": [
+            IndexSpec("downloaded_at_1__id_1", [("downloaded_at", 1), ("_id", 1)], {}),
+            IndexSpec("ip_address_1", [("ip_address", 1)], {}),
+            IndexSpec("id_1", [("id", 1)], {}),
+        ],
+        "contact_messages": [
+            # Admin listing: newest first with id as tie-breaker, optionally filtered
+            IndexSpec("created_at_-1_id_-1", [("created_at", -1), ("id", -1)], {}),
+            IndexSpec("email_1_created_at_-1_id_-1", [("email", 1), ("created_at", -1), ("id", -1)], {}),
+            # The unread inbox only; read messages fall back to created_at_-1_id_-1
+            IndexSpec(
+                "unread_created_at_-1_id_-1",
+                [("is_read", 1), ("created_at", -1), ("id", -1)],
+                {"partialFilterExpression": {"is_read": False}},
+            ),
+            IndexSpec("id_1", [("id", 1)], {}),
+            # Admin search (GET /api/contact-messages/search); a collection has at most one text index
+            IndexSpec(
+                "contact_text_search",
+                [(field, "text") for field in CONTACT_SEARCH_WEIGHTS],
+                {"weights": CONTACT_SEARCH_WEIGHTS, "default_language": "english"},
+            ),
+        ],
+        "analytics_rollups": [
+            IndexSpec("granularity_1_bucket_1", [("granularity", 1), ("bucket", 1)], {}),
+            IndexSpec(
+                "hourly_rollups_ttl",
+                [("bucket", 1)],
+                {
+                    "partialFilterExpression": {"granularity": "hour"},
+                    "expireAfterSeconds": rollup_hour_retention_days * 86400,
+                },
+            ),
+        ],
+        "visitor_sketches": [
+            IndexSpec("day_1", [("day", 1)], {}),
+        ],
+    }
+
+
+# Indexes from earlier releases (mongo-init.js) superseded by the ones above
+RETIRED_INDEXES = {
+    "portfolio_views": ["visited_at_1"],
+    "resume_downloads": ["downloaded_at_1"],
+    "contact_messages": ["created_at_1", "email_1", "is_read_1"],
+}
+
+
+def _matches(spec, info):
+    """True if an existing index (index_information() entry) is the declared one"""
+    keys = [tuple(key) for key in spec.keys]
+    if any(direction == "text" for _, direction in keys):
+        # Text indexes are reported as _fts/_ftsx keys; their fields show up in weights
+        keys = [("_fts", "text"), ("_ftsx", 1)]
+    if [tuple(key) for key in info["key"]] != keys:
+        return False
+    return all(info.get(option) == value for option, value in spec.options.items() if option != "expireAfterSeconds")
+
+
+async def reconcile_indexes(db, declared=None, retired=RETIRED_INDEXES):
+    """Create missing indexes, fix TTLs and drop retired indexes; returns a summary per collection
+
+    Index builds on MongoDB 4.2+ do not lock the collection for their
+    duration, so this is meant to run as a background task while serving.
+    A declared index whose name exists with a different definition is
+    reported, not rebuilt.
+    """
+    from pymongo import IndexModel
+    from pymongo.errors import OperationFailure
+
+    declared = declared_indexes() if declared is None else declared
+    summary = {}
+    for collection, specs in declared.items():
+        actions = summary[collection] = {"created": [], "updated": [], "dropped": [], "conflicts": []}
+        existing = await db[collection].index_information()
+        missing = []
+        for spec in specs:
+            info = existing.get(spec.name)
+            if info is None:
+                missing.append(spec)
+            elif not _matches(spec, info):
+                actions["conflicts"].append(spec.name)
+                logger.warning(f"Index {collection}.{spec.name} differs from its declaration; leaving it as is")
+            elif "expireAfterSeconds" in spec.options and info.get("expireAfterSeconds") != spec.options["expireAfterSeconds"]:
+                await db.command("collMod", collection, index={
+                    "name": spec.name, "expireAfterSeconds": spec.options["expireAfterSeconds"],
+                })
+                actions["updated"].append(spec.name)
+        if missing:
+            await db[collection].create_indexes(
+                [IndexModel(spec.keys, name=spec.name, **spec.options) for spec in missing]
+            )
+            actions["created"] = [spec.name for spec in missing]
+        for name in retired.get(collection, ()):
+            if name in existing:
+                try:
+                    await db[collection].drop_index(name)
+                except OperationFailure as e:
+                    # Another worker dropped it first
+                    logger.info(f"Could not drop retired index {collection}.{name}: {e}")
+                    continue
+                actions["dropped"].append(name)
+        if any(actions.values()):
+            logger.info(f"Reconciled indexes on {collection}: {actions}")
+    return summary
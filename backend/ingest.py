@@ -0,0 +1,148 @@
+import asyncio
+import logging
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class EventBuffer:
+    """In-process queue for fire-and-forget analytics writes
+
+    Tracking endpoints enqueue documents and return immediately; a background
+    task groups them per collection and writes each group with one unordered
+    insert_many once ``batch_size`` events are waiting or ``flush_interval``
+    seconds have passed. The queue is bounded: when it is full, enqueue waits
+    up to ``enqueue_timeout`` seconds for room and then drops the event.
+
+    With a ``breaker`` each write is bounded and fails fast while Mongo is
+    down; with a ``spool`` a failed batch is spooled to disk for later replay
+    instead of being lost. An ``encoder`` (``async encoder(collection,
+    documents)``) converts documents to their stored form just before the
+    write; spool and flush hooks always see the documents as enqueued.
+    """
+
+    def __init__(self, max_size=10000, batch_size=500, flush_interval=1.0, enqueue_timeout=0.05,
+                 breaker=None, spool=None, encoder=None):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.breaker = breaker
+        self.spool = spool
+        self.encoder = encoder
+        self.stats = {"enqueued": 0, "flushed": 0, "dropped": 0, "spooled": 0, "failed": 0}
+        self.db = None
+        self._queue = None
+        self._task = None
+        self._flush_hooks = []
+
+    def add_flush_hook(self, hook):
+        """Register ``async hook(collection_name, documents)``, called after each successful write"""
+        self._flush_hooks.append(hook)
+
+    def start(self, db):
+        self.db = db
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._task = asyncio.create_task(self._run())
+
+    @property
+    def depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def enqueue(self, collection, document):
+        """Queue a document for collection; returns False if it had to be dropped"""
+        try:
+            self._queue.put_nowait((collection, document))
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(self._queue.put((collection, document)), self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                self.stats["dropped"] += 1
+                return False
+        self.stats["enqueued"] += 1
+        return True
+
+    async def close(self):
+        """Flush everything still queued and stop the background writer"""
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        logger.info(f"Event buffer drained: {self.stats}")
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._next_batch()
+            if batch:
+                await self._flush(batch)
+
+    async def _next_batch(self):
+        item = await self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _flush(self, batch):
+        grouped = defaultdict(list)
+        for collection, document in batch:
+            grouped[collection].append(document)
+        for collection, documents in grouped.items():
+            try:
+                await self._insert_many(collection, documents)
+            except Exception as e:
+                if await self._spool(collection, documents, e):
+                    continue
+                self.stats["failed"] += len(documents)
+                logger.error(f"Failed to write {len(documents)} events to {collection}: {e}")
+                continue
+            self.stats["flushed"] += len(documents)
+            for hook in self._flush_hooks:
+                try:
+                    await hook(collection, documents)
+                except Exception as e:
+                    logger.error(f"Event flush hook failed for {collection}: {e}")
+
+    async def _insert_many(self, collection, documents):
+        if self.breaker is None:
+            return await self._encode_and_insert(collection, documents)
+        # The encoder may itself write to Mongo (interned user agents), so it runs
+        # inside the breaker: its failures count and the batch goes to the spool
+        return await self.breaker.call(self._encode_and_insert, collection, documents)
+
+    async def _encode_and_insert(self, collection, documents):
+        if self.encoder is not None:
+            documents = await self.encoder(collection, documents)
+        return await self.db[collection].insert_many(documents, ordered=False)
+
+    async def _spool(self, collection, documents, error):
+        if self.spool is None:
+            return False
+        try:
+            await self.spool.append(collection, documents)
+        except Exception as e:
+            logger.error(f"Failed to spool {len(documents)} events for {collection}: {e}")
+            return False
+        self.stats["spooled"] += len(documents)
+        logger.warning(f"Spooled {len(documents)} events for {collection}: {error!r}")
+        return True
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+
+import orjson
+
+from rollups import ROLLUP_SOURCES
+
+logger = logging.getLogger(__name__)
+
+
+def sse_frame(event, data):
+    """One Server-Sent Events message"""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+KEEPALIVE_FRAME = b": keepalive\n\n"
+
+
+class Subscriber:
+    """A connected stream client: a bounded queue of encoded frames, None to end the stream
+
+    When the client falls behind and the queue is full, the oldest frame is
+    discarded; every frame carries the running totals, so a client that
+    missed frames is still correct after the next one.
+    """
+
+    def __init__(self, max_frames):
+        self.queue = asyncio.Queue(maxsize=max_frames)
+        self.dropped = 0
+
+    def push(self, frame):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(frame)
+
+
+class LiveAnalytics:
+    """In-process counters for /api/analytics/stream, broadcast as coalesced deltas
+
+    ``record`` (a flush hook) folds newly written events into pending deltas;
+    ``run`` publishes them once per ``tick`` as a single encoded frame shared
+    by every subscriber, so the cost of a write is independent of the number
+    of viewers and viewers cause no Mongo reads at all. Totals are seeded
+    from the rollups and re-read every ``resync_interval`` seconds, which also
+    picks up events written by other worker processes.
+    """
+
+    def __init__(self, rollups=None, tick=1.0, keepalive=15.0, resync_interval=30.0, max_subscribers=100,
+                 client_buffer=32, clock=time.time):
+        self.rollups = rollups
+        self.tick = tick
+        self.keepalive = keepalive
+        self.resync_interval = resync_interval
+        self.max_subscribers = max_subscribers
+        self.client_buffer = client_buffer
+        self.clock = clock
+        self.totals = {metric: 0 for metric, _, _ in ROLLUP_SOURCES.values()}
+        self.bots = {metric: 0 for metric, _, _ in ROLLUP_SOURCES.values()}
+        self.subscribers = set()
+        self.stats = {"published": 0, "dropped": 0}
+        self._pending = None
+
+    def _reset_pending(self):
+        self._pending = {"counts": defaultdict(int), "bots": defaultdict(int), "breakdown": defaultdict(lambda: defaultdict(int))}
+
+    async def record(self, collection, documents):
+        """Fold newly written events into the next delta (usable as an EventBuffer flush hook)"""
+        source = ROLLUP_SOURCES.get(collection)
+        if source is None or not documents:
+            return
+        metric, _, dim_field = source
+        if self._pending is None:
+            self._reset_pending()
+        for document in documents:
+            self._pending["counts"][metric] += 1
+            if document.get("is_bot"):
+                self._pending["bots"][metric] += 1
+            if dim_field:
+                self._pending["breakdown"][metric][str(document.get(dim_field) or "unknown")] += 1
+
+    def snapshot(self):
+        return {"t": self.clock(), "totals": dict(self.totals), "bots": dict(self.bots)}
+
+    def subscribe(self):
+        """A new Subscriber primed with the current totals, or None when at max_subscribers"""
+        if len(self.subscribers) >= self.max_subscribers:
+            return None
+        subscriber = Subscriber(self.client_buffer)
+        subscriber.push(sse_frame("snapshot", self.snapshot()))
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+        self.stats["dropped"] += subscriber.dropped
+
+    def publish(self, apply=True):
+        """Broadcast pending deltas, adding them to the totals unless ``apply`` is False; returns the frame sent, if any"""
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return None
+        if apply:
+            for metric, count in pending["counts"].items():
+                self.totals[metric] += count
+            for metric, count in pending["bots"].items():
+                self.bots[metric] += count
+        frame = sse_frame("delta", {
+            **self.snapshot(),
+            "delta": dict(pending["counts"]),
+            "delta_bots": dict(pending["bots"]),
+            "delta_breakdown": {metric: dict(dims) for metric, dims in pending["breakdown"].items()},
+        })
+        self.broadcast(frame)
+        self.stats["published"] += 1
+        return frame
+
+    def broadcast(self, frame):
+        for subscriber in self.subscribers:
+            subscriber.push(frame)
+
+    def close(self):
+        """End every open stream (on shutdown, so connections do not hold up the worker)"""
+        self.broadcast(None)
+
+    async def resync(self):
+        """Replace the totals with the rollups' (which include other workers' writes)"""
+        if self.rollups is None or self.rollups.db is None:
+            return
+        totals = await self.rollups.totals()
+        humans = await self.rollups.totals(include_bots=False)
+        self.totals = totals
+        self.bots = {metric: totals[metric] - humans.get(metric, 0) for metric in totals}
+
+    async def run(self):
+        """Publish a delta every tick, a keepalive when idle, and resync totals periodically"""
+        loop = asyncio.get_running_loop()
+        last_frame = last_resync = loop.time()
+        try:
+            await self.resync()
+        except Exception as e:
+            logger.warning(f"Could not seed live analytics totals: {e}")
+        while True:
+            await asyncio.sleep(self.tick)
+            now = loop.time()
+            resynced = False
+            if self.resync_interval > 0 and now - last_resync >= self.resync_interval:
+                last_resync = now
+                try:
+                    await self.resync()
+                    resynced = True
+                except Exception as e:
+                    logger.warning(f"Live analytics resync failed: {e}")
+            # Pending events are flushed (and rolled up) before they are recorded here,
+            # so freshly resynced totals already include them
+            if self.publish(apply=not resynced) is not None:
+                last_frame = now
+            elif now - last_frame >= self.keepalive:
+                self.broadcast(KEEPALIVE_FRAME)
+                last_frame = now
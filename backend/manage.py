@@ -0,0 +1,279 @@
+"""Maintenance commands for the portfolio backend
+
+Usage: python manage.py --help
+"""
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional
+
+import typer
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from compact_events import COMPACT_COLLECTIONS, EventCodec, UserAgentDirectory, migrate_collection
+from geoip import build_range_database, fixture_ranges, read_ip2asn
+from indexes import reconcile_indexes
+from retention import RETENTION_SOURCES, EventArchive, load_events, retention_cutoff
+from rollups import ROLLUP_SOURCES, AnalyticsRollups, BackfillConflict
+from timeseries import TIMESERIES_UNITS, timeseries_from_frames
+from user_agents import TAGGED_COLLECTIONS, UserAgentClassifier, tag_collection
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+cli = typer.Typer(help="Portfolio backend maintenance commands")
+
+EVENT_ARCHIVE_DIR = Path(os.environ.get('EVENT_ARCHIVE_DIR', ROOT_DIR / 'archive'))
+
+
+def get_db():
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    return client, client[os.environ['DB_NAME']]
+
+
+@cli.command("backfill-rollups")
+def backfill_rollups(
+    batch_size: int = typer.Option(1000, help="Raw documents per bulk write"),
+    quiet_seconds: int = typer.Option(60, help="Refuse to run if any event is newer than this; 0 skips the check"),
+    archive_dir: Path = typer.Option(EVENT_ARCHIVE_DIR, help="Parquet archive written by archive-events"),
+):
+    """Rebuild analytics_rollups from the raw portfolio_views, resume_downloads and contact_messages
+
+    Views and downloads already moved to the Parquet archive are counted
+    from there. Stop the API (ingest and spool replay) first: the rebuilt
+    collection replaces the live one, so events counted in the meantime
+    would be lost.
+    """
+    async def run():
+        client, db = get_db()
+        try:
+            await AnalyticsRollups(db).backfill(
+                batch_size=batch_size, quiet_period=timedelta(seconds=quiet_seconds), archive=EventArchive(archive_dir)
+            )
+        except BackfillConflict as e:
+            typer.echo(f"Backfill aborted: {e}", err=True)
+            raise typer.Exit(code=1)
+        finally:
+            client.close()
+
+    asyncio.run(run())
+
+
+async def _storage_stats(db, collection):
+    try:
+        stats = await db.command("collStats", collection)
+    except Exception:
+        return None
+    return stats.get("size", 0), stats.get("totalIndexSize", 0)
+
+
+@cli.command("ensure-indexes")
+def ensure_indexes():
+    """Create missing indexes from indexes.py, update TTLs and drop retired ones"""
+    async def run():
+        client, db = get_db()
+        try:
+            summary = await reconcile_indexes(db)
+        finally:
+            client.close()
+        for collection, actions in summary.items():
+            changes = ", ".join(f"{action}: {', '.join(names)}" for action, names in actions.items() if names)
+            typer.echo(f"{collection}: {changes or 'up to date'}")
+
+    asyncio.run(run())
+
+
+@cli.command("compact-events")
+def compact_events(
+    batch_size: int = typer.Option(1000, help="Documents rewritten per bulk write"),
+    collection: Optional[List[str]] = typer.Option(None, help="Collections to convert (default: all event collections)"),
+):
+    """Convert portfolio_views/resume_downloads documents to the compact schema (ANALYTICS_COMPACT_SCHEMA)"""
+    async def run():
+        client, db = get_db()
+        codec = EventCodec(UserAgentDirectory(db))
+        try:
+            for name in collection or COMPACT_COLLECTIONS:
+                if name not in COMPACT_COLLECTIONS:
+                    raise typer.BadParameter(f"{name} is not an event collection")
+                before = await _storage_stats(db, name)
+                converted = await migrate_collection(db, codec, name, batch_size=batch_size)
+                after = await _storage_stats(db, name)
+                line = f"{name}: {converted} documents converted"
+                if before and after:
+                    line += f"; data {before[0]} -> {after[0]} bytes, indexes {before[1]} -> {after[1]} bytes"
+                typer.echo(line)
+        finally:
+            client.close()
+
+    asyncio.run(run())
+
+
+@cli.command("classify-events")
+def classify_events(
+    batch_size: int = typer.Option(1000, help="Events updated per bulk write"),
+    collection: Optional[List[str]] = typer.Option(None, help="Collections to classify (default: views and downloads)"),
+):
+    """Tag views/downloads stored before classification with is_bot and browser_family
+
+    Run backfill-rollups afterwards so the rollups' bot counts include them.
+    """
+    async def run():
+        client, db = get_db()
+        classifier = UserAgentClassifier()
+        codec = EventCodec(UserAgentDirectory(db))
+        try:
+            for name in collection or TAGGED_COLLECTIONS:
+                if name not in TAGGED_COLLECTIONS:
+                    raise typer.BadParameter(f"{name} is not an event collection")
+                tagged = await tag_collection(db, classifier, name, codec=codec, batch_size=batch_size)
+                typer.echo(f"{name}: {tagged} events classified")
+        finally:
+            client.close()
+
+    asyncio.run(run())
+
+
+@cli.command("archive-events")
+def archive_events(
+    older_than_days: int = typer.Option(
+        int(os.environ.get('EVENT_RETENTION_DAYS', '90')), help="Keep this many days of raw events in Mongo"
+    ),
+    batch_size: int = typer.Option(5000, help="Events exported and deleted per batch"),
+    archive_dir: Path = typer.Option(EVENT_ARCHIVE_DIR, help="Root of the Parquet archive"),
+    collection: Optional[List[str]] = typer.Option(None, help="Collections to archive (default: views and downloads)"),
+):
+    """Move raw view/download events past the retention horizon into date-partitioned Parquet"""
+    async def run():
+        client, db = get_db()
+        archive = EventArchive(archive_dir)
+        codec = EventCodec(UserAgentDirectory(db))
+        cutoff = retention_cutoff(older_than_days)
+        try:
+            for name in collection or RETENTION_SOURCES:
+                if name not in RETENTION_SOURCES:
+                    raise typer.BadParameter(f"{name} is not an event collection")
+                moved = await archive.archive(db, name, cutoff, batch_size=batch_size, codec=codec)
+                typer.echo(f"{name}: {moved} events before {cutoff:%Y-%m-%d} archived to {archive_dir / name}")
+        finally:
+            client.close()
+
+    asyncio.run(run())
+
+
+@cli.command("events-summary")
+def events_summary(
+    collection: str = typer.Argument("portfolio_views"),
+    start: Optional[datetime] = typer.Option(None, help="Inclusive start (UTC)"),
+    end: Optional[datetime] = typer.Option(None, help="Exclusive end (UTC)"),
+    archive_dir: Path = typer.Option(EVENT_ARCHIVE_DIR, help="Root of the Parquet archive"),
+):
+    """Daily event counts across hot Mongo data and the Parquet archive"""
+    if collection not in RETENTION_SOURCES:
+        raise typer.BadParameter(f"{collection} is not an event collection")
+
+    async def run():
+        client, db = get_db()
+        try:
+            return await load_events(
+                db, EventArchive(archive_dir), collection, start, end, codec=EventCodec(UserAgentDirectory(db))
+            )
+        finally:
+            client.close()
+
+    events = asyncio.run(run())
+    time_field, _ = RETENTION_SOURCES[collection]
+    if events.empty:
+        typer.echo("No events")
+        return
+    for day, count in events.groupby(events[time_field].dt.floor("D")).size().items():
+        typer.echo(f"{day:%Y-%m-%d} {count}")
+
+
+def _load_export(path, time_field):
+    """Events from a Parquet file or an NDJSON export (mongoexport extended JSON dates included)"""
+    import pandas as pd
+
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path)
+    frame = pd.read_json(path, lines=True, convert_dates=False)
+    if time_field in frame:
+        def unwrap(value):
+            if isinstance(value, dict):
+                value = value.get("$date", value)
+            if isinstance(value, dict):
+                value = int(value.get("$numberLong", 0))
+            return pd.to_datetime(value, unit="ms", utc=True) if isinstance(value, int) else value
+
+        frame[time_field] = pd.to_datetime(frame[time_field].map(unwrap), utc=True, format="mixed").dt.tz_localize(None)
+    return frame
+
+
+@cli.command("build-geoip")
+def build_geoip(
+    output: Path = typer.Argument(..., help="Range database to write (point GEOIP_DATABASE at it)"),
+    ip2asn: Optional[Path] = typer.Option(None, help="ip2asn-combined.tsv(.gz) to build from"),
+    fixture: int = typer.Option(0, help="Instead, write this many synthetic ranges (tests and benchmarks)"),
+):
+    """Build the memory-mapped country/ASN range database used for GeoIP enrichment, offline"""
+    if ip2asn is not None:
+        ranges = read_ip2asn(ip2asn)
+    elif fixture > 0:
+        ranges = fixture_ranges(fixture)
+    else:
+        raise typer.BadParameter("Pass --ip2asn or --fixture")
+    count = build_range_database(ranges, output)
+    typer.echo(f"Wrote {count} ranges to {output}")
+
+
+@cli.command("timeseries")
+def timeseries(
+    granularity: str = typer.Option("day", help="hour, day or week"),
+    start: Optional[datetime] = typer.Option(None, help="Inclusive start (UTC)"),
+    end: Optional[datetime] = typer.Option(None, help="Exclusive end (UTC)"),
+    views: Optional[Path] = typer.Option(None, help="portfolio_views export (.ndjson/.jsonl or .parquet)"),
+    downloads: Optional[Path] = typer.Option(None, help="resume_downloads export"),
+    contacts: Optional[Path] = typer.Option(None, help="contact_messages export"),
+    archive_dir: Optional[Path] = typer.Option(None, help="Also read archived views/downloads from this Parquet archive"),
+    output: Optional[Path] = typer.Option(None, help="Write NDJSON rows here instead of stdout"),
+    include_bots: bool = typer.Option(True, help="Count events tagged is_bot"),
+):
+    """Compute the /api/analytics/timeseries series offline with pandas, from exports instead of Mongo"""
+    import pandas as pd
+
+    if granularity not in TIMESERIES_UNITS:
+        raise typer.BadParameter(f"granularity must be one of {', '.join(TIMESERIES_UNITS)}")
+    frames = {}
+    for source, path in (("portfolio_views", views), ("resume_downloads", downloads), ("contact_messages", contacts)):
+        parts = []
+        if path is not None:
+            parts.append(_load_export(path, ROLLUP_SOURCES[source][1]))
+        if archive_dir is not None and source in RETENTION_SOURCES:
+            parts.append(EventArchive(archive_dir).read(source, start, end))
+        parts = [part for part in parts if not part.empty]
+        if parts:
+            frames[source] = pd.concat(parts, ignore_index=True)
+    if not frames:
+        raise typer.BadParameter("Pass at least one export or --archive-dir")
+
+    rows = timeseries_from_frames(frames, granularity, start, end, include_bots=include_bots)
+    lines = (json.dumps(row, default=lambda value: value.isoformat()) for row in rows)
+    if output is None:
+        for line in lines:
+            typer.echo(line)
+    else:
+        output.write_text("".join(line + "\n" for line in lines))
+        typer.echo(f"Wrote {len(rows)} {granularity} buckets to {output}")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,337 @@
+"""In-process metrics in the Prometheus text exposition format
+
+No client library or external collector is needed: metrics live in a
+module-level registry and ``render()`` produces the /metrics payload.
+Under several gunicorn workers each process has its own registry;
+``WorkerExposition`` shares them through a directory so any worker can
+answer a scrape with every worker's samples.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from shared_cache import SharedCache
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labelnames, labels):
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _format_labels(labelnames, key, extra=None):
+    pairs = list(zip(labelnames, key))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def samples(self):
+        """Yield (suffix, label string, value) triples"""
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield "", _format_labels(self.labelnames, key), value
+
+    def render(self):
+        return _render_family(self.name, self.kind, self.documentation, self.samples())
+
+
+def _render_family(name, kind, documentation, samples):
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{suffix}{labels} {_format_value(value)}" for suffix, labels, value in samples)
+    return "\n".join(lines)
+
+
+def _with_label(labels, name, value):
+    """Prepend name="value" to an already formatted label string"""
+    pair = f'{name}="{_escape(value)}"'
+    return "{" + pair + "}" if not labels else "{" + pair + "," + labels[1:]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class CallbackGauge(Metric):
+    """Gauge whose values are read from ``callback()`` at scrape time
+
+    The callback returns either a number or a dict mapping label-value tuples
+    to numbers.
+    """
+    kind = "gauge"
+
+    def __init__(self, name, documentation, callback, labelnames=(), registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.callback = callback
+
+    def samples(self):
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in values.items():
+            yield "", _format_labels(self.labelnames, key), value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield "_bucket", _format_labels(self.labelnames, key, ("le", _format_value(bound))), cumulative
+            yield "_sum", _format_labels(self.labelnames, key), total
+            yield "_count", _format_labels(self.labelnames, key), count
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self):
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+    def collect(self):
+        """Every metric as (name, kind, documentation, [(suffix, labels, value)])"""
+        return [
+            (metric.name, metric.kind, metric.documentation, list(metric.samples()))
+            for metric in self._metrics.values()
+        ]
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render():
+    return REGISTRY.render()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class WorkerExposition:
+    """Every worker's metrics on every scrape, labelled by the worker's pid
+
+    Each worker publishes its samples to ``<directory>/<pid>.json`` (write to
+    temp + rename) every ``interval`` seconds and whenever it answers a
+    scrape. ``render()`` publishes the local samples, then renders the
+    files of every live worker, each sample carrying a ``worker`` label; sum
+    over it in queries. Other workers' samples are at most ``interval``
+    seconds old, and the files of dead workers are removed.
+    """
+
+    def __init__(self, directory, registry=None, interval=5.0):
+        self.directory = Path(directory)
+        self.registry = registry or REGISTRY
+        self.interval = interval
+
+    @property
+    def path(self):
+        return self.directory / f"{os.getpid()}.json"
+
+    def publish(self):
+        SharedCache(self.directory).put(self.path.name, json.dumps(self.registry.collect()).encode())
+
+    def remove(self):
+        self.path.unlink(missing_ok=True)
+
+    def _workers(self):
+        for path in sorted(self.directory.glob("*.json")):
+            pid = int(path.stem) if path.stem.isdigit() else None
+            if pid is None or not _pid_alive(pid):
+                path.unlink(missing_ok=True)
+                continue
+            try:
+                yield path.stem, json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue  # replaced or removed while being read
+
+    def render(self):
+        self.publish()
+        families = {}
+        for worker, collected in self._workers():
+            for name, kind, documentation, samples in collected:
+                family = families.setdefault(name, (kind, documentation, []))
+                family[2].extend((suffix, _with_label(labels, "worker", worker), value) for suffix, labels, value in samples)
+        return "\n".join(
+            _render_family(name, kind, documentation, samples) for name, (kind, documentation, samples) in families.items()
+        ) + "\n"
+
+    async def run(self):
+        """Publish this worker's samples every interval, so scrapes answered elsewhere see them"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.publish)
+            except OSError:
+                pass
+
+
+# Request-level metrics
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+http_requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+
+# Stage timers
+mongo_command_duration_seconds = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ("command", "collection", "outcome")
+)
+mongo_pool_checkout_wait_seconds = Histogram(
+    "mongo_pool_checkout_wait_seconds", "Time spent waiting to check a connection out of the motor pool"
+)
+mongo_pool_checkout_wait_last_seconds = Gauge(
+    "mongo_pool_checkout_wait_last_seconds", "Most recent motor pool checkout wait"
+)
+resume_render_duration_seconds = Histogram(
+    "resume_render_duration_seconds", "Time to obtain a rendered resume artifact on a cache miss", ("format",)
+)
+model_construction_duration_seconds = Histogram(
+    "model_construction_duration_seconds",
+    "Pydantic model construction and validation time",
+    ("model",),
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005),
+)
+event_loop_lag_seconds = Gauge("event_loop_lag_seconds", "How late the event loop ran a scheduled wake-up")
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request duration"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            # Label by route template, never the raw path, to keep cardinality bounded
+            http_request_duration_seconds.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            )
+
+
+def mongo_event_listeners():
+    """Listeners to pass to AsyncIOMotorClient(event_listeners=...); imported lazily to keep pymongo off the import path"""
+    from mongo_monitoring import MongoCommandTimer, PoolCheckoutTimer
+    return [MongoCommandTimer(), PoolCheckoutTimer()]
+
+
+async def monitor_event_loop_lag(interval=0.5):
+    """Sample event-loop lag forever: how much later than requested a sleep returns"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        event_loop_lag_seconds.set(max(0.0, loop.time() - expected))
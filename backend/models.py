@@ -1,10 +1,19 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime
+from time import perf_counter
 import uuid
+from metrics import model_construction_duration_seconds
+
+class TimedModel(BaseModel):
+    """BaseModel that records its construction time in model_construction_duration_seconds"""
+    def __init__(self, **data):
+        started = perf_counter()
+        super().__init__(**data)
+        model_construction_duration_seconds.observe(perf_counter() - started, model=type(self).__name__)
 
 # Contact form model
-class ContactMessage(BaseModel):
+class ContactMessage(TimedModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
     email: EmailStr
@@ -14,25 +23,45 @@ class ContactMessage(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     is_read: bool = False
 
-class ContactMessageCreate(BaseModel):
+class ContactMessageCreate(TimedModel):
     name: str
     email: EmailStr
     company: Optional[str] = None
     subject: str
     message: str
 
+# Bulk triage: each operation applies an action to messages selected by ids and/or filters
+class ContactBulkOperation(TimedModel):
+    action: Literal["mark_read", "mark_unread", "delete"]
+    ids: Optional[List[str]] = Field(default=None, max_length=1000)
+    is_read: Optional[bool] = None
+    email: Optional[str] = None
+    q: Optional[str] = None
+    before: Optional[datetime] = None
+
+class ContactBulkRequest(TimedModel):
+    operations: List[ContactBulkOperation] = Field(min_length=1, max_length=100)
+
 # Portfolio view tracking
-class PortfolioView(BaseModel):
+class PortfolioView(TimedModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     ip_address: str
     user_agent: Optional[str] = None
+    is_bot: bool = False
+    browser_family: Optional[str] = None
+    country: Optional[str] = None
+    asn: Optional[int] = None
     visited_at: datetime = Field(default_factory=datetime.utcnow)
     page_viewed: str = "portfolio"
 
 # Resume download tracking
-class ResumeDownload(BaseModel):
+class ResumeDownload(TimedModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     ip_address: str
     user_agent: Optional[str] = None
+    is_bot: bool = False
+    browser_family: Optional[str] = None
+    country: Optional[str] = None
+    asn: Optional[int] = None
     downloaded_at: datetime = Field(default_factory=datetime.utcnow)
-    download_type: str = "pdf"  # pdf, doc, etc.
\ No newline at end of file
+    download_type: str = "pdf"  # pdf, docx, html, json
\ No newline at end of file
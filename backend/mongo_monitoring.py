@@ -0,0 +1,74 @@
+"""pymongo monitoring listeners feeding the stage timers in metrics.py"""
+import threading
+import time
+
+from pymongo import monitoring
+
+from metrics import (
+    mongo_command_duration_seconds,
+    mongo_pool_checkout_wait_last_seconds,
+    mongo_pool_checkout_wait_seconds,
+)
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """pymongo listener timing every command issued through the motor client"""
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        self._collections[event.request_id] = target if isinstance(target, str) else ""
+
+    def _finish(self, event, outcome):
+        mongo_command_duration_seconds.observe(
+            event.duration_micros / 1_000_000,
+            command=event.command_name,
+            collection=self._collections.pop(event.request_id, ""),
+            outcome=outcome,
+        )
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+
+class PoolCheckoutTimer(monitoring.ConnectionPoolListener):
+    """pymongo listener timing how long operations wait for a pooled connection
+
+    Checkout start and completion are reported on the same worker thread, so a
+    thread-local start time is enough to pair them up.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def _finish(self):
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            wait = time.perf_counter() - started
+            self._local.started = None
+            mongo_pool_checkout_wait_seconds.observe(wait)
+            mongo_pool_checkout_wait_last_seconds.set(wait)
+
+    def connection_checked_out(self, event):
+        self._finish()
+
+    def connection_check_out_failed(self, event):
+        self._finish()
+
+    # Remaining pool events are not needed
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_created(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+    def connection_checked_in(self, event): pass
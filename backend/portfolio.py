@@ -0,0 +1,125 @@
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import orjson
+
+from resume_cache import content_key, etag_for, resume_format_key, variant_key
+from resume_formats import ENCODINGS, RESUME_FORMATS
+from resume_models import load_resume
+
+logger = logging.getLogger(__name__)
+
+# Sub-resources of /api/portfolio: section name -> the Resume fields it carries
+PORTFOLIO_SECTIONS = {
+    "profile": ("name", "headline", "contact", "summary"),
+    "experience": ("experience",),
+    "skills": ("skills",),
+    "education": ("education",),
+    "certifications": ("certifications",),
+    "tech_stack": ("tech_stack",),
+}
+
+
+@dataclass(frozen=True)
+class PortfolioDocument:
+    """Serialized JSON plus every precompressed variant, built once per snapshot"""
+    key: str
+    body: bytes
+    variants: dict = field(default_factory=dict)  # Content-Encoding -> compressed body
+
+    @property
+    def etag(self):
+        return etag_for(self.key)
+
+    def encoded(self, encoding):
+        """(Content-Encoding or None, ETag, body) for the negotiated encoding"""
+        if encoding in self.variants:
+            return encoding, etag_for(variant_key(self.key, encoding)), self.variants[encoding]
+        return None, self.etag, self.body
+
+
+def build_document(content):
+    """Serialize content once and precompress it; variants that would not be smaller are skipped"""
+    body = orjson.dumps(content)
+    variants = {}
+    for encoding, (compress, _) in ENCODINGS.items():
+        compressed = compress(body)
+        if len(compressed) < len(body):
+            variants[encoding] = compressed
+    return PortfolioDocument(key=content_key(b"portfolio", body), body=body, variants=variants)
+
+
+@dataclass(frozen=True)
+class PortfolioSnapshot:
+    """One version of the portfolio content: the validated Resume, its documents and resume format keys"""
+    version: str
+    resume: object
+    documents: dict  # None for the whole portfolio, else a PORTFOLIO_SECTIONS name
+    resume_keys: dict
+
+    def document(self, section=None):
+        return self.documents.get(section)
+
+
+def build_snapshot(resume):
+    content = resume.model_dump(mode="json")
+    version = content_key(b"portfolio", orjson.dumps(content, option=orjson.OPT_SORT_KEYS))[:16]
+    documents = {None: build_document({"version": version, **content})}
+    for section, fields in PORTFOLIO_SECTIONS.items():
+        part = {name: content[name] for name in fields}
+        documents[section] = build_document(part if len(fields) > 1 else part[fields[0]])
+    resume_keys = {fmt: resume_format_key(resume, fmt) for fmt in RESUME_FORMATS}
+    return PortfolioSnapshot(version=version, resume=resume, documents=documents, resume_keys=resume_keys)
+
+
+class PortfolioContent:
+    """The current PortfolioSnapshot of a resume data file, rebuilt when the file changes
+
+    The site (/api/portfolio) and the resume renderers read the same
+    snapshot, so they can never disagree. ``current()`` stats the file at
+    most once per ``check_interval`` seconds (0 disables checking) and
+    rebuilds only when its mtime or size moved; a file that fails to load or
+    validate is logged and the previous snapshot keeps being served.
+    """
+
+    def __init__(self, path, check_interval=2.0, clock=time.monotonic):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self.clock = clock
+        self.stats = {"reloads": 0, "failed_reloads": 0}
+        self._signature = self._stat()
+        self.snapshot = build_snapshot(load_resume(self.path))
+        self._checked_at = clock()
+
+    def _stat(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def current(self):
+        if self.check_interval > 0 and self.clock() - self._checked_at >= self.check_interval:
+            self.refresh()
+        return self.snapshot
+
+    def refresh(self):
+        """Rebuild the snapshot if the file changed; returns True when a new version was loaded"""
+        self._checked_at = self.clock()
+        try:
+            signature = self._stat()
+            if signature == self._signature:
+                return False
+            # A half-written file is retried once its writer finishes, which moves the mtime again
+            self._signature = signature
+            snapshot = build_snapshot(load_resume(self.path))
+        except Exception as e:
+            self.stats["failed_reloads"] += 1
+            logger.warning(f"Keeping portfolio content {self.snapshot.version}; reloading {self.path} failed: {e}")
+            return False
+        changed = snapshot.version != self.snapshot.version
+        if changed:
+            self.snapshot = snapshot
+            self.stats["reloads"] += 1
+            logger.info(f"Loaded portfolio content {snapshot.version} from {self.path}")
+        return changed
@@ -0,0 +1,202 @@
+import fcntl
+import hashlib
+import ipaddress
+import mmap
+import os
+import struct
+import time
+from collections import OrderedDict, namedtuple
+from pathlib import Path
+
+import metrics
+
+# rate: tokens refilled per second; burst: bucket capacity
+RateLimitRule = namedtuple("RateLimitRule", ["rate", "burst"])
+
+rate_limited_requests = metrics.Counter(
+    "rate_limited_requests", "Requests rejected with 429 by the in-app rate limiter", ("route",)
+)
+
+
+def parse_rule(value):
+    """'<requests>/<seconds>[:<burst>]', e.g. '5/60' or '60/60:20'; burst defaults to requests"""
+    spec, _, burst = value.partition(":")
+    requests, _, seconds = spec.partition("/")
+    requests, seconds = float(requests), float(seconds or 1)
+    return RateLimitRule(rate=requests / seconds, burst=float(burst or requests))
+
+
+def parse_networks(value):
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in value.split(",") if part.strip()]
+
+
+def _is_trusted(address, networks):
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def resolve_client_ip(peer, forwarded_for, trusted_proxies):
+    """Client address: the peer, unless it is a trusted proxy, then the nearest untrusted X-Forwarded-For hop"""
+    if not forwarded_for or not _is_trusted(peer, trusted_proxies):
+        return peer
+    hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+    # Walk from the hop closest to us; everything left of the first untrusted hop is client-supplied
+    for hop in reversed(hops):
+        if not _is_trusted(hop, trusted_proxies):
+            return hop
+    return hops[0] if hops else peer
+
+
+class TrustedProxyMiddleware:
+    """Replace scope["client"] with the real client address when the peer is a trusted proxy
+
+    Everything downstream (rate limiting, request.client.host in handlers)
+    then sees the visitor's address instead of nginx's.
+    """
+
+    def __init__(self, app, trusted_proxies=()):
+        self.app = app
+        self.trusted_proxies = list(trusted_proxies)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope.get("client") and self.trusted_proxies:
+            forwarded_for = None
+            for name, value in scope["headers"]:
+                if name == b"x-forwarded-for":
+                    forwarded_for = value.decode("latin-1") if forwarded_for is None else f"{forwarded_for},{value.decode('latin-1')}"
+            if forwarded_for:
+                host, port = scope["client"]
+                client = resolve_client_ip(host, forwarded_for, self.trusted_proxies)
+                # In place, so middleware outside this one sees scope["route"] set by the router
+                if client != host:
+                    scope["client"] = (client, port)
+        await self.app(scope, receive, send)
+
+
+class TokenBuckets:
+    """Per-key token buckets in process memory, at most ``max_entries`` keys (LRU eviction)"""
+
+    def __init__(self, max_entries=100000, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._buckets = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def take(self, key, rule):
+        """Spend one token; returns (allowed, seconds until a token is available)"""
+        now = self.clock()
+        state = self._buckets.get(key)
+        if state is None:
+            tokens = rule.burst
+        else:
+            tokens = min(rule.burst, state[0] + max(0.0, now - state[1]) * rule.rate)
+            self._buckets.move_to_end(key)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_entries:
+            self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / rule.rate
+
+
+class SharedTokenBuckets:
+    """Token buckets in a fixed-size mmap'ed table shared by every worker process
+
+    Each slot is (64-bit key hash, tokens, last update). A key hashes to a
+    group of ``ways`` slots, locked with a byte-range lock while it is
+    updated; a new key takes an empty slot or evicts the least recently
+    updated one in its group. Memory is ``slots * 24`` bytes, whatever the
+    traffic.
+    """
+
+    SLOT = struct.Struct("<Qdd")
+
+    def __init__(self, path, slots=65536, ways=4, clock=time.monotonic):
+        self.path = Path(path)
+        self.ways = ways
+        self.groups = max(1, slots // ways)
+        self.clock = clock
+        size = self.groups * ways * self.SLOT.size
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size != size:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(self._fd).st_size != size:
+                    os.ftruncate(self._fd, size)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, size)
+
+    def take(self, key, rule):
+        digest = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big") or 1
+        group = digest % self.groups
+        offset = group * self.ways * self.SLOT.size
+        length = self.ways * self.SLOT.size
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, length, offset)
+        try:
+            now = self.clock()
+            empty = oldest = None
+            for way in range(self.ways):
+                position = offset + way * self.SLOT.size
+                slot_key, tokens, updated = self.SLOT.unpack_from(self._map, position)
+                if slot_key == digest:
+                    tokens = min(rule.burst, tokens + max(0.0, now - updated) * rule.rate)
+                    break
+                if slot_key == 0:
+                    empty = position if empty is None else empty
+                elif oldest is None or updated < oldest[1]:
+                    oldest = (position, updated)
+            else:
+                position = empty if empty is not None else oldest[0]
+                tokens = rule.burst
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.SLOT.pack_into(self._map, position, digest, tokens, now)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, length, offset)
+        return allowed, 0.0 if allowed else (1 - tokens) / rule.rate
+
+
+class RateLimitMiddleware:
+    """Reject requests over their per-client, per-route token bucket with 429
+
+    Runs before routing, so an over-limit request never reaches body parsing,
+    Pydantic validation or Mongo. ``rules`` maps (method, path) to a
+    RateLimitRule; other routes are not limited.
+    """
+
+    def __init__(self, app, rules=None, store=None):
+        self.app = app
+        self.rules = rules or {}
+        self.store = store if store is not None else TokenBuckets()
+
+    async def __call__(self, scope, receive, send):
+        rule = self.rules.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+        client = scope["client"][0] if scope.get("client") else "unknown"
+        allowed, retry_after = self.store.take(f"{client}|{scope['method']} {scope['path']}", rule)
+        if allowed:
+            await self.app(scope, receive, send)
+            return
+        rate_limited_requests.inc(route=scope["path"])
+        body = b'{"detail":"Too many requests"}'
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, int(retry_after + 0.999))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+
+class RenderPoolSaturated(Exception):
+    """Raised when too many renders are already queued"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Render pool saturated, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class RenderPool:
+    """Bounded process pool for CPU-bound rendering with single-flight coalescing
+
+    Concurrent requests for the same key share one in-flight render, so a burst
+    of identical downloads costs a single render. At most ``max_pending``
+    distinct renders may be queued or running; beyond that callers get
+    RenderPoolSaturated instead of piling more work onto the pool.
+    """
+
+    def __init__(self, max_workers=1, max_pending=8, retry_after=2):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self._executor = None
+        self._inflight = {}
+
+    @property
+    def pending(self):
+        return len(self._inflight)
+
+    def _get_executor(self):
+        if self._executor is None:
+            # spawn keeps the workers free of the parent's event loop and motor threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def run(self, key, fn, *args):
+        """Run fn(*args) in the pool, joining an in-flight render for the same key"""
+        future = self._inflight.get(key)
+        if future is None:
+            if len(self._inflight) >= self.max_pending:
+                raise RenderPoolSaturated(self.retry_after)
+            future = asyncio.ensure_future(self._render(fn, *args))
+            self._inflight[key] = future
+            # Clean up when the render finishes, even if every waiter was cancelled
+            future.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(future)
+
+    async def _render(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # A worker died mid-render (OOM kill, crash): replace the pool and retry once
+            logger.warning("Render pool broken, restarting it")
+            self._discard(executor)
+            executor = self._get_executor()
+            try:
+                return await loop.run_in_executor(executor, fn, *args)
+            except BrokenProcessPool:
+                self._discard(executor)
+                raise
+
+    def _discard(self, executor):
+        # Concurrent renders all see the same broken pool; only the first replaces it
+        if self._executor is executor:
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _forget(self, key, future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,116 @@
+import hashlib
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+
+from shared_cache import SharedCache
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).parent
+
+
+@dataclass(frozen=True)
+class CachedArtifact:
+    """Rendered bytes plus the validators served alongside them"""
+    key: str
+    body: bytes
+    media_type: str
+
+    @property
+    def etag(self):
+        return etag_for(self.key)
+
+
+def etag_for(key):
+    """Strong ETag for a content key, known before anything is rendered"""
+    return f'"{key[:32]}"'
+
+
+def content_key(*parts):
+    """Hash the given strings/bytes into a stable cache key"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def resume_format_key(resume, fmt):
+    """Key for a rendered resume format: the resume content, the renderer source and, for PDF, the ReportLab version"""
+    if fmt == "pdf":
+        import reportlab
+        return content_key(b"resume-pdf", resume.model_dump_json(), (ROOT_DIR / "resume_pdf.py").read_bytes(), reportlab.Version)
+    return content_key(f"resume-{fmt}", resume.model_dump_json(), (ROOT_DIR / "resume_formats.py").read_bytes())
+
+
+def variant_key(key, encoding):
+    """Key (and so ETag) of a precompressed variant of the artifact stored under key"""
+    return content_key(key, encoding)
+
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header against an ETag (RFC 7232)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+class ArtifactCache:
+    """Two-level cache of rendered artifacts keyed by content hash
+
+    The first level is this process's memory; the second is a SharedCache
+    directory that every worker (and restarts) can read, so an artifact
+    rendered by one process is served by all of them without re-rendering.
+    """
+
+    def __init__(self, cache_dir):
+        self.shared = SharedCache(cache_dir)
+        self._memory = {}
+
+    @property
+    def cache_dir(self):
+        return self.shared.directory
+
+    def lookup(self, key, media_type, suffix=""):
+        """Return a cached artifact from memory or the shared cache, or None"""
+        artifact = self._memory.get(key)
+        if artifact is not None:
+            return artifact
+        view = self.shared.get(f"{key}{suffix}")
+        if view is None:
+            return None
+        # One copy per process; Starlette responses need bytes
+        artifact = CachedArtifact(key=key, body=bytes(view), media_type=media_type)
+        self._memory[key] = artifact
+        return artifact
+
+    def store(self, key, body, media_type, suffix=""):
+        """Keep rendered bytes in memory and publish them to the shared cache"""
+        artifact = CachedArtifact(key=key, body=body, media_type=media_type)
+        self._memory[key] = artifact
+        try:
+            self.shared.put(f"{key}{suffix}", body)
+        except OSError as e:
+            logger.warning(f"Could not persist cached artifact {key}: {e}")
+        return artifact
+
+    async def get(self, key, render, media_type, suffix=""):
+        """Return the cached artifact for key, awaiting render() for the bytes on a miss"""
+        artifact = self.lookup(key, media_type, suffix)
+        if artifact is None:
+            body = await render()
+            # Coalesced waiters share one render; only the first one stores it
+            artifact = self._memory.get(key) or self.store(key, body, media_type, suffix)
+        return artifact
@@ -0,0 +1,251 @@
+import gzip
+import io
+import json
+import zipfile
+from collections import namedtuple
+from html import escape
+from xml.sax.saxutils import escape as xml_escape
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are produced without it
+    brotli = None
+
+# render: Resume -> bytes; in_pool: CPU-heavy enough to go through the render pool;
+# compressible: worth serving precompressed gzip/brotli variants
+ResumeFormat = namedtuple(
+    "ResumeFormat", ["render", "media_type", "extension", "disposition", "compressible", "in_pool"]
+)
+
+
+def render_resume_pdf(resume):
+    """Render the PDF, importing ReportLab only on first use (runs inside the render pool)"""
+    from resume_pdf import render_resume_pdf
+    return render_resume_pdf(resume)
+
+
+def render_resume_json(resume):
+    """Render the resume in the JSON Resume schema (https://jsonresume.org/schema)"""
+    document = {
+        "$schema": "https://raw.githubusercontent.com/jsonresume/resume-schema/v1.0.0/schema.json",
+        "basics": {
+            "name": resume.name,
+            "label": resume.headline,
+            "email": resume.contact.email,
+            "summary": resume.summary,
+            "location": {"address": resume.contact.location} if resume.contact.location else {},
+        },
+        "work": [
+            {
+                "name": entry.company,
+                "position": entry.title,
+                "summary": " | ".join(filter(None, [entry.period, entry.employment_type])),
+                "highlights": entry.highlights,
+            }
+            for entry in resume.experience
+        ],
+        "education": [
+            {"institution": entry.institution, "studyType": entry.degree} for entry in resume.education
+        ],
+        "skills": [{"name": group.category, "keywords": group.items} for group in resume.skills],
+        "certificates": [{"name": name} for name in resume.certifications],
+    }
+    return json.dumps(document, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{name} - Resume</title>
+<style>
+body {{ font-family: Helvetica, Arial, sans-serif; max-width: 48rem; margin: 2rem auto; padding: 0 1rem; color: #111; line-height: 1.45; }}
+h1 {{ color: #0000ff; text-align: center; font-size: 2rem; margin-bottom: .25rem; }}
+h2 {{ color: #0000ff; font-size: 1.1rem; margin-top: 1.75rem; }}
+h3 {{ font-size: 1rem; margin-bottom: .1rem; }}
+.headline {{ text-align: center; font-weight: bold; margin-top: 0; }}
+.meta {{ margin-top: 0; color: #444; }}
+ul {{ padding-left: 1.2rem; }}
+</style>
+</head>
+<body>
+<h1>{name_upper}</h1>
+<p class="headline">{headline}</p>
+<p>{contact}</p>
+<h2>PROFESSIONAL SUMMARY</h2>
+<p>{summary}</p>
+<h2>WORK EXPERIENCE</h2>
+{experience}
+<h2>TECHNICAL SKILLS</h2>
+<p>{skills}</p>
+<h2>EDUCATION</h2>
+{education}
+<h2>CERTIFICATIONS</h2>
+<ul>{certifications}</ul>
+</body>
+</html>
+"""
+
+
+def render_resume_html(resume):
+    """Render the resume as a standalone static HTML page"""
+    contact = [f"<b>Email:</b> <a href=\"mailto:{escape(resume.contact.email)}\">{escape(resume.contact.email)}</a>"]
+    if resume.contact.location:
+        contact.append(f"<b>Location:</b> {escape(resume.contact.location)}")
+    if resume.contact.status:
+        contact.append(f"<b>Status:</b> {escape(resume.contact.status)}")
+    experience = "\n".join(
+        f"<h3>{escape(entry.title)} - {escape(entry.company)}</h3>\n"
+        f"<p class=\"meta\">{escape(' | '.join(filter(None, [entry.period, entry.employment_type])))}</p>\n"
+        f"<ul>{''.join(f'<li>{escape(item)}</li>' for item in entry.highlights)}</ul>"
+        for entry in resume.experience
+    )
+    education = "\n".join(
+        f"<h3>{escape(entry.degree)}</h3>\n<p class=\"meta\">{escape(entry.institution)}</p>"
+        for entry in resume.education
+    )
+    page = HTML_TEMPLATE.format(
+        name=escape(resume.name),
+        name_upper=escape(resume.name.upper()),
+        headline=escape(resume.headline),
+        contact="<br>\n".join(contact),
+        summary=escape(resume.summary),
+        experience=experience,
+        skills="<br>\n".join(
+            f"<b>{escape(group.category)}:</b> {escape(', '.join(group.items))}" for group in resume.skills
+        ),
+        education=education,
+        certifications="".join(f"<li>{escape(name)}</li>" for name in resume.certifications),
+    )
+    return page.encode("utf-8")
+
+
+DOCX_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+</Types>"""
+
+DOCX_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+
+DOCX_DOCUMENT = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">
+<w:body>{body}<w:sectPr><w:pgSz w:w="11906" w:h="16838"/><w:pgMar w:top="1440" w:right="1440" w:bottom="360" w:left="1440" w:header="0" w:footer="0" w:gutter="0"/></w:sectPr></w:body>
+</w:document>"""
+
+
+def _docx_paragraph(runs, size=None, color=None, center=False, space_after=None):
+    """One w:p; runs is a list of (text, bold) pairs"""
+    props = ""
+    if center or space_after is not None:
+        props = "<w:pPr>"
+        if space_after is not None:
+            props += f'<w:spacing w:after="{space_after}"/>'
+        if center:
+            props += '<w:jc w:val="center"/>'
+        props += "</w:pPr>"
+    xml_runs = []
+    for text, bold in runs:
+        run_props = ""
+        if bold or size or color:
+            run_props = "<w:rPr>"
+            if bold:
+                run_props += "<w:b/>"
+            if color:
+                run_props += f'<w:color w:val="{color}"/>'
+            if size:
+                run_props += f'<w:sz w:val="{size * 2}"/>'
+            run_props += "</w:rPr>"
+        xml_runs.append(f'<w:r>{run_props}<w:t xml:space="preserve">{xml_escape(text)}</w:t></w:r>')
+    return f"<w:p>{props}{''.join(xml_runs)}</w:p>"
+
+
+def render_resume_docx(resume):
+    """Render the resume as a minimal WordprocessingML (.docx) package, with no extra dependencies"""
+    def heading(text):
+        return _docx_paragraph([(text, True)], size=14, color="0000FF", space_after=120)
+
+    body = [
+        _docx_paragraph([(resume.name.upper(), True)], size=24, color="0000FF", center=True, space_after=300),
+        _docx_paragraph([(resume.headline, True)], size=12),
+        _docx_paragraph([("Email: ", True), (resume.contact.email, False)]),
+    ]
+    if resume.contact.location:
+        body.append(_docx_paragraph([("Location: ", True), (resume.contact.location, False)]))
+    if resume.contact.status:
+        body.append(_docx_paragraph([("Status: ", True), (resume.contact.status, False)]))
+    body += [heading("PROFESSIONAL SUMMARY"), _docx_paragraph([(resume.summary, False)])]
+    body.append(heading("WORK EXPERIENCE"))
+    for entry in resume.experience:
+        body.append(_docx_paragraph([(entry.title, True), (f" - {entry.company}", False)], size=11))
+        body.append(_docx_paragraph([(" | ".join(filter(None, [entry.period, entry.employment_type])), False)]))
+        body.extend(_docx_paragraph([(f"• {item}", False)]) for item in entry.highlights)
+    body.append(heading("TECHNICAL SKILLS"))
+    body.extend(
+        _docx_paragraph([(f"{group.category}: ", True), (", ".join(group.items), False)]) for group in resume.skills
+    )
+    body.append(heading("EDUCATION"))
+    for entry in resume.education:
+        body.append(_docx_paragraph([(entry.degree, True)], size=11))
+        body.append(_docx_paragraph([(entry.institution, False)]))
+    body.append(heading("CERTIFICATIONS"))
+    body.extend(_docx_paragraph([(f"• {name}", False)]) for name in resume.certifications)
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as package:
+        for name, content in (
+            ("[Content_Types].xml", DOCX_CONTENT_TYPES),
+            ("_rels/.rels", DOCX_RELS),
+            ("word/document.xml", DOCX_DOCUMENT.format(body="".join(body))),
+        ):
+            # Fixed timestamps keep the package byte-identical between renders
+            info = zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            package.writestr(info, content.encode("utf-8"))
+    return buffer.getvalue()
+
+
+RESUME_FORMATS = {
+    "pdf": ResumeFormat(render_resume_pdf, "application/pdf", "pdf", "attachment", False, True),
+    "docx": ResumeFormat(
+        render_resume_docx,
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        "docx",
+        "attachment",
+        False,
+        False,
+    ),
+    "html": ResumeFormat(render_resume_html, "text/html; charset=utf-8", "html", "inline", True, False),
+    "json": ResumeFormat(render_resume_json, "application/json", "json", "inline", True, False),
+}
+
+# Content-Encoding -> (compress function, cache file suffix)
+ENCODINGS = {"gzip": (lambda body: gzip.compress(body, compresslevel=9, mtime=0), ".gz")}
+if brotli is not None:
+    ENCODINGS["br"] = (lambda body: brotli.compress(body, quality=11), ".br")
+
+
+def negotiate_encoding(accept_encoding):
+    """Pick the best precompressed encoding the client accepts, or None for identity"""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    for coding in ("br", "gzip"):
+        if coding in ENCODINGS and accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
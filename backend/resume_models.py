@@ -0,0 +1,57 @@
+from pydantic import BaseModel, EmailStr
+from typing import List, Optional
+from pathlib import Path
+import json
+
+DEFAULT_RESUME_PATH = Path(__file__).parent / 'data' / 'resume.json'
+
+# Structured resume content, rendered by resume_pdf.py and served to the site by /api/portfolio
+class ResumeContact(BaseModel):
+    email: EmailStr
+    phone: Optional[str] = None
+    location: Optional[str] = None
+    status: Optional[str] = None
+
+# A project within a position, shown on the site
+class ProjectRole(BaseModel):
+    name: str
+    role: str
+    responsibilities: List[str] = []
+    technologies: List[str] = []
+
+class ExperienceEntry(BaseModel):
+    title: str
+    company: str
+    period: str
+    employment_type: Optional[str] = None
+    summary: Optional[str] = None
+    highlights: List[str] = []
+    projects: List[ProjectRole] = []
+
+class SkillGroup(BaseModel):
+    category: str
+    items: List[str]
+
+class EducationEntry(BaseModel):
+    degree: str
+    institution: str
+
+class Resume(BaseModel):
+    name: str
+    headline: str
+    contact: ResumeContact
+    summary: str
+    experience: List[ExperienceEntry] = []
+    skills: List[SkillGroup] = []
+    education: List[EducationEntry] = []
+    certifications: List[str] = []
+    tech_stack: List[str] = []
+
+    def section_json(self, field):
+        """Canonical JSON of one top-level field, used to key cached flowables"""
+        return json.dumps(self.model_dump(mode="json", include={field})[field], sort_keys=True)
+
+def load_resume(path=DEFAULT_RESUME_PATH):
+    """Load and validate resume content from a JSON file"""
+    with open(path, encoding='utf-8') as f:
+        return Resume.model_validate_json(f.read())
@@ -0,0 +1,145 @@
+import copy
+import io
+from functools import lru_cache
+from xml.sax.saxutils import escape
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.lib.colors import blue
+
+# Top-level resume sections in page order
+SECTIONS = ("header", "contact", "summary", "experience", "skills", "education", "certifications")
+
+
+@lru_cache(maxsize=None)
+def get_styles():
+    """Build the paragraph styles once per process"""
+    styles = getSampleStyleSheet()
+    return {
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            spaceAfter=30,
+            textColor=blue,
+            alignment=1  # Center alignment
+        ),
+        'heading': ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=14,
+            spaceAfter=12,
+            textColor=blue
+        ),
+        'subtitle': styles['Heading3'],
+        'entry': styles['Heading4'],
+        'normal': styles['Normal'],
+    }
+
+
+def _header(resume, styles):
+    return [
+        Paragraph(escape(resume.name.upper()), styles['title']),
+        Paragraph(escape(resume.headline), styles['subtitle']),
+        Spacer(1, 12),
+    ]
+
+
+def _contact(resume, styles):
+    contact = resume.contact
+    lines = [f"<b>Email:</b> {escape(contact.email)}"]
+    if contact.location:
+        lines.append(f"<b>Location:</b> {escape(contact.location)}")
+    if contact.status:
+        lines.append(f"<b>Status:</b> {escape(contact.status)}")
+    return [Paragraph("<br/>".join(lines), styles['normal']), Spacer(1, 20)]
+
+
+def _summary(resume, styles):
+    return [
+        Paragraph("PROFESSIONAL SUMMARY", styles['heading']),
+        Paragraph(escape(resume.summary), styles['normal']),
+        Spacer(1, 20),
+    ]
+
+
+def _experience(resume, styles):
+    story = [Paragraph("WORK EXPERIENCE", styles['heading'])]
+    for i, entry in enumerate(resume.experience):
+        story.append(Paragraph(f"<b>{escape(entry.title)}</b> - {escape(entry.company)}", styles['entry']))
+        period = entry.period if not entry.employment_type else f"{entry.period} | {entry.employment_type}"
+        story.append(Paragraph(escape(period), styles['normal']))
+        if entry.highlights:
+            story.append(Paragraph("<br/>".join(f"• {escape(item)}" for item in entry.highlights), styles['normal']))
+        story.append(Spacer(1, 20 if i == len(resume.experience) - 1 else 15))
+    return story
+
+
+def _skills(resume, styles):
+    lines = [f"<b>{escape(group.category)}:</b> {escape(', '.join(group.items))}" for group in resume.skills]
+    return [
+        Paragraph("TECHNICAL SKILLS", styles['heading']),
+        Paragraph("<br/>".join(lines), styles['normal']),
+        Spacer(1, 20),
+    ]
+
+
+def _education(resume, styles):
+    story = [Paragraph("EDUCATION", styles['heading'])]
+    for entry in resume.education:
+        story.append(Paragraph(f"<b>{escape(entry.degree)}</b>", styles['entry']))
+        story.append(Paragraph(escape(entry.institution), styles['normal']))
+    story.append(Spacer(1, 15))
+    return story
+
+
+def _certifications(resume, styles):
+    story = [Paragraph("CERTIFICATIONS", styles['heading'])]
+    story.extend(Paragraph(f"• {escape(name)}", styles['normal']) for name in resume.certifications)
+    return story
+
+
+SECTION_BUILDERS = {
+    "header": (_header, ("name", "headline")),
+    "contact": (_contact, ("contact",)),
+    "summary": (_summary, ("summary",)),
+    "experience": (_experience, ("experience",)),
+    "skills": (_skills, ("skills",)),
+    "education": (_education, ("education",)),
+    "certifications": (_certifications, ("certifications",)),
+}
+
+# section -> (content fingerprint, flowables); lives for the life of the (pool) process
+_section_cache = {}
+
+
+def section_flowables(resume, section):
+    """Flowables for one section, rebuilt only when that section's content changed"""
+    build, fields = SECTION_BUILDERS[section]
+    fingerprint = tuple(resume.section_json(field) for field in fields)
+    cached = _section_cache.get(section)
+    if cached is None or cached[0] != fingerprint:
+        cached = _section_cache[section] = (fingerprint, build(resume, get_styles()))
+    # Layout stores per-build state on each flowable, so hand out shallow copies
+    return [copy.copy(flowable) for flowable in cached[1]]
+
+
+def generate_resume_pdf(resume):
+    """Generate a professional resume PDF"""
+    buffer = io.BytesIO()
+    # invariant=1 keeps the output byte-identical between renders so the
+    # bytes can be cached and served under a strong ETag
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18, invariant=1)
+
+    story = []
+    for section in SECTIONS:
+        story.extend(section_flowables(resume, section))
+
+    doc.build(story)
+    buffer.seek(0)
+    return buffer
+
+
+def render_resume_pdf(resume):
+    """Render the resume and return the raw PDF bytes (picklable for worker processes)"""
+    return generate_resume_pdf(resume).getvalue()
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# collection -> (timestamp field, archived columns)
+RETENTION_SOURCES = {
+    "portfolio_views": ("visited_at", (
+        "id", "ip_address", "user_agent", "is_bot", "browser_family", "country", "asn", "visited_at", "page_viewed",
+    )),
+    "resume_downloads": ("downloaded_at", (
+        "id", "ip_address", "user_agent", "is_bot", "browser_family", "country", "asn", "downloaded_at", "download_type",
+    )),
+}
+
+
+def retention_cutoff(days, now=None):
+    """Start of the oldest day of raw events kept in Mongo; archive-events moves everything before it"""
+    now = now or datetime.utcnow()
+    return now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+
+
+def partition_dir(root, collection, day):
+    """Hive-style partition: <root>/<collection>/date=YYYY-MM-DD"""
+    return Path(root) / collection / f"date={day:%Y-%m-%d}"
+
+
+def _dedupe(frame):
+    """Drop rows repeating an event id (events archived twice after an interrupted run)"""
+    return frame[frame["id"].isna() | ~frame.duplicated(subset="id")]
+
+
+def _day(timestamp):
+    return datetime(timestamp.year, timestamp.month, timestamp.day)
+
+
+class EventArchive:
+    """Date-partitioned, compressed Parquet archive of raw analytics events
+
+    ``archive`` moves events older than a cutoff out of Mongo: each batch is
+    written to one Parquet file per day (temp file + rename) before its
+    documents are deleted, so a crash can only leave an event in both places,
+    never in neither. Part files are named after the first and last ``_id``
+    of their batch, and readers drop duplicate ids.
+    """
+
+    def __init__(self, root, compression="zstd"):
+        self.root = Path(root)
+        self.compression = compression
+
+    def _write_part(self, collection, day, rows, name):
+        import pandas as pd
+
+        _, columns = RETENTION_SOURCES[collection]
+        directory = partition_dir(self.root, collection, day)
+        directory.mkdir(parents=True, exist_ok=True)
+        frame = pd.DataFrame.from_records(rows, columns=list(columns))
+        path = directory / f"{name}.parquet"
+        tmp_path = directory / f".{name}.parquet.tmp"
+        frame.to_parquet(tmp_path, index=False, compression=self.compression)
+        with open(tmp_path, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return path
+
+    async def archive(self, db, collection, cutoff, batch_size=5000, codec=None):
+        """Export events older than cutoff to Parquet, then delete them; returns the number moved"""
+        time_field, columns = RETENTION_SOURCES[collection]
+        moved = 0
+        while True:
+            batch = await (
+                db[collection].find({time_field: {"$lt": cutoff}})
+                .sort([(time_field, 1), ("_id", 1)])
+                .limit(batch_size)
+                .to_list(batch_size)
+            )
+            if not batch:
+                return moved
+            ids = [doc["_id"] for doc in batch]
+            documents = await codec.decode(collection, batch) if codec is not None else batch
+            by_day = {}
+            for document in documents:
+                row = {column: document.get(column) for column in columns}
+                by_day.setdefault(_day(document[time_field]), []).append(row)
+            name = f"part-{ids[0]}-{ids[-1]}"
+            for day, rows in by_day.items():
+                await asyncio.to_thread(self._write_part, collection, day, rows, name)
+            for start in range(0, len(ids), 1000):
+                await db[collection].delete_many({"_id": {"$in": ids[start:start + 1000]}})
+            moved += len(ids)
+            logger.info(f"Archived {moved} {collection} events older than {cutoff:%Y-%m-%d}")
+
+    def days(self, collection):
+        """Partition days archived for collection, oldest first"""
+        base = self.root / collection
+        if not base.is_dir():
+            return []
+        return [datetime.strptime(directory.name[len("date="):], "%Y-%m-%d") for directory in sorted(base.glob("date=*"))]
+
+    def archived_until(self, collection, start=None, end=None):
+        """End of the last archived day of collection overlapping [start, end), or None if there is none"""
+        days = [
+            day for day in self.days(collection)
+            if (start is None or day + timedelta(days=1) > start) and (end is None or day < end)
+        ]
+        return days[-1] + timedelta(days=1) if days else None
+
+    def partitions(self, collection, start=None, end=None):
+        """Parquet files for collection whose partition day overlaps [start, end)"""
+        base = self.root / collection
+        if not base.is_dir():
+            return []
+        files = []
+        for directory in sorted(base.glob("date=*")):
+            day = datetime.strptime(directory.name[len("date="):], "%Y-%m-%d")
+            if (start is None or day + timedelta(days=1) > start) and (end is None or day < end):
+                files.extend(sorted(directory.glob("*.parquet")))
+        return files
+
+    def read(self, collection, start=None, end=None):
+        """Archived events in [start, end) as a DataFrame"""
+        import pandas as pd
+
+        time_field, columns = RETENTION_SOURCES[collection]
+        files = self.partitions(collection, start, end)
+        if not files:
+            return pd.DataFrame(columns=list(columns))
+        frame = pd.concat([pd.read_parquet(path) for path in files], ignore_index=True)
+        if start is not None:
+            frame = frame[frame[time_field] >= start]
+        if end is not None:
+            frame = frame[frame[time_field] < end]
+        return _dedupe(frame).reset_index(drop=True)
+
+
+def frame_records(frame):
+    """Rows of an archived frame as plain dicts: nulls as None, timestamps as datetime"""
+    import pandas as pd
+
+    records = []
+    for row in frame.astype(object).to_dict("records"):
+        for column, value in row.items():
+            if value is None or value is pd.NaT or (isinstance(value, float) and value != value):
+                row[column] = None
+            elif isinstance(value, pd.Timestamp):
+                row[column] = value.to_pydatetime()
+        records.append(row)
+    return records
+
+
+async def load_events(db, archive, collection, start=None, end=None, codec=None):
+    """Events in [start, end) from hot Mongo data and cold Parquet partitions, as one DataFrame"""
+    import pandas as pd
+
+    time_field, columns = RETENTION_SOURCES[collection]
+    query = {}
+    if start is not None or end is not None:
+        query[time_field] = {}
+        if start is not None:
+            query[time_field]["$gte"] = start
+        if end is not None:
+            query[time_field]["$lt"] = end
+    hot = await db[collection].find(query, {"_id": 0}).to_list(None)
+    if codec is not None:
+        hot = await codec.decode(collection, hot)
+    hot_frame = pd.DataFrame.from_records(
+        [{column: document.get(column) for column in columns} for document in hot], columns=list(columns)
+    )
+    cold_frame = await asyncio.to_thread(archive.read, collection, start, end)
+    frames = [frame for frame in (cold_frame, hot_frame) if not frame.empty]
+    if not frames:
+        return hot_frame
+    combined = pd.concat(frames, ignore_index=True)
+    return _dedupe(combined).sort_values(time_field).reset_index(drop=True)
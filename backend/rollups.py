@@ -0,0 +1,253 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from compact_events import unpack_uuid
+from retention import RETENTION_SOURCES, frame_records
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_COLLECTION = "analytics_rollups"
+
+# source collection -> (metric name, timestamp field, breakdown field)
+ROLLUP_SOURCES = {
+    "portfolio_views": ("views", "visited_at", "page_viewed"),
+    "resume_downloads": ("downloads", "downloaded_at", "download_type"),
+    "contact_messages": ("contacts", "created_at", None),
+}
+
+GRANULARITIES = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+
+class BackfillConflict(RuntimeError):
+    """Events were written while rollups were being rebuilt, so swapping them in would lose counts"""
+
+
+def truncate(timestamp, granularity):
+    """Start of the hour/day bucket containing timestamp"""
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def rollup_id(metric, granularity, bucket=None):
+    if bucket is None:
+        return f"{metric}|total"
+    return f"{metric}|{granularity}|{bucket.isoformat()}"
+
+
+def _breakdown_key(value):
+    # Field names may not contain '.' or start with '$'
+    return str(value or "unknown").replace(".", "_").replace("$", "_")
+
+
+def rollup_updates(collection, documents, sign=1):
+    """Coalesce a batch of raw events into one $inc upsert per rollup document (sign=-1 to retract them)"""
+    from pymongo import UpdateOne
+
+    metric, time_field, dim_field = ROLLUP_SOURCES[collection]
+    increments = defaultdict(lambda: defaultdict(int))
+    buckets = {}
+    for document in documents:
+        dim = _breakdown_key(document.get(dim_field)) if dim_field else None
+        bot = bool(document.get("is_bot"))
+        country = document.get("country")
+        keys = [(rollup_id(metric, "total"), "total", None)]
+        timestamp = document.get(time_field)
+        if timestamp is not None:
+            for granularity in GRANULARITIES:
+                bucket = truncate(timestamp, granularity)
+                keys.append((rollup_id(metric, granularity, bucket), granularity, bucket))
+        for _id, granularity, bucket in keys:
+            buckets[_id] = (granularity, bucket)
+            increments[_id]["count"] += 1
+            if dim is not None:
+                increments[_id][f"breakdown.{dim}"] += 1
+            # Bot traffic is counted in count/breakdown and again in bots, so it can be subtracted
+            if country:
+                increments[_id][f"countries.{_breakdown_key(country)}"] += 1
+            if bot:
+                increments[_id]["bots"] += 1
+                if dim is not None:
+                    increments[_id][f"bots_breakdown.{dim}"] += 1
+                if country:
+                    increments[_id][f"bots_countries.{_breakdown_key(country)}"] += 1
+
+    return [
+        UpdateOne(
+            {"_id": _id},
+            {
+                "$inc": {field: count * sign for field, count in increments[_id].items()},
+                "$setOnInsert": {"metric": metric, "granularity": granularity, "bucket": bucket},
+            },
+            upsert=True,
+        )
+        for _id, (granularity, bucket) in buckets.items()
+    ]
+
+
+def _without_bots(breakdown, bots_breakdown):
+    if not breakdown or not bots_breakdown:
+        return breakdown
+    humans = {dim: count - bots_breakdown.get(dim, 0) for dim, count in breakdown.items()}
+    return {dim: count for dim, count in humans.items() if count}
+
+
+def series_query(granularity, start, end):
+    """Filter for the rollup documents of one granularity between start and end (sorted by bucket)"""
+    return {
+        "granularity": granularity,
+        "bucket": {"$gte": truncate(start, granularity), "$lt": end},
+    }
+
+
+class AnalyticsRollups:
+    """Per-hour, per-day and lifetime counters maintained incrementally with $inc upserts"""
+
+    def __init__(self, db=None, collection_name=ROLLUP_COLLECTION):
+        self.db = db
+        self.collection_name = collection_name
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name]
+
+    async def record(self, collection, documents):
+        """Fold newly written events into the rollups (usable as an EventBuffer flush hook)"""
+        if collection not in ROLLUP_SOURCES or not documents:
+            return
+        await self.collection.bulk_write(rollup_updates(collection, documents), ordered=False)
+
+    async def retract(self, collection, documents):
+        """Take deleted events back out of the rollups"""
+        if collection not in ROLLUP_SOURCES or not documents:
+            return
+        await self.collection.bulk_write(rollup_updates(collection, documents, sign=-1), ordered=False)
+
+    async def totals(self, include_bots=True):
+        """Lifetime totals per metric, read from one document each"""
+        ids = [rollup_id(metric, "total") for metric, _, _ in ROLLUP_SOURCES.values()]
+        docs = {doc["_id"]: doc async for doc in self.collection.find({"_id": {"$in": ids}})}
+        totals = {}
+        for source, (metric, _, _) in ROLLUP_SOURCES.items():
+            doc = docs.get(rollup_id(metric, "total"))
+            if doc is None:
+                # Not backfilled yet: fall back to collection metadata rather than a scan
+                totals[metric] = await self.db[source].estimated_document_count()
+            else:
+                totals[metric] = doc.get("count", 0) - (0 if include_bots else doc.get("bots", 0))
+        return totals
+
+    async def country_totals(self, include_bots=True):
+        """Lifetime counts per metric and country (of the events that could be located)"""
+        ids = [rollup_id(metric, "total") for metric, _, _ in ROLLUP_SOURCES.values()]
+        countries = {}
+        async for doc in self.collection.find({"_id": {"$in": ids}}, {"metric": 1, "countries": 1, "bots_countries": 1}):
+            by_country = doc.get("countries") or {}
+            if not include_bots:
+                by_country = _without_bots(by_country, doc.get("bots_countries"))
+            countries[doc["metric"]] = by_country
+        return countries
+
+    async def series(self, granularity, start, end, include_bots=True, countries=False):
+        """Bucketed counts per metric between start and end (one document per metric and bucket)"""
+        query = series_query(granularity, start, end)
+        rows = {}
+        async for doc in self.collection.find(query).sort("bucket", 1):
+            row = rows.get(doc["bucket"])
+            if row is None:
+                row = rows[doc["bucket"]] = {"bucket": doc["bucket"]}
+                row.update({metric: 0 for metric, _, _ in ROLLUP_SOURCES.values()})
+            row[doc["metric"]] = doc.get("count", 0)
+            breakdown = doc.get("breakdown")
+            if not include_bots:
+                row[doc["metric"]] -= doc.get("bots", 0)
+                breakdown = _without_bots(breakdown, doc.get("bots_breakdown"))
+            if breakdown:
+                row[f"{doc['metric']}_breakdown"] = breakdown
+            if countries:
+                by_country = doc.get("countries") or {}
+                if not include_bots:
+                    by_country = _without_bots(by_country, doc.get("bots_countries"))
+                row[f"{doc['metric']}_countries"] = by_country
+        return list(rows.values())
+
+    async def _recent_event_source(self, since):
+        """The first raw collection holding an event timestamped at or after since, if any"""
+        for source, (_, time_field, _) in ROLLUP_SOURCES.items():
+            if await self.db[source].find_one({time_field: {"$gte": since}}, {"_id": 1}) is not None:
+                return source
+        return None
+
+    async def _archived_events(self, archive, source):
+        """Archived events of source, one day partition at a time, minus those also still in Mongo
+
+        An interrupted archive run can leave an event in both places; the
+        copy in Mongo is the one the raw pass counts.
+        """
+        time_field, _ = RETENTION_SOURCES[source]
+        for day in archive.days(source):
+            end = day + timedelta(days=1)
+            frame = await asyncio.to_thread(archive.read, source, day, end)
+            if frame.empty:
+                continue
+            hot_ids = {
+                unpack_uuid(doc.get("id"))
+                async for doc in self.db[source].find({time_field: {"$gte": day, "$lt": end}}, {"_id": 0, "id": 1})
+            }
+            yield [row for row in frame_records(frame) if row.get("id") is None or row["id"] not in hot_ids]
+
+    async def backfill(self, batch_size=1000, quiet_period=timedelta(minutes=1), clock=datetime.utcnow, archive=None):
+        """Rebuild every rollup from the raw collections, then swap it in atomically
+
+        Views and downloads moved out of Mongo by 'manage.py archive-events'
+        are read back from ``archive`` (an EventArchive); pass it whenever
+        partitions exist, or their history is dropped from the rollups.
+
+        Live $inc writes that land on the old collection during the rebuild
+        would be lost by the swap, so ingest (including spool replay) must
+        be stopped first. As a guard, the rebuild refuses to start when any
+        event is newer than ``quiet_period``, and is discarded instead of
+        swapped in when events arrived while it ran; both raise
+        BackfillConflict. A zero ``quiet_period`` skips the checks.
+        """
+        started = clock()
+        if quiet_period:
+            source = await self._recent_event_source(started - quiet_period)
+            if source is not None:
+                raise BackfillConflict(f"{source} received events in the last {quiet_period}; stop ingest before backfilling")
+        staging = self.db[f"{self.collection_name}_rebuild"]
+        await staging.drop()
+        for source, (_, time_field, dim_field) in ROLLUP_SOURCES.items():
+            projection = {"_id": 0, time_field: 1, "is_bot": 1, "country": 1}
+            if dim_field:
+                projection[dim_field] = 1
+            batch = []
+            processed = 0
+            async for document in self.db[source].find({}, projection).batch_size(batch_size):
+                batch.append(document)
+                if len(batch) >= batch_size:
+                    await staging.bulk_write(rollup_updates(source, batch), ordered=False)
+                    processed += len(batch)
+                    batch = []
+            if batch:
+                await staging.bulk_write(rollup_updates(source, batch), ordered=False)
+                processed += len(batch)
+            archived = 0
+            if archive is not None and source in RETENTION_SOURCES:
+                async for rows in self._archived_events(archive, source):
+                    for start in range(0, len(rows), batch_size):
+                        await staging.bulk_write(rollup_updates(source, rows[start:start + batch_size]), ordered=False)
+                    archived += len(rows)
+            logger.info(f"Backfilled rollups from {processed} {source} documents and {archived} archived events")
+        if quiet_period:
+            source = await self._recent_event_source(started - quiet_period)
+            if source is not None:
+                await staging.drop()
+                raise BackfillConflict(f"{source} received events during the backfill; stop ingest and retry")
+        if await staging.estimated_document_count():
+            await staging.rename(self.collection_name, dropTarget=True)
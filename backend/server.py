@@ -1,38 +1,245 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Request, Response
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
+import hmac
 import logging
 from pathlib import Path
-from models import ContactMessage, ContactMessageCreate, PortfolioView, ResumeDownload
-from typing import List
+from contextlib import asynccontextmanager
+from models import ContactBulkRequest, ContactMessage, ContactMessageCreate, PortfolioView, ResumeDownload
+from typing import Literal, Optional
 import uuid
 from datetime import datetime
-import io
 import base64
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.colors import black, blue, gray
-from reportlab.lib.units import inch
+import orjson
+from portfolio import PORTFOLIO_SECTIONS, PortfolioContent
+from resume_models import DEFAULT_RESUME_PATH
+from resume_cache import ArtifactCache, etag_for, etag_matches, variant_key
+from resume_formats import ENCODINGS, RESUME_FORMATS, negotiate_encoding
+from render_pool import RenderPool, RenderPoolSaturated
+from shared_cache import SharedCache, default_shared_dir
+from ingest import EventBuffer
+from circuit_breaker import CircuitBreaker
+from spool import Spool, SpoolReplayer
+from compact_events import EventCodec, UserAgentDirectory
+import metrics
+from live import LiveAnalytics
+from rollups import AnalyticsRollups, GRANULARITIES, truncate
+from indexes import reconcile_indexes
+from rate_limit import (
+    RateLimitMiddleware,
+    SharedTokenBuckets,
+    TokenBuckets,
+    TrustedProxyMiddleware,
+    parse_networks,
+    parse_rule,
+)
+from user_agents import UserAgentClassifier
+from geoip import GeoIPEnricher, open_database
+from timeseries import TIMESERIES_UNITS, TimeseriesCache, bucket_start, query_timeseries, to_naive_utc
+from visitors import SharedTTLCache, TTLCache, UniqueVisitors
+from retention import RETENTION_SOURCES, EventArchive
+from contact_queries import (
+    CONTACT_SORT,
+    contact_bulk_requests,
+    contact_messages_filter,
+    contact_messages_projection,
+    contact_search_pipeline,
+    contact_selection,
+    encode_cursor,
+    encode_search_cursor,
+)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# MongoDB connection, created in the lifespan handler so importing the app stays cheap
+client = None
+db = None
+
+def connect_mongo():
+    global client, db
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], event_listeners=metrics.mongo_event_listeners())
+    db = client[os.environ['DB_NAME']]
+
+# Resume and site content is data (data/resume.json), validated and serialized once per version;
+# the file is re-checked every PORTFOLIO_CHECK_INTERVAL seconds and reloaded when it changes
+portfolio_content = PortfolioContent(
+    os.environ.get('RESUME_DATA_PATH', DEFAULT_RESUME_PATH),
+    check_interval=float(os.environ.get('PORTFOLIO_CHECK_INTERVAL', '2')),
+)
+PORTFOLIO_CACHE_MAX_AGE = int(os.environ.get('PORTFOLIO_CACHE_MAX_AGE', '300'))
+
+# Cache directory shared by every worker process (tmpfs when available)
+SHARED_CACHE_DIR = Path(os.environ.get('SHARED_CACHE_DIR', default_shared_dir(ROOT_DIR / '.cache' / 'shared')))
+
+# Rendered resume artifacts, cached in memory and in the shared cache by content hash
+resume_cache = ArtifactCache(os.environ.get('RESUME_CACHE_DIR', SHARED_CACHE_DIR / 'resume'))
+RESUME_CACHE_MAX_AGE = int(os.environ.get('RESUME_CACHE_MAX_AGE', '86400'))
+
+# Process pool for ReportLab renders so they never run on the event loop
+render_pool = RenderPool(
+    max_workers=int(os.environ.get('RENDER_POOL_WORKERS', '1')),
+    max_pending=int(os.environ.get('RENDER_POOL_MAX_PENDING', '8')),
+    retry_after=int(os.environ.get('RENDER_POOL_RETRY_AFTER', '2')),
+)
+
+# Opt-in compact storage for views/downloads: binary UUIDs and IPs, interned user agents
+COMPACT_EVENTS = os.environ.get('ANALYTICS_COMPACT_SCHEMA', 'false').lower() in ('1', 'true', 'yes')
+user_agent_directory = UserAgentDirectory(max_entries=int(os.environ.get('USER_AGENT_CACHE_SIZE', '10000')))
+event_codec = EventCodec(user_agent_directory)
+event_encoder = event_codec.encode if COMPACT_EVENTS else None
+
+# Events are tagged bot/human and by browser family at ingest, from a memoized matcher
+user_agent_classifier = UserAgentClassifier(max_entries=int(os.environ.get('USER_AGENT_CLASSIFIER_CACHE_SIZE', '10000')))
+# 'record' stores bot views/downloads tagged is_bot; 'skip' serves bots without recording anything
+BOT_POLICY = os.environ.get('BOT_POLICY', 'record')
+# Whether /api/analytics and /api/analytics/timeseries leave out bot traffic unless asked otherwise;
+# off by default so the totals stay those of every recorded event
+ANALYTICS_EXCLUDE_BOTS = os.environ.get('ANALYTICS_EXCLUDE_BOTS', 'false').lower() in ('1', 'true', 'yes')
+
+# Country/ASN enrichment at ingest from a local, memory-mapped database (range file or .mmdb); off when unset
+GEOIP_DATABASE = os.environ.get('GEOIP_DATABASE')
+geoip_database = None
+if GEOIP_DATABASE:
+    try:
+        geoip_database = open_database(GEOIP_DATABASE, os.environ.get('GEOIP_ASN_DATABASE'))
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"GeoIP enrichment disabled, cannot open {GEOIP_DATABASE}: {e}")
+geoip = GeoIPEnricher(geoip_database, max_entries=int(os.environ.get('GEOIP_CACHE_SIZE', '50000')))
+
+# Writes fail fast while Mongo is down or stalling...
+mongo_breaker = CircuitBreaker(
+    failure_threshold=int(os.environ.get('MONGO_BREAKER_FAILURES', '5')),
+    reset_timeout=float(os.environ.get('MONGO_BREAKER_RESET', '10')),
+    call_timeout=float(os.environ.get('MONGO_WRITE_TIMEOUT', '2')),
+)
+
+# ...and land in a local write-ahead spool that is replayed once it recovers
+write_spool = Spool(
+    os.environ.get('SPOOL_DIR', ROOT_DIR / '.cache' / 'spool'),
+    segment_bytes=int(os.environ.get('SPOOL_SEGMENT_BYTES', str(4 * 1024 * 1024))),
+    fsync_interval=float(os.environ.get('SPOOL_FSYNC_INTERVAL', '0.05')),
+)
+spool_replayer = SpoolReplayer(
+    write_spool,
+    mongo_breaker,
+    batch_size=int(os.environ.get('SPOOL_REPLAY_BATCH_SIZE', '500')),
+    interval=float(os.environ.get('SPOOL_REPLAY_INTERVAL', '5')),
+    encoder=event_encoder,
+)
+
+# Buffered, batched writes for fire-and-forget analytics events
+event_buffer = EventBuffer(
+    max_size=int(os.environ.get('INGEST_QUEUE_SIZE', '10000')),
+    batch_size=int(os.environ.get('INGEST_BATCH_SIZE', '500')),
+    flush_interval=float(os.environ.get('INGEST_FLUSH_INTERVAL', '1.0')),
+    breaker=mongo_breaker,
+    spool=write_spool,
+    encoder=event_encoder,
+)
+
+# Incrementally maintained analytics counters, fed by the event buffer
+analytics_rollups = AnalyticsRollups()
+event_buffer.add_flush_hook(analytics_rollups.record)
+spool_replayer.add_flush_hook(analytics_rollups.record)
+ANALYTICS_MAX_BUCKETS = int(os.environ.get('ANALYTICS_MAX_BUCKETS', '1000'))
+# Parquet archive written by 'manage.py archive-events'; timeseries ranges it covers are rejected
+event_archive = EventArchive(os.environ.get('EVENT_ARCHIVE_DIR', ROOT_DIR / 'archive'))
+
+# Per-bucket cache for /api/analytics/timeseries, invalidated as events are written
+timeseries_cache = TimeseriesCache(
+    ttl=float(os.environ.get('ANALYTICS_TIMESERIES_TTL', '30')),
+    max_entries=int(os.environ.get('ANALYTICS_TIMESERIES_CACHE_SIZE', '20000')),
+)
+event_buffer.add_flush_hook(timeseries_cache.invalidate)
+spool_replayer.add_flush_hook(timeseries_cache.invalidate)
+
+# /api/analytics/stream: in-process counters pushed to every dashboard once per tick
+live_analytics = LiveAnalytics(
+    analytics_rollups,
+    tick=float(os.environ.get('ANALYTICS_STREAM_TICK', '1')),
+    keepalive=float(os.environ.get('ANALYTICS_STREAM_KEEPALIVE', '15')),
+    resync_interval=float(os.environ.get('ANALYTICS_STREAM_RESYNC', '30')),
+    max_subscribers=int(os.environ.get('ANALYTICS_STREAM_MAX_CLIENTS', '100')),
+    client_buffer=int(os.environ.get('ANALYTICS_STREAM_CLIENT_BUFFER', '32')),
+)
+event_buffer.add_flush_hook(live_analytics.record)
+spool_replayer.add_flush_hook(live_analytics.record)
+
+# The plain /api/analytics summary is computed once per TTL and shared by all workers
+snapshots = SharedCache(SHARED_CACHE_DIR / 'snapshots')
+ANALYTICS_SNAPSHOT_TTL = float(os.environ.get('ANALYTICS_SNAPSHOT_TTL', '2'))
+
+# Repeat views of a page by the same visitor within the window are not stored; 'shared' keeps the
+# window in the shared cache directory so repeats are caught whichever worker serves them
+VIEW_DEDUP_WINDOW = float(os.environ.get('VIEW_DEDUP_WINDOW', '300'))
+if os.environ.get('VIEW_DEDUP_BACKEND', 'shared') == 'shared':
+    recent_views = SharedTTLCache(
+        SHARED_CACHE_DIR / 'view_dedup.slots',
+        ttl=VIEW_DEDUP_WINDOW,
+        slots=int(os.environ.get('VIEW_DEDUP_MAX_ENTRIES', '131072')),
+    )
+else:
+    recent_views = TTLCache(
+        ttl=VIEW_DEDUP_WINDOW,
+        max_entries=int(os.environ.get('VIEW_DEDUP_MAX_ENTRIES', '100000')),
+    )
 
-# Create the main app
-app = FastAPI(title="Nikhil Kumar Bandi - Portfolio API")
+# Per-day HyperLogLog of distinct visitors, persisted to visitor_sketches
+unique_visitors = UniqueVisitors()
+VISITOR_SKETCH_PERSIST_INTERVAL = float(os.environ.get('VISITOR_SKETCH_PERSIST_INTERVAL', '30'))
+
+# Per-client token buckets for the endpoints that write to Mongo; 'off' disables a rule
+RATE_LIMITS = {
+    ("POST", "/api/contact"): os.environ.get('RATE_LIMIT_CONTACT', '5/60'),
+    ("POST", "/api/track-view"): os.environ.get('RATE_LIMIT_TRACK_VIEW', '60/60:20'),
+    ("GET", "/api/download-resume"): os.environ.get('RATE_LIMIT_DOWNLOAD', '30/60:10'),
+    ("POST", "/api/contact-messages/bulk"): os.environ.get('RATE_LIMIT_ADMIN_BULK', '30/60'),
+}
+RATE_LIMIT_RULES = {route: parse_rule(rule) for route, rule in RATE_LIMITS.items() if rule != 'off'}
+# 'shared' keeps the buckets in the shared cache directory so limits hold across workers
+if os.environ.get('RATE_LIMIT_BACKEND', 'memory') == 'shared':
+    rate_limit_store = SharedTokenBuckets(
+        SHARED_CACHE_DIR / 'rate_limit.buckets', slots=int(os.environ.get('RATE_LIMIT_MAX_CLIENTS', '65536'))
+    )
+else:
+    rate_limit_store = TokenBuckets(max_entries=int(os.environ.get('RATE_LIMIT_MAX_CLIENTS', '65536')))
+
+# Shared secret for the contact admin endpoints (search, bulk triage, export), sent as X-Admin-Token;
+# when unset those endpoints are disabled
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+# Proxies (nginx) whose X-Forwarded-For is believed when resolving the client address;
+# docker-compose.yml sets this to the nginx container's fixed address
+TRUSTED_PROXIES = parse_networks(os.environ.get('TRUSTED_PROXIES', '127.0.0.1/32,::1/128'))
+
+# Create/update the indexes declared in indexes.py in the background at startup
+ENSURE_INDEXES_ON_START = os.environ.get('ENSURE_INDEXES_ON_START', 'true').lower() in ('1', 'true', 'yes')
+
+# Pre-render resume artifacts in the background once the app is up
+WARMUP_ON_START = os.environ.get('WARMUP_ON_START', 'false').lower() in ('1', 'true', 'yes')
+
+@asynccontextmanager
+async def lifespan(app):
+    await start_services()
+    try:
+        yield
+    finally:
+        await shutdown_db_client()
+
+# Create the main app; routes return plain dicts/lists serialized once with orjson
+app = FastAPI(title="Nikhil Kumar Bandi - Portfolio API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+# Rate limiting runs before routing and body parsing; inside CORS so 429s carry CORS headers
+app.add_middleware(RateLimitMiddleware, rules=RATE_LIMIT_RULES, store=rate_limit_store)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -42,116 +249,100 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def generate_resume_pdf():
-    """Generate a professional resume PDF"""
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-    
-    # Define styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        textColor=blue,
-        alignment=1  # Center alignment
+# Resolve the visitor's address from X-Forwarded-For before anything uses request.client
+app.add_middleware(TrustedProxyMiddleware, trusted_proxies=TRUSTED_PROXIES)
+
+# Per-route request timing; added last so it wraps every other middleware
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Metrics are per process; under several gunicorn workers (gunicorn.conf.py sets METRICS_MODE=workers)
+# each worker publishes its samples to the shared cache directory and /metrics renders every worker's,
+# labelled worker=<pid>, so a scrape is complete whichever worker answers it
+worker_metrics = None
+if os.environ.get('METRICS_MODE', 'process') == 'workers':
+    worker_metrics = metrics.WorkerExposition(
+        SHARED_CACHE_DIR / 'metrics', interval=float(os.environ.get('METRICS_PUBLISH_INTERVAL', '5'))
     )
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        spaceAfter=12,
-        textColor=blue
+
+metrics.CallbackGauge(
+    "ingest_events",
+    "Analytics events handled by the write buffer, by outcome",
+    lambda: {(outcome,): count for outcome, count in event_buffer.stats.items()},
+    labelnames=("outcome",),
+)
+metrics.CallbackGauge("ingest_queue_depth", "Analytics events waiting to be written", lambda: event_buffer.depth)
+metrics.CallbackGauge(
+    "spool_records",
+    "Documents appended to and replayed from the write spool, and corrupt segments seen",
+    lambda: {(outcome,): count for outcome, count in write_spool.stats.items()},
+    labelnames=("outcome",),
+)
+metrics.CallbackGauge("spool_bytes", "Size of the write spool on disk", write_spool.size_bytes)
+metrics.CallbackGauge("spool_segments", "Spool segment files on disk", lambda: len(write_spool.segments()))
+metrics.CallbackGauge(
+    "mongo_circuit_open",
+    "1 while the Mongo write circuit breaker is open, 0.5 half-open, 0 closed",
+    lambda: {mongo_breaker.CLOSED: 0, mongo_breaker.HALF_OPEN: 0.5, mongo_breaker.OPEN: 1}[mongo_breaker.state],
+)
+metrics.CallbackGauge("analytics_stream_clients", "Open /api/analytics/stream connections", lambda: len(live_analytics.subscribers))
+metrics.CallbackGauge(
+    "analytics_stream_frames",
+    "Live analytics frames published, and frames dropped for clients that fell behind",
+    lambda: {
+        ("published",): live_analytics.stats["published"],
+        ("dropped",): live_analytics.stats["dropped"] + sum(s.dropped for s in live_analytics.subscribers),
+    },
+    labelnames=("outcome",),
+)
+metrics.CallbackGauge(
+    "geoip_cache",
+    "GeoIP lookup cache lookups, by outcome",
+    lambda: dict(zip([("hit",), ("miss",)], geoip.lookup.cache_info()[:2])),
+    labelnames=("outcome",),
+)
+metrics.CallbackGauge(
+    "portfolio_content_reloads",
+    "Portfolio content reloads after the data file changed, by outcome",
+    lambda: {
+        ("loaded",): portfolio_content.stats["reloads"],
+        ("failed",): portfolio_content.stats["failed_reloads"],
+    },
+    labelnames=("outcome",),
+)
+metrics.CallbackGauge("render_pool_pending", "Distinct renders queued or running", lambda: render_pool.pending)
+views_deduplicated = metrics.Counter("views_deduplicated", "Repeat page views dropped by the dedup window", ("page",))
+bot_events = metrics.Counter("bot_events", "Views and downloads from user agents classified as bots", ("event", "policy"))
+metrics.CallbackGauge(
+    "user_agent_classifier_cache",
+    "User agent classification cache lookups, by outcome",
+    lambda: dict(zip([("hit",), ("miss",)], user_agent_classifier.classify.cache_info()[:2])),
+    labelnames=("outcome",),
+)
+
+async def record_view(ip_address, user_agent, page_viewed):
+    """Count the visitor and queue the view unless it repeats one inside the dedup window"""
+    agent = user_agent_classifier.classify(user_agent)
+    if agent.is_bot:
+        bot_events.inc(event="view", policy=BOT_POLICY)
+        if BOT_POLICY == "skip":
+            return "skipped"
+    else:
+        unique_visitors.add(ip_address, user_agent)
+    if VIEW_DEDUP_WINDOW > 0 and recent_views.seen(f"{ip_address}\0{user_agent}\0{page_viewed}"):
+        views_deduplicated.inc(page=page_viewed)
+        return "deduplicated"
+    location = geoip.lookup(ip_address)
+    view = PortfolioView(
+        ip_address=ip_address,
+        user_agent=user_agent,
+        is_bot=agent.is_bot,
+        browser_family=agent.browser_family,
+        country=location.country,
+        asn=location.asn,
+        page_viewed=page_viewed,
     )
-    normal_style = styles['Normal']
-    
-    # Build the resume content
-    story = []
-    
-    # Header
-    story.append(Paragraph("NIKHIL KUMAR BANDI", title_style))
-    story.append(Paragraph("DevOps/SRE/Platform Engineer", styles['Heading3']))
-    story.append(Spacer(1, 12))
-    
-    # Contact Information
-    contact_info = """
-    <b>Email:</b> bandinikhilgoud4545@gmail.com<br/>
-    <b>Location:</b> Available Globally<br/>
-    <b>Status:</b> Available for Freelance & Full-time Opportunities
-    """
-    story.append(Paragraph(contact_info, normal_style))
-    story.append(Spacer(1, 20))
-    
-    # Professional Summary
-    story.append(Paragraph("PROFESSIONAL SUMMARY", heading_style))
-    summary = """
-    IT Professional with 3+ years of experience in Software Development, skilled at operating in a wide 
-    range of platforms including DevOps/SRE/Platform engineering, AWS, GCP, and Linux environments. 
-    Passionate about implementing modern DevOps practices, optimizing cloud infrastructure, and ensuring 
-    high availability and performance of critical systems.
-    """
-    story.append(Paragraph(summary, normal_style))
-    story.append(Spacer(1, 20))
-    
-    # Work Experience
-    story.append(Paragraph("WORK EXPERIENCE", heading_style))
-    
-    # Current Role
-    story.append(Paragraph("<b>Platform Engineer</b> - SIDGS DIGISOL Pvt Ltd", styles['Heading4']))
-    story.append(Paragraph("Current Position | Full-time", normal_style))
-    current_responsibilities = """
-    • Leading DevOps initiatives and platform engineering for enterprise-scale applications<br/>
-    • Utilized archetypes to establish structured development environments with dependencies and automation<br/>
-    • Managed build and release processes, including dependency management and deployment strategies<br/>
-    • Developed Helm charts to package and deploy applications on Kubernetes efficiently<br/>
-    • Ensured zero-downtime deployments and efficiently troubleshot issues<br/>
-    • Orchestrated CI/CD pipelines using GitLab for automated builds and deployments
-    """
-    story.append(Paragraph(current_responsibilities, normal_style))
-    story.append(Spacer(1, 15))
-    
-    # Previous Role
-    story.append(Paragraph("<b>System Administrator</b> - Anything 4 Home Ltd", styles['Heading4']))
-    story.append(Paragraph("Previous Role | Full-time", normal_style))
-    previous_responsibilities = """
-    • Managed comprehensive system administration and monitoring infrastructure for e-commerce platform<br/>
-    • Specialized in monitoring and troubleshooting, focusing on tracing, logging, and debugging microservices<br/>
-    • Monitored and managed CD deployments using ArgoCD for seamless rollouts and quick failure recovery<br/>
-    • Implemented real-time monitoring and alerting using Prometheus and Grafana<br/>
-    • Diagnosed and resolved microservices issues leveraging CloudWatch and centralized logging tools
-    """
-    story.append(Paragraph(previous_responsibilities, normal_style))
-    story.append(Spacer(1, 20))
-    
-    # Technical Skills
-    story.append(Paragraph("TECHNICAL SKILLS", heading_style))
-    skills_text = """
-    <b>Cloud Platforms:</b> Amazon Web Services (AWS), Google Cloud Platform (GCP)<br/>
-    <b>Containerization:</b> Docker, Kubernetes, EKS, Helm<br/>
-    <b>CI/CD Tools:</b> GitLab CI/CD, Jenkins, Maven<br/>
-    <b>Monitoring:</b> CloudWatch, Prometheus, Grafana, Dynatrace<br/>
-    <b>Infrastructure as Code:</b> Terraform<br/>
-    <b>Security:</b> TLS/mTLS, Trivy, Co-sign<br/>
-    <b>Operating Systems:</b> Linux, Windows
-    """
-    story.append(Paragraph(skills_text, normal_style))
-    story.append(Spacer(1, 20))
-    
-    # Education
-    story.append(Paragraph("EDUCATION", heading_style))
-    story.append(Paragraph("<b>Bachelor of Science in Computer Science</b>", styles['Heading4']))
-    story.append(Paragraph("Osmania University", normal_style))
-    story.append(Spacer(1, 15))
-    
-    # Certifications
-    story.append(Paragraph("CERTIFICATIONS", heading_style))
-    story.append(Paragraph("• Google Cloud Platform Associate Cloud Engineer", normal_style))
-    
-    # Build the PDF
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
+    queued = await event_buffer.enqueue("portfolio_views", view.model_dump())
+    return "tracked" if queued else "dropped"
 
 # API Routes
 @api_router.get("/")
@@ -162,91 +353,424 @@ async def root():
 async def submit_contact_form(contact_data: ContactMessageCreate, request: Request):
     """Submit contact form"""
     try:
-        contact_message = ContactMessage(**contact_data.dict())
+        # contact_data is already validated; fill in id/created_at without validating again
+        contact_message = ContactMessage.model_construct(**contact_data.model_dump())
         
-        # Save to database
-        await db.contact_messages.insert_one(contact_message.dict())
+        # Save to database, or to the spool if Mongo is unavailable
+        body = contact_message.model_dump()
+        document = dict(body)
+        try:
+            await mongo_breaker.call(db.contact_messages.insert_one, document)
+        except Exception as e:
+            logger.warning(f"Spooling contact message {contact_message.id}: {e!r}")
+            await write_spool.append("contact_messages", [document])
+        else:
+            try:
+                await analytics_rollups.record("contact_messages", [document])
+            except Exception as e:
+                logger.error(f"Failed to update contact rollups: {e}")
+            await timeseries_cache.invalidate("contact_messages", [document])
+            await live_analytics.record("contact_messages", [document])
         
         # Track the contact submission
-        view = PortfolioView(
-            ip_address=request.client.host,
-            user_agent=request.headers.get('user-agent'),
-            page_viewed="contact_form"
-        )
-        await db.portfolio_views.insert_one(view.dict())
+        await record_view(request.client.host, request.headers.get('user-agent'), "contact_form")
         
-        return contact_message
+        # Already shaped like ContactMessage: skip response_model re-validation
+        return ORJSONResponse(body)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error submitting contact form: {str(e)}")
 
-@api_router.get("/contact-messages", response_model=List[ContactMessage])
-async def get_contact_messages():
-    """Get all contact messages (for admin use)"""
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependency guarding the admin endpoints: X-Admin-Token must match ADMIN_TOKEN"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="Admin endpoints are disabled: ADMIN_TOKEN is not set")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+def _contact_messages_cursor(is_read, email, cursor, fields):
+    try:
+        query = contact_messages_filter(is_read=is_read, email=email, cursor=cursor)
+        projection = contact_messages_projection(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return db.contact_messages.find(query, projection).sort(CONTACT_SORT)
+
+@api_router.get("/contact-messages", dependencies=[Depends(require_admin)])
+async def get_contact_messages(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    is_read: Optional[bool] = None,
+    email: Optional[str] = None,
+):
+    """Get a page of contact messages, newest first (for admin use)"""
     try:
-        messages = await db.contact_messages.find().sort("created_at", -1).to_list(100)
-        return [ContactMessage(**message) for message in messages]
+        messages = await _contact_messages_cursor(is_read, email, cursor, fields).limit(limit + 1).to_list(limit + 1)
+        next_cursor = encode_cursor(messages[limit - 1]) if len(messages) > limit else None
+        return {"items": messages[:limit], "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching messages: {str(e)}")
 
+@api_router.get("/contact-messages/search", dependencies=[Depends(require_admin)])
+async def search_contact_messages(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    is_read: Optional[bool] = None,
+    email: Optional[str] = None,
+):
+    """Full-text search over name, email, company, subject and message, best match first (for admin use)"""
+    try:
+        try:
+            pipeline = contact_search_pipeline(
+                q, limit + 1, is_read=is_read, email=email, cursor=cursor, projection=contact_messages_projection(fields)
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        messages = await db.contact_messages.aggregate(pipeline).to_list(limit + 1)
+        next_cursor = encode_search_cursor(messages[limit - 1]) if len(messages) > limit else None
+        return {"items": messages[:limit], "next_cursor": next_cursor}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching messages: {str(e)}")
+
+@api_router.post("/contact-messages/bulk", dependencies=[Depends(require_admin)])
+async def bulk_update_contact_messages(request: ContactBulkRequest):
+    """Mark read/unread or delete messages by id list or query, as one bulk write (for admin use)"""
+    try:
+        try:
+            operations = [
+                (op.action, contact_selection(ids=op.ids, is_read=op.is_read, email=op.email, text=op.q, before=op.before))
+                for op in request.operations
+            ]
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        # Every selection is resolved to ids against the messages as they are now, so later
+        # operations do not see earlier ones, and deleted messages are known for the rollups
+        resolved = []
+        deleted = {}
+        for action, query in operations:
+            matched = await db.contact_messages.find(query, {"_id": 0, "id": 1, "created_at": 1}).to_list(None)
+            resolved.append((action, [doc["id"] for doc in matched]))
+            if action == "delete":
+                deleted.update((doc["id"], doc) for doc in matched)
+
+        requests = contact_bulk_requests([(action, ids) for action, ids in resolved if ids])
+        if not requests:
+            return {"matched": 0, "modified": 0, "deleted": 0}
+        result = await db.contact_messages.bulk_write(requests, ordered=True)
+        if deleted:
+            documents = list(deleted.values())
+            try:
+                await analytics_rollups.retract("contact_messages", documents)
+            except Exception as e:
+                logger.error(f"Failed to retract deleted contacts from rollups: {e}")
+            await timeseries_cache.invalidate("contact_messages", documents)
+        return {
+            "matched": result.matched_count,
+            "modified": result.modified_count,
+            "deleted": result.deleted_count,
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating messages: {str(e)}")
+
+@api_router.get("/contact-messages/export", dependencies=[Depends(require_admin)])
+async def export_contact_messages(
+    fields: Optional[str] = None,
+    is_read: Optional[bool] = None,
+    email: Optional[str] = None,
+):
+    """Stream every matching contact message as NDJSON (for admin use)"""
+    messages = _contact_messages_cursor(is_read, email, None, fields).batch_size(500)
+
+    async def lines():
+        async for message in messages:
+            yield orjson.dumps(message, option=orjson.OPT_APPEND_NEWLINE)
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=contact_messages.ndjson"},
+    )
+
+async def get_resume_artifact(fmt, encoding=None, content=None):
+    """Cached resume artifact for a format, optionally as a precompressed variant"""
+    spec = RESUME_FORMATS[fmt]
+    content = content or portfolio_content.current()
+    key = content.resume_keys[fmt]
+
+    async def render():
+        with metrics.resume_render_duration_seconds.time(format=fmt):
+            if spec.in_pool:
+                return await render_pool.run(key, spec.render, content.resume)
+            return spec.render(content.resume)
+
+    artifact = await resume_cache.get(key, render, spec.media_type, suffix=f".{spec.extension}")
+    if encoding is None:
+        return artifact
+
+    compress, suffix = ENCODINGS[encoding]
+
+    async def render_variant():
+        return compress(artifact.body)
+
+    return await resume_cache.get(
+        variant_key(key, encoding), render_variant, spec.media_type, suffix=f".{spec.extension}{suffix}"
+    )
+
 @api_router.get("/download-resume")
-async def download_resume(request: Request):
-    """Download resume as PDF"""
+async def download_resume(request: Request, format: Literal["pdf", "docx", "html", "json"] = "pdf"):
+    """Download resume as PDF, DOCX, HTML or JSON Resume"""
     try:
-        # Track the download
-        download_record = ResumeDownload(
-            ip_address=request.client.host,
-            user_agent=request.headers.get('user-agent'),
-            download_type="pdf"
-        )
-        await db.resume_downloads.insert_one(download_record.dict())
-        
-        # Generate PDF
-        pdf_buffer = generate_resume_pdf()
-        
-        # Return as file response
-        return Response(
-            content=pdf_buffer.getvalue(),
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": "attachment; filename=Nikhil_Kumar_Bandi_Resume.pdf"
-            }
+        spec = RESUME_FORMATS[format]
+        encoding = negotiate_encoding(request.headers.get('accept-encoding')) if spec.compressible else None
+        content = portfolio_content.current()
+        key = content.resume_keys[format]
+        if encoding is not None:
+            key = variant_key(key, encoding)
+        headers = {
+            "ETag": etag_for(key),
+            "Cache-Control": f"public, max-age={RESUME_CACHE_MAX_AGE}",
+        }
+        if spec.compressible:
+            headers["Vary"] = "Accept-Encoding"
+        # The ETag is derived from the content key, so revalidation needs no render
+        if etag_matches(request.headers.get('if-none-match'), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+        # Track the download (revalidations above are not downloads); bots get the same
+        # cached artifact, recorded only under the 'record' policy
+        user_agent = request.headers.get('user-agent')
+        agent = user_agent_classifier.classify(user_agent)
+        if agent.is_bot:
+            bot_events.inc(event="download", policy=BOT_POLICY)
+        if not (agent.is_bot and BOT_POLICY == "skip"):
+            location = geoip.lookup(request.client.host)
+            download_record = ResumeDownload(
+                ip_address=request.client.host,
+                user_agent=user_agent,
+                is_bot=agent.is_bot,
+                browser_family=agent.browser_family,
+                country=location.country,
+                asn=location.asn,
+                download_type=format
+            )
+            await event_buffer.enqueue("resume_downloads", download_record.model_dump())
+
+        # Serve the cached artifact, rendering it only when the content changed
+        artifact = await get_resume_artifact(format, encoding, content)
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        headers["Content-Disposition"] = f"{spec.disposition}; filename=Nikhil_Kumar_Bandi_Resume.{spec.extension}"
+        headers["Content-Length"] = str(len(artifact.body))
+        return Response(content=artifact.body, media_type=artifact.media_type, headers=headers)
+    except RenderPoolSaturated as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Resume rendering is busy, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)},
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating resume: {str(e)}")
 
+def portfolio_response(request, document, version):
+    """A prebuilt portfolio document in the negotiated encoding; nothing is serialized or compressed here"""
+    encoding, etag, body = document.encoded(negotiate_encoding(request.headers.get('accept-encoding')))
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={PORTFOLIO_CACHE_MAX_AGE}",
+        "Vary": "Accept-Encoding",
+        "X-Portfolio-Version": version,
+    }
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@api_router.get("/portfolio")
+async def get_portfolio(request: Request):
+    """Portfolio site content, from the same snapshot the resume downloads are rendered from"""
+    content = portfolio_content.current()
+    return portfolio_response(request, content.document(), content.version)
+
+@api_router.get("/portfolio/{section}")
+async def get_portfolio_section(request: Request, section: str):
+    """One section of the portfolio content: profile, experience, skills, education, certifications or tech_stack"""
+    if section not in PORTFOLIO_SECTIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown portfolio section: {section}")
+    content = portfolio_content.current()
+    return portfolio_response(request, content.document(section), content.version)
+
 @api_router.post("/track-view")
 async def track_portfolio_view(request: Request):
     """Track portfolio page views"""
     try:
-        view = PortfolioView(
-            ip_address=request.client.host,
-            user_agent=request.headers.get('user-agent'),
-            page_viewed="portfolio"
-        )
-        await db.portfolio_views.insert_one(view.dict())
-        return {"status": "tracked"}
+        status = await record_view(request.client.host, request.headers.get('user-agent'), "portfolio")
+        return {"status": status}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error tracking view: {str(e)}")
 
 @api_router.get("/analytics")
-async def get_analytics():
-    """Get basic analytics"""
+async def get_analytics(
+    granularity: Optional[Literal["hour", "day"]] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    exclude_bots: Optional[bool] = None,
+    group_by: Optional[Literal["country"]] = None,
+):
+    """Get basic analytics, optionally bucketed by hour or day over a time range and grouped by country
+
+    Bot views and downloads are counted like any other event; pass
+    exclude_bots=true for human traffic only.
+    """
     try:
-        total_views = await db.portfolio_views.count_documents({})
-        total_downloads = await db.resume_downloads.count_documents({})
-        total_contacts = await db.contact_messages.count_documents({})
-        
-        return {
-            "total_views": total_views,
-            "total_downloads": total_downloads,
-            "total_contacts": total_contacts
+        include_bots = not (ANALYTICS_EXCLUDE_BOTS if exclude_bots is None else exclude_bots)
+        snapshot_name = "analytics-summary.json" if include_bots else "analytics-summary-humans.json"
+        use_snapshot = granularity is None and group_by is None and ANALYTICS_SNAPSHOT_TTL > 0
+        if use_snapshot:
+            snapshot = snapshots.get(snapshot_name, max_age=ANALYTICS_SNAPSHOT_TTL)
+            if snapshot is not None:
+                return Response(content=bytes(snapshot), media_type="application/json")
+
+        totals = await analytics_rollups.totals(include_bots=include_bots)
+        today = datetime.utcnow().strftime("%Y-%m-%d")
+        uniques = await unique_visitors.estimate([today])
+        result = {
+            "total_views": totals["views"],
+            "total_downloads": totals["downloads"],
+            "total_contacts": totals["contacts"],
+            "unique_visitors_today": uniques[today],
         }
+        if group_by == "country":
+            result["countries"] = await analytics_rollups.country_totals(include_bots=include_bots)
+        if granularity is None:
+            if not use_snapshot:
+                return result
+            body = orjson.dumps(result)
+            try:
+                snapshots.put(snapshot_name, body)
+            except OSError as e:
+                logger.warning(f"Could not publish analytics snapshot: {e}")
+            return Response(content=body, media_type="application/json")
+
+        step = GRANULARITIES[granularity]
+        end = to_naive_utc(end) or datetime.utcnow()
+        start = to_naive_utc(start) or end - step * 24
+        if start >= end or (end - start) / step > ANALYTICS_MAX_BUCKETS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Time range must be positive and span at most {ANALYTICS_MAX_BUCKETS} {granularity} buckets",
+            )
+        result["granularity"] = granularity
+        result["series"] = await analytics_rollups.series(
+            granularity, start, end, include_bots=include_bots, countries=group_by == "country"
+        )
+        if granularity == "day":
+            days = []
+            day = truncate(start, "day")
+            while day < end:
+                days.append(day.strftime("%Y-%m-%d"))
+                day += step
+            uniques = await unique_visitors.estimate(days)
+            result["unique_visitors"] = [{"day": day, "estimate": uniques[day]} for day in days]
+        return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching analytics: {str(e)}")
 
+def archived_events_until(start, end):
+    """End of the last archived day of views or downloads overlapping [start, end), or None"""
+    days = [event_archive.archived_until(source, start, end) for source in RETENTION_SOURCES]
+    days = [day for day in days if day is not None]
+    return max(days) if days else None
+
+@api_router.get("/analytics/timeseries")
+async def get_analytics_timeseries(
+    granularity: Literal["hour", "day", "week"] = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    exclude_bots: Optional[bool] = None,
+):
+    """Views, downloads and contacts per hour, day or week, with page and download type breakdowns"""
+    try:
+        include_bots = not (ANALYTICS_EXCLUDE_BOTS if exclude_bots is None else exclude_bots)
+        step = TIMESERIES_UNITS[granularity]
+        end = to_naive_utc(end) or datetime.utcnow()
+        if start is None:
+            # Default to 24 buckets, starting no earlier than the first whole bucket after the archive
+            start = end - step * 24
+            archived = archived_events_until(start, end)
+            if archived is not None:
+                first = bucket_start(archived, granularity)
+                start = first if first >= archived else first + step
+        start = to_naive_utc(start)
+        if start >= end or (end - start) / step > ANALYTICS_MAX_BUCKETS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Time range must be positive and span at most {ANALYTICS_MAX_BUCKETS} {granularity} buckets",
+            )
+        # Archived views and downloads are no longer in Mongo, so aggregating them here would
+        # silently return zeros; contacts are never archived
+        archived = archived_events_until(start, end)
+        if archived is not None:
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    f"{', '.join(RETENTION_SOURCES)} before {archived:%Y-%m-%d} are archived; use "
+                    "/api/analytics?granularity=day for older daily totals, "
+                    "or 'manage.py timeseries --archive-dir' for the full breakdown"
+                ),
+            )
+        series = await query_timeseries(db, granularity, start, end, cache=timeseries_cache, include_bots=include_bots)
+        return {"granularity": granularity, "start": start, "end": end, "series": series}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching analytics timeseries: {str(e)}")
+
+@api_router.get("/analytics/stream")
+async def stream_analytics():
+    """Server-Sent Events: a snapshot of the totals, then coalesced deltas once per tick"""
+    subscriber = live_analytics.subscribe()
+    if subscriber is None:
+        raise HTTPException(status_code=503, detail="Too many open analytics streams", headers={"Retry-After": "30"})
+
+    async def frames():
+        try:
+            while True:
+                frame = await subscriber.queue.get()
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            live_analytics.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        # No proxy buffering (nginx) or caching of the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # Include the router in the main app
 app.include_router(api_router)
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    if worker_metrics is not None:
+        return PlainTextResponse(await asyncio.to_thread(worker_metrics.render), media_type=metrics.CONTENT_TYPE)
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -254,8 +778,80 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
+background_tasks = []
+
+def prerender_artifacts():
+    """Render every resume artifact synchronously into the shared cache
+
+    Called from gunicorn's when_ready hook in the master, before workers fork,
+    so no worker ever renders on its first request.
+    """
+    content = portfolio_content.current()
+    for fmt, spec in RESUME_FORMATS.items():
+        key = content.resume_keys[fmt]
+        suffix = f".{spec.extension}"
+        artifact = resume_cache.lookup(key, spec.media_type, suffix)
+        if artifact is None:
+            artifact = resume_cache.store(key, spec.render(content.resume), spec.media_type, suffix)
+        if spec.compressible:
+            for encoding, (compress, encoding_suffix) in ENCODINGS.items():
+                vkey = variant_key(key, encoding)
+                if resume_cache.lookup(vkey, spec.media_type, suffix + encoding_suffix) is None:
+                    resume_cache.store(vkey, compress(artifact.body), spec.media_type, suffix + encoding_suffix)
+    logger.info(f"Pre-rendered resume artifacts into {resume_cache.cache_dir}")
+
+async def warm_up():
+    """Render every resume format and compressed variant so first requests are cache hits"""
+    for fmt, spec in RESUME_FORMATS.items():
+        try:
+            await get_resume_artifact(fmt)
+            if spec.compressible:
+                for encoding in ENCODINGS:
+                    await get_resume_artifact(fmt, encoding)
+        except Exception as e:
+            logger.warning(f"Warm-up of resume format {fmt} failed: {e}")
+    logger.info("Resume caches warmed")
+
+async def ensure_indexes():
+    try:
+        await reconcile_indexes(db)
+    except Exception as e:
+        logger.error(f"Index reconciliation failed: {e}")
+
+async def start_services():
+    if db is None:
+        connect_mongo()
+    analytics_rollups.db = db
+    unique_visitors.db = db
+    spool_replayer.db = db
+    user_agent_directory.db = db
+    write_spool.open()
+    event_buffer.start(db)
+    background_tasks.append(asyncio.create_task(spool_replayer.run()))
+    background_tasks.append(asyncio.create_task(live_analytics.run()))
+    background_tasks.append(asyncio.create_task(metrics.monitor_event_loop_lag()))
+    if worker_metrics is not None:
+        background_tasks.append(asyncio.create_task(worker_metrics.run()))
+    background_tasks.append(asyncio.create_task(unique_visitors.run_persist(VISITOR_SKETCH_PERSIST_INTERVAL)))
+    if ENSURE_INDEXES_ON_START:
+        background_tasks.append(asyncio.create_task(ensure_indexes()))
+    if WARMUP_ON_START:
+        # Runs concurrently with serving; the PDF render happens in the pool
+        background_tasks.append(asyncio.create_task(warm_up()))
+
 async def shutdown_db_client():
+    live_analytics.close()
+    for task in background_tasks:
+        task.cancel()
+    await event_buffer.close()
+    await write_spool.close()
+    if worker_metrics is not None:
+        worker_metrics.remove()
+    try:
+        await unique_visitors.persist()
+    except Exception as e:
+        logger.error(f"Failed to persist visitor sketches on shutdown: {e}")
+    render_pool.shutdown()
     client.close()
 
 if __name__ == "__main__":
@@ -0,0 +1,69 @@
+import mmap
+import os
+import tempfile
+import time
+from pathlib import Path
+
+
+def default_shared_dir(fallback):
+    """tmpfs (/dev/shm) when the platform has it, so entries never touch disk"""
+    shm = Path("/dev/shm")
+    if shm.is_dir() and os.access(shm, os.W_OK):
+        return shm / "portfolio-cache"
+    return Path(fallback)
+
+
+class SharedCache:
+    """Cross-process cache of immutable blobs, one file per key in a shared directory
+
+    Writers publish with write-to-temp + rename, so readers never see a partial
+    entry and keep their old mapping valid while a new version replaces it.
+    Readers map entries read-only: the pages live once in the OS page cache and
+    every worker process reads the same memory. Each process keeps its
+    mappings open and only re-maps an entry when its file has been replaced.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self._maps = {}
+
+    def _path(self, key):
+        return self.directory / key
+
+    def get(self, key, max_age=None):
+        """Read-only memoryview of an entry, or None if it is missing or older than max_age seconds"""
+        try:
+            st = os.stat(self._path(key))
+        except OSError:
+            self._maps.pop(key, None)
+            return None
+        if max_age is not None and time.time() - st.st_mtime > max_age:
+            return None
+        if st.st_size == 0:
+            return memoryview(b"")
+        cached = self._maps.get(key)
+        if cached is not None and cached[0] == (st.st_ino, st.st_mtime_ns):
+            return cached[1]
+        try:
+            with open(self._path(key), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        view = memoryview(mapped)
+        self._maps[key] = ((st.st_ino, st.st_mtime_ns), view)
+        return view
+
+    def put(self, key, data):
+        """Atomically publish data under key"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
@@ -0,0 +1,283 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import zlib
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Segment lifecycle: <stamp>-<pid>.open (being appended to by pid)
+#   -> <stamp>-<pid>.seg (sealed, ready to replay)
+#   -> <stamp>-<pid>.seg.<replayer pid>.replay (claimed) -> deleted once written to Mongo
+OPEN_SUFFIX = ".open"
+SEALED_SUFFIX = ".seg"
+CLAIM_SUFFIX = ".replay"
+
+
+def _encode_default(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode_hook(obj):
+    if len(obj) == 1 and "$date" in obj:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+
+def encode_record(collection, document):
+    """One spool line: crc32 of the payload, a space, the JSON payload, a newline"""
+    document = {k: v for k, v in document.items() if k != "_id"}
+    payload = json.dumps({"c": collection, "d": document}, default=_encode_default, separators=(",", ":"))
+    payload = payload.encode("utf-8")
+    return b"%08x %s\n" % (zlib.crc32(payload), payload)
+
+
+def decode_records(data):
+    """(records, clean) from segment bytes; records stop at the first torn or corrupt line"""
+    records = []
+    for line in data.splitlines(keepends=True):
+        checksum, payload = line[:8], line[9:-1]
+        try:
+            valid = line.endswith(b"\n") and int(checksum, 16) == zlib.crc32(payload)
+        except ValueError:
+            valid = False
+        if not valid:
+            return records, False
+        record = json.loads(payload, object_hook=_decode_hook)
+        records.append((record["c"], record["d"]))
+    return records, True
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Spool:
+    """Append-only, segment-rotated write-ahead log for documents Mongo could not take
+
+    Appends are group-committed: every append written within
+    ``fsync_interval`` seconds shares one fsync, and ``append`` returns only
+    once its records are on disk. Segments rotate at ``segment_bytes``. Each
+    process appends to its own open segment; sealed segments are claimed by
+    rename, so any process can replay them without double-claiming.
+    """
+
+    def __init__(self, directory, segment_bytes=4 * 1024 * 1024, fsync_interval=0.05):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.stats = {"appended": 0, "replayed": 0, "corrupt": 0}
+        self._file = None
+        self._path = None
+        self._bytes = 0
+        self._sync_waiter = None
+
+    def open(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.recover()
+        self._open_segment()
+
+    def recover(self):
+        """Hand segments left behind by dead processes back to the replay queue"""
+        for path in self.directory.iterdir():
+            name = path.name
+            if name.endswith(OPEN_SUFFIX):
+                sealed = name[: -len(OPEN_SUFFIX)] + SEALED_SUFFIX
+                owner = name[: -len(OPEN_SUFFIX)].rsplit("-", 1)[-1]
+            elif name.endswith(CLAIM_SUFFIX):
+                sealed, owner = name[: -len(CLAIM_SUFFIX)].rsplit(".", 1)
+            else:
+                continue
+            if not owner.isdigit() or int(owner) == os.getpid() or _pid_alive(int(owner)):
+                continue
+            try:
+                os.replace(path, self.directory / sealed)
+                logger.info(f"Recovered spool segment {sealed}")
+            except OSError:
+                pass
+
+    def _open_segment(self):
+        self._path = self.directory / f"{time.time_ns():020d}-{os.getpid()}{OPEN_SUFFIX}"
+        self._file = open(self._path, "ab")
+        self._bytes = 0
+
+    def _seal(self):
+        """fsync and close the open segment, and make it replayable"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        if self._bytes:
+            os.replace(self._path, self._path.with_suffix(SEALED_SUFFIX))
+        else:
+            self._path.unlink(missing_ok=True)
+        self._file = None
+
+    def rotate(self):
+        """Seal the open segment (if it holds anything) and start a new one"""
+        if self._file is not None and self._bytes:
+            self._seal()
+            self._open_segment()
+
+    @property
+    def pending_bytes(self):
+        return self._bytes
+
+    async def append(self, collection, documents):
+        """Durably spool documents for collection"""
+        if self._bytes >= self.segment_bytes:
+            self.rotate()
+        data = b"".join(encode_record(collection, document) for document in documents)
+        self._file.write(data)
+        self._bytes += len(data)
+        self.stats["appended"] += len(documents)
+        if self._sync_waiter is None:
+            self._sync_waiter = asyncio.get_running_loop().create_future()
+            asyncio.create_task(self._sync())
+        await asyncio.shield(self._sync_waiter)
+
+    async def _sync(self):
+        await asyncio.sleep(self.fsync_interval)
+        waiter, self._sync_waiter = self._sync_waiter, None
+        try:
+            self._file.flush()
+            # fsync a duplicate so a rotation during the fsync cannot close it under us
+            fd = os.dup(self._file.fileno())
+            try:
+                await asyncio.to_thread(os.fsync, fd)
+            finally:
+                os.close(fd)
+        except Exception as e:
+            waiter.set_exception(e)
+        else:
+            waiter.set_result(None)
+
+    def claim(self):
+        """Claim the oldest sealed segment for replay; returns its path or None"""
+        for path in sorted(self.directory.glob(f"*{SEALED_SUFFIX}")):
+            claimed = path.with_name(f"{path.name}.{os.getpid()}{CLAIM_SUFFIX}")
+            try:
+                os.replace(path, claimed)
+            except FileNotFoundError:
+                continue  # another process got it first
+            return claimed
+        return None
+
+    def release(self, claimed):
+        """Give a claimed segment back, e.g. after a failed replay"""
+        os.replace(claimed, self.directory / claimed.name.rsplit(".", 2)[0])
+
+    def segments(self):
+        return [path for path in self.directory.iterdir() if path.is_file()] if self.directory.is_dir() else []
+
+    def size_bytes(self):
+        total = 0
+        for path in self.segments():
+            try:
+                total += path.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    async def close(self):
+        if self._sync_waiter is not None:
+            await asyncio.shield(self._sync_waiter)
+        if self._file is not None:
+            self._seal()
+
+
+class SpoolReplayer:
+    """Drains sealed spool segments into Mongo once the breaker lets writes through
+
+    Documents are written with bulk upserts keyed on their ``id`` field, so a
+    segment that is replayed twice (after a crash mid-replay) inserts nothing
+    new. Flush hooks only see documents that were actually inserted. An
+    optional ``encoder`` converts documents to their stored form, as in
+    EventBuffer.
+    """
+
+    def __init__(self, spool, breaker, batch_size=500, interval=5.0, encoder=None):
+        self.spool = spool
+        self.breaker = breaker
+        self.encoder = encoder
+        self.batch_size = batch_size
+        self.interval = interval
+        self.db = None
+        self._flush_hooks = []
+
+    def add_flush_hook(self, hook):
+        """Register ``async hook(collection_name, documents)``, called with newly inserted documents"""
+        self._flush_hooks.append(hook)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.replay()
+            except Exception as e:
+                logger.error(f"Spool replay failed: {e}")
+
+    async def replay(self):
+        """Replay every sealed segment; returns the number of documents written"""
+        if self.breaker.state == self.breaker.OPEN:
+            return 0
+        if self.spool.pending_bytes:
+            self.spool.rotate()
+        written = 0
+        while True:
+            claimed = self.spool.claim()
+            if claimed is None:
+                return written
+            try:
+                written += await self._replay_segment(claimed)
+            except BaseException:
+                self.spool.release(claimed)
+                raise
+            claimed.unlink()
+
+    async def _replay_segment(self, path):
+        data = await asyncio.to_thread(path.read_bytes)
+        records, clean = decode_records(data)
+        if not clean:
+            self.spool.stats["corrupt"] += 1
+            logger.warning(f"Spool segment {path.name} has a torn or corrupt tail after {len(records)} records")
+        grouped = defaultdict(list)
+        for collection, document in records:
+            grouped[collection].append(document)
+
+        written = 0
+        for collection, documents in grouped.items():
+            for start in range(0, len(documents), self.batch_size):
+                batch = documents[start:start + self.batch_size]
+                result = await self.breaker.call(self._encode_and_upsert, collection, batch)
+                inserted = [batch[index] for index in result.upserted_ids]
+                written += len(inserted)
+                self.spool.stats["replayed"] += len(batch)
+                for hook in self._flush_hooks if inserted else ():
+                    try:
+                        await hook(collection, inserted)
+                    except Exception as e:
+                        logger.error(f"Spool replay hook failed for {collection}: {e}")
+        logger.info(f"Replayed {len(records)} spooled documents from {path.name} ({written} new)")
+        return written
+
+    async def _encode_and_upsert(self, collection, batch):
+        from pymongo import UpdateOne
+
+        # Encoding may write to Mongo too, so it runs inside the breaker with the upserts
+        stored = await self.encoder(collection, batch) if self.encoder is not None else batch
+        return await self.db[collection].bulk_write(
+            [UpdateOne({"id": doc["id"]}, {"$setOnInsert": doc}, upsert=True) for doc in stored],
+            ordered=False,
+        )
@@ -0,0 +1,229 @@
+import logging
+import time
+from collections import OrderedDict
+from datetime import timedelta, timezone
+
+from rollups import ROLLUP_SOURCES
+from user_agents import TAGGED_COLLECTIONS
+
+logger = logging.getLogger(__name__)
+
+TIMESERIES_UNITS = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+
+def bucket_start(timestamp, unit):
+    """Start of the hour/day/week (weeks start on Monday) containing timestamp, as $dateTrunc computes it"""
+    if unit == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    day = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    if unit == "week":
+        day -= timedelta(days=day.weekday())
+    return day
+
+
+def to_naive_utc(timestamp):
+    """Stored timestamps are naive UTC; convert aware query parameters to match"""
+    if timestamp is None or timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def bucket_range(start, end, unit):
+    """Every bucket start from the one containing start up to (excluding) end"""
+    step = TIMESERIES_UNITS[unit]
+    bucket = bucket_start(start, unit)
+    buckets = []
+    while bucket < end:
+        buckets.append(bucket)
+        bucket += step
+    return buckets
+
+
+def empty_row(bucket):
+    row = {"bucket": bucket}
+    for metric, _, dim_field in ROLLUP_SOURCES.values():
+        row[metric] = 0
+        if dim_field:
+            row[f"{metric}_breakdown"] = {}
+    return row
+
+
+def timeseries_pipeline(unit, start, end, include_bots=True):
+    """One aggregation over all three event collections, run against portfolio_views
+
+    Each branch starts with a $match on its time field so it can use that
+    collection's time index, and projects events to a common (metric, t, dim)
+    shape; $unionWith stitches the branches together and a single $group
+    buckets them with $dateTrunc.
+    """
+    branches = []
+    for source, (metric, time_field, dim_field) in ROLLUP_SOURCES.items():
+        match = {time_field: {"$gte": start, "$lt": end}}
+        if not include_bots and source in TAGGED_COLLECTIONS:
+            # $ne also matches events stored before classification
+            match["is_bot"] = {"$ne": True}
+        branches.append((source, [
+            {"$match": match},
+            {"$project": {
+                "_id": 0,
+                "metric": {"$literal": metric},
+                "t": f"${time_field}",
+                "dim": f"${dim_field}" if dim_field else {"$literal": None},
+            }},
+        ]))
+    (_, pipeline), rest = branches[0], branches[1:]
+    pipeline = list(pipeline)
+    for source, branch in rest:
+        pipeline.append({"$unionWith": {"coll": source, "pipeline": branch}})
+    pipeline.append({
+        "$group": {
+            "_id": {
+                "metric": "$metric",
+                "bucket": {"$dateTrunc": {"date": "$t", "unit": unit, "startOfWeek": "monday"}},
+                "dim": "$dim",
+            },
+            "count": {"$sum": 1},
+        }
+    })
+    return pipeline
+
+
+def rows_from_groups(groups, buckets):
+    """Zero-filled rows per bucket from the pipeline's {_id: {metric, bucket, dim}, count} groups"""
+    rows = {bucket: empty_row(bucket) for bucket in buckets}
+    for group in groups:
+        key = group["_id"]
+        row = rows.get(key["bucket"])
+        if row is None:
+            continue
+        row[key["metric"]] += group["count"]
+        breakdown = row.get(f"{key['metric']}_breakdown")
+        if breakdown is not None:
+            dim = str(key.get("dim") or "unknown")
+            breakdown[dim] = breakdown.get(dim, 0) + group["count"]
+    return [rows[bucket] for bucket in buckets]
+
+
+class TimeseriesCache:
+    """Computed timeseries rows keyed by (unit, bot filter, bucket start)
+
+    Entries are invalidated bucket by bucket as new events are written (see
+    ``invalidate``, usable as a flush hook); ``ttl`` bounds how stale a row can
+    get from writes seen only by other processes.
+    """
+
+    def __init__(self, ttl=60.0, max_entries=20000, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._rows = OrderedDict()
+
+    def get(self, unit, bucket, include_bots=True):
+        key = (unit, include_bots, bucket)
+        entry = self._rows.get(key)
+        if entry is None:
+            return None
+        if self.clock() - entry[0] > self.ttl:
+            del self._rows[key]
+            return None
+        return entry[1]
+
+    def put(self, unit, bucket, row, include_bots=True):
+        key = (unit, include_bots, bucket)
+        self._rows[key] = (self.clock(), row)
+        self._rows.move_to_end(key)
+        if len(self._rows) > self.max_entries:
+            self._rows.popitem(last=False)
+
+    async def invalidate(self, collection, documents):
+        """Drop the cached buckets that documents fall into"""
+        source = ROLLUP_SOURCES.get(collection)
+        if source is None:
+            return
+        _, time_field, _ = source
+        for document in documents:
+            timestamp = document.get(time_field)
+            if timestamp is None:
+                continue
+            for unit in TIMESERIES_UNITS:
+                bucket = bucket_start(timestamp, unit)
+                for include_bots in (True, False):
+                    self._rows.pop((unit, include_bots, bucket), None)
+
+
+async def query_timeseries(db, unit, start, end, cache=None, include_bots=True):
+    """Bucketed counts and breakdowns for [start, end), aggregating only the buckets not cached"""
+    buckets = bucket_range(start, end, unit)
+    cached = {}
+    if cache is not None:
+        for bucket in buckets:
+            row = cache.get(unit, bucket, include_bots)
+            if row is not None:
+                cached[bucket] = row
+    missing = [bucket for bucket in buckets if bucket not in cached]
+    if missing:
+        # One pipeline over the smallest range covering every missing bucket
+        first, last = missing[0], missing[-1] + TIMESERIES_UNITS[unit]
+        collection = next(iter(ROLLUP_SOURCES))
+        groups = await db[collection].aggregate(timeseries_pipeline(unit, first, last, include_bots)).to_list(None)
+        window = [bucket for bucket in buckets if first <= bucket < last]
+        for row in rows_from_groups(groups, window):
+            if row["bucket"] not in cached:
+                cached[row["bucket"]] = row
+                if cache is not None:
+                    cache.put(unit, row["bucket"], row, include_bots)
+    return [cached[bucket] for bucket in buckets]
+
+
+def timeseries_from_frames(frames, unit, start=None, end=None, include_bots=True):
+    """The same rows as query_timeseries, computed with pandas from exported events
+
+    frames maps each source collection to a DataFrame with its time field and
+    (where it has one) breakdown field.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if start is not None:
+        start = bucket_start(start, unit)
+    counted = {}
+    bounds = []
+    for source, frame in frames.items():
+        metric, time_field, dim_field = ROLLUP_SOURCES[source]
+        times = pd.to_datetime(frame[time_field])
+        mask = np.ones(len(frame), dtype=bool)
+        if start is not None:
+            mask &= (times >= start).to_numpy()
+        if end is not None:
+            mask &= (times < end).to_numpy()
+        if not include_bots and "is_bot" in frame:
+            mask &= ~frame["is_bot"].fillna(False).astype(bool).to_numpy()
+        times = times[mask]
+        if times.empty:
+            continue
+        if unit == "week":
+            buckets = times.dt.floor("D") - pd.to_timedelta(times.dt.weekday, unit="D")
+        else:
+            buckets = times.dt.floor("h" if unit == "hour" else "D")
+        dims = frame[dim_field][mask].fillna("unknown").astype(str) if dim_field else pd.Series("", index=buckets.index)
+        counts = pd.DataFrame({"bucket": buckets.to_numpy(), "dim": dims.to_numpy()}).value_counts()
+        counted[source] = counts
+        bounds.extend([buckets.min(), buckets.max()])
+
+    if not bounds:
+        return []
+    first = start if start is not None else min(bounds).to_pydatetime()
+    last = end if end is not None else max(bounds).to_pydatetime() + TIMESERIES_UNITS[unit]
+    buckets = bucket_range(first, last, unit)
+    groups = []
+    for source, counts in counted.items():
+        metric, _, dim_field = ROLLUP_SOURCES[source]
+        for (bucket, dim), count in counts.items():
+            groups.append({
+                "_id": {"metric": metric, "bucket": pd.Timestamp(bucket).to_pydatetime(), "dim": dim or None},
+                "count": int(count),
+            })
+    return rows_from_groups(groups, buckets)
@@ -0,0 +1,94 @@
+import functools
+import logging
+import re
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Event collections tagged with is_bot/browser_family (contact messages are always human)
+TAGGED_COLLECTIONS = ("portfolio_views", "resume_downloads")
+
+UserAgentInfo = namedtuple("UserAgentInfo", ["is_bot", "browser_family"])
+
+# Substrings that mark crawlers, previewers, monitors and scripted clients (matched case-insensitively)
+BOT_TOKENS = (
+    "bot", "crawl", "spider", "slurp", "archiver", "scrapy", "facebookexternalhit", "embedly", "preview",
+    "headlesschrome", "phantomjs", "lighthouse", "pingdom", "uptime", "monitor", "feedfetcher",
+    "curl/", "wget/", "python-requests", "python-urllib", "aiohttp", "httpx", "go-http-client",
+    "java/", "okhttp", "axios/", "node-fetch", "libwww-perl", "postmanruntime",
+)
+
+# Browser family -> identifying tokens, in priority order: most UAs also claim
+# the engines they are built on (Edge says Chrome and Safari, Chrome says Safari)
+BROWSER_TOKENS = (
+    ("edge", ("edg/", "edge/", "edga/", "edgios/")),
+    ("opera", ("opr/", "opera")),
+    ("samsung", ("samsungbrowser/",)),
+    ("firefox", ("firefox/", "fxios/")),
+    ("chrome", ("chrome/", "crios/", "chromium/")),
+    ("safari", ("safari/",)),
+    ("ie", ("msie ", "trident/")),
+)
+
+BROWSER_PRIORITY = {family: rank for rank, (family, _) in enumerate(BROWSER_TOKENS)}
+
+
+def _group(tokens):
+    return "|".join(re.escape(token) for token in sorted(tokens, key=len, reverse=True))
+
+
+def compile_matcher(bot_tokens=BOT_TOKENS, browser_tokens=BROWSER_TOKENS):
+    """One case-insensitive regex over every token, with a named group per bot/browser family"""
+    groups = [f"(?P<bot>{_group(bot_tokens)})"]
+    groups.extend(f"(?P<{family}>{_group(tokens)})" for family, tokens in browser_tokens)
+    return re.compile("|".join(groups), re.IGNORECASE)
+
+
+class UserAgentClassifier:
+    """Classifies user agents as bot or human and by browser family
+
+    Every token is matched in a single pass of one precompiled regex; results
+    are memoized in an LRU of ``max_entries`` user agents, since a handful of
+    UAs make up most traffic. A missing or empty user agent counts as a bot:
+    browsers always send one.
+    """
+
+    def __init__(self, max_entries=10000, matcher=None):
+        self.matcher = matcher or compile_matcher()
+        self.classify = functools.lru_cache(maxsize=max_entries)(self._classify)
+
+    def _classify(self, user_agent):
+        if not user_agent:
+            return UserAgentInfo(True, None)
+        families = {match.lastgroup for match in self.matcher.finditer(user_agent)}
+        is_bot = "bot" in families
+        families.discard("bot")
+        family = min(families, key=BROWSER_PRIORITY.__getitem__) if families else "other"
+        return UserAgentInfo(is_bot, family)
+
+
+async def tag_collection(db, classifier, collection, codec=None, batch_size=1000):
+    """Set is_bot/browser_family on events stored before classification; returns the number tagged"""
+    from pymongo import UpdateOne
+
+    tagged = 0
+    last_id = None
+    while True:
+        query = {"is_bot": {"$exists": False}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await db[collection].find(query).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            return tagged
+        last_id = batch[-1]["_id"]
+        documents = await codec.decode(collection, batch) if codec is not None else batch
+        updates = []
+        for stored, document in zip(batch, documents):
+            info = classifier.classify(document.get("user_agent"))
+            updates.append(UpdateOne(
+                {"_id": stored["_id"]},
+                {"$set": {"is_bot": info.is_bot, "browser_family": info.browser_family}},
+            ))
+        await db[collection].bulk_write(updates, ordered=False)
+        tagged += len(batch)
+        logger.info(f"Classified {tagged} {collection} events")
@@ -245,16 +245,19 @@ def test_contact_messages_admin():
     print("-" * 70)
     
     try:
-        response = requests.get(f"{API_BASE}/contact-messages")
+        # Needs the backend's ADMIN_TOKEN
+        response = requests.get(f"{API_BASE}/contact-messages", headers={"X-Admin-Token": os.environ.get("ADMIN_TOKEN", "")})
         print(f"Status Code: {response.status_code}")
         
         if response.status_code == 200:
             data = response.json()
-            print(f"Number of messages retrieved: {len(data)}")
+            messages = data.get("items", [])
+            print(f"Number of messages retrieved: {len(messages)}")
+            print(f"Next cursor: {data.get('next_cursor')}")
             
-            if len(data) > 0:
+            if len(messages) > 0:
                 print("Sample message structure:")
-                print(json.dumps(data[0], indent=2))
+                print(json.dumps(messages[0], indent=2))
             
             print("✅ Contact messages admin endpoint working correctly")
             return True
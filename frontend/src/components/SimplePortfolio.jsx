@@ -13,6 +13,7 @@ const SimplePortfolio = () => {
   const [expandedExperience, setExpandedExperience] = useState(null);
   const [isLoaded, setIsLoaded] = useState(false);
   const [isDownloading, setIsDownloading] = useState(false);
+  const [portfolio, setPortfolio] = useState(null);
   const { toast } = useToast();
 
   const handleDownloadResume = async () => {
@@ -66,74 +67,47 @@ const SimplePortfolio = () => {
     }
   };
 
+  const loadPortfolio = async () => {
+    try {
+      const response = await axios.get(`${API}/portfolio`);
+      setPortfolio(response.data);
+    } catch (error) {
+      console.error('Error loading portfolio content:', error);
+    }
+  };
+
   useEffect(() => {
     setIsLoaded(true);
+    loadPortfolio();
     trackPageView();
   }, []);
 
+  // Content comes from the backend (data/resume.json), the same source the resume downloads are rendered from
   const personalInfo = {
-    name: "Nikhil Kumar Bandi",
-    email: "bandinikhilgoud4545@gmail.com",
-    phone: "+91 XXXXX-XXXXX",
-    location: "Available Globally",
-    bio: "IT Professional with 3+ years of experience in Software Development, skilled at operating in a wide range of platforms including DevOps/SRE/Platform engineering, AWS, GCP, and Linux environments. Passionate about implementing modern DevOps practices, optimizing cloud infrastructure, and ensuring high availability and performance of critical systems."
+    name: portfolio?.name ?? "",
+    email: portfolio?.contact.email ?? "",
+    phone: portfolio?.contact.phone ?? "",
+    location: portfolio?.contact.location ?? "",
+    bio: portfolio?.summary ?? ""
   };
 
-  const workExperiences = [
-    {
-      id: 1,
-      role: "Platform Engineer",
-      company: "SIDGS DIGISOL Pvt Ltd",
-      status: "Current Position",
-      type: "Full-time",
-      icon: <Cloud className="w-5 h-5" />,
-      description: "Leading DevOps initiatives and platform engineering for enterprise-scale applications.",
-      projectRoles: [
-        {
-          project: "BDO Bank - Banking Microservices Platform",
-          role: "DevOps Engineer/Application Support Engineer",
-          responsibilities: [
-            "Utilized archetypes to establish structured development environments with necessary dependencies and automation",
-            "Managed build and release processes, including dependency management and deployment strategies",
-            "Developed Helm charts to package and deploy applications on Kubernetes efficiently",
-            "Ensured zero-downtime deployments and efficiently troubleshot issues",
-            "Orchestrated CI/CD pipelines using GitLab for automated builds and deployments",
-            "Built and published centralized artifacts using Maven, deploying to artifact registry",
-            "Built custom Docker images using optimized Dockerfiles for efficient deployments",
-            "Configured and deployed microservices on Amazon EKS with seamless integration",
-            "Developed custom CloudWatch queries to monitor payment and transaction-related errors",
-            "Managed TLS/mTLS certificates for secure communication with Apigee X platform"
-          ],
-          technologies: ["AWS EKS", "Docker", "Kubernetes", "Helm", "GitLab CI/CD", "Maven", "CloudWatch", "Apigee X", "TLS/mTLS", "Trivy", "Co-sign"]
-        }
-      ]
-    },
-    {
-      id: 2,
-      role: "System Administrator",
-      company: "Anything 4 Home Ltd",
-      status: "Previous Role",
-      type: "Full-time",
-      icon: <Database className="w-5 h-5" />,
-      description: "Managed comprehensive system administration and monitoring infrastructure for e-commerce platform.",
-      projectRoles: [
-        {
-          project: "E-commerce Infrastructure Modernization",
-          role: "System Administrator",
-          responsibilities: [
-            "Managed cloud infrastructure, security, and resource configurations as System Administrator",
-            "Specialized in monitoring and troubleshooting, focusing on tracing, logging, and debugging microservices",
-            "Monitored and managed CD deployments using ArgoCD for seamless rollouts and quick failure recovery",
-            "Implemented real-time monitoring and alerting using Prometheus and Grafana",
-            "Diagnosed and resolved microservices issues leveraging CloudWatch and centralized logging tools",
-            "Automated log analysis and alerting to proactively detect performance bottlenecks",
-            "Collaborated with DevOps and SRE teams to optimize system reliability and enhance observability"
-          ],
-          technologies: ["ArgoCD", "Prometheus", "Grafana", "CloudWatch", "Microservices", "System Administration", "Linux"]
-        }
-      ]
-    }
-  ];
+  const experienceIcons = [<Cloud className="w-5 h-5" />, <Database className="w-5 h-5" />];
+
+  const workExperiences = (portfolio?.experience ?? []).map((entry, index) => ({
+    id: index + 1,
+    role: entry.title,
+    company: entry.company,
+    status: entry.period,
+    type: entry.employment_type,
+    icon: experienceIcons[index % experienceIcons.length],
+    description: entry.summary,
+    projectRoles: entry.projects.map((project) => ({
+      project: project.name,
+      role: project.role,
+      responsibilities: project.responsibilities,
+      technologies: project.technologies
+    }))
+  }));
 
   const toggleExperience = (id) => {
     setExpandedExperience(expandedExperience === id ? null : id);
@@ -147,7 +121,7 @@ const SimplePortfolio = () => {
     window.open(`tel:${personalInfo.phone}`, '_blank');
   };
 
-  const techStack = ["DevOps", "AWS", "GCP", "Docker", "Kubernetes", "Jenkins", "GitLab", "Terraform", "Python"];
+  const techStack = portfolio?.tech_stack ?? [];
 
   return (
     <div className="min-h-screen bg-gradient-to-br from-gray-900 via-black to-gray-800 text-white">
@@ -5,17 +5,12 @@ db = db.getSiblingDB('portfolio_db');
 db.createCollection('portfolio_views');
 db.createCollection('resume_downloads');
 db.createCollection('contact_messages');
+db.createCollection('analytics_rollups');
+db.createCollection('visitor_sketches');
+db.createCollection('user_agents');
 
-// Create indexes for better performance
-db.portfolio_views.createIndex({ "visited_at": 1 });
-db.portfolio_views.createIndex({ "ip_address": 1 });
-
-db.resume_downloads.createIndex({ "downloaded_at": 1 });
-db.resume_downloads.createIndex({ "ip_address": 1 });
-
-db.contact_messages.createIndex({ "created_at": 1 });
-db.contact_messages.createIndex({ "email": 1 });
-db.contact_messages.createIndex({ "is_read": 1 });
+// Indexes are declared in backend/indexes.py and created by the backend at
+// startup (or with `python manage.py ensure-indexes`)
 
 // Insert initial data (optional)
 db.portfolio_views.insertOne({
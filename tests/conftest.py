@@ -0,0 +1,46 @@
+"""Shared test setup: the backend on sys.path, an injectable clock and the app module"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+ADMIN_TOKEN = "test-admin-token"
+
+
+class FakeClock:
+    """A monotonic clock that only moves when a test sets ``now``"""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def dead_pid():
+    """The pid of a process that has already exited"""
+    process = subprocess.Popen([sys.executable, "-c", ""])
+    process.wait()
+    return process.pid
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture(scope="session")
+def server(tmp_path_factory):
+    """The server module, with its caches and spool under a temporary directory"""
+    directory = tmp_path_factory.mktemp("server")
+    for name in ("SHARED_CACHE_DIR", "RESUME_CACHE_DIR", "SPOOL_DIR"):
+        os.environ.setdefault(name, str(directory / name.lower()))
+    import server
+
+    server.ADMIN_TOKEN = ADMIN_TOKEN
+    return server
@@ -0,0 +1,52 @@
+"""GET /api/analytics from the rollups, against mongomock"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def api(server, monkeypatch):
+    db = mongomock_motor.AsyncMongoMockClient()[f"analytics_{uuid.uuid4().hex}"]
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server.analytics_rollups, "db", db)
+    monkeypatch.setattr(server.unique_visitors, "db", db)
+    monkeypatch.setattr(server, "ANALYTICS_SNAPSHOT_TTL", 0)
+
+    def get(**params):
+        async def request():
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.get("/api/analytics", params=params)
+
+        return asyncio.run(request())
+
+    views = [
+        {"visited_at": NOW, "page_viewed": "portfolio", "is_bot": False},
+        {"visited_at": NOW + timedelta(minutes=5), "page_viewed": "portfolio", "is_bot": True},
+        {"visited_at": NOW + timedelta(hours=1), "page_viewed": "resume", "is_bot": False},
+    ]
+    asyncio.run(server.analytics_rollups.record("portfolio_views", views))
+    return get
+
+
+def test_bots_are_counted_unless_excluded(api):
+    assert api().json()["total_views"] == 3
+    assert api(exclude_bots="true").json()["total_views"] == 2
+
+
+def test_timezone_aware_ranges(api):
+    # 14:00+02:00 is 12:00 UTC, the hour of the first two views
+    response = api(granularity="hour", start="2024-06-01T14:00:00+02:00", end="2024-06-01T15:00:00Z")
+    assert response.status_code == 200
+    series = response.json()["series"]
+    assert [(row["bucket"], row["views"]) for row in series] == [
+        ("2024-06-01T12:00:00", 2), ("2024-06-01T13:00:00", 1),
+    ]
+    assert series[0]["views_breakdown"] == {"portfolio": 2}
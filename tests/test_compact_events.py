@@ -0,0 +1,98 @@
+"""Compact event schema: codec round trip, user agent interning and in-place migration"""
+import asyncio
+import uuid
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("bson")
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from bson.binary import Binary  # noqa: E402
+
+from compact_events import EventCodec, UserAgentDirectory, migrate_collection, user_agent_id  # noqa: E402
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+FIREFOX = "Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0"
+
+
+@pytest.fixture
+def db():
+    return mongomock_motor.AsyncMongoMockClient()[f"compact_{uuid.uuid4().hex}"]
+
+
+def view(ip_address="203.0.113.7", user_agent=FIREFOX):
+    return {
+        "id": str(uuid.uuid4()),
+        "ip_address": ip_address,
+        "user_agent": user_agent,
+        "visited_at": NOW,
+        "page_viewed": "portfolio",
+    }
+
+
+def test_round_trip(db):
+    codec = EventCodec(UserAgentDirectory(db))
+    documents = [view(), view("2001:db8::1"), view("not an address", user_agent=None), view(user_agent="")]
+
+    async def scenario():
+        stored = await codec.encode("portfolio_views", documents)
+        # A fresh process resolves the interned user agent from Mongo
+        decoded = await EventCodec(UserAgentDirectory(db)).decode("portfolio_views", stored)
+        return stored, decoded, await db.user_agents.find().to_list(None)
+
+    stored, decoded, user_agents = asyncio.run(scenario())
+    assert decoded == [dict(document, user_agent=document["user_agent"] or None) for document in documents]
+    assert isinstance(stored[0]["id"], Binary) and len(stored[0]["ip_address"]) == 4
+    assert len(stored[1]["ip_address"]) == 16
+    assert stored[2]["ip_address"] == "not an address"
+    assert stored[0]["ua"] == user_agent_id(FIREFOX) and "user_agent" not in stored[0]
+    assert "ua" not in stored[2] and "ua" not in stored[3]
+    assert user_agents == [{"_id": user_agent_id(FIREFOX), "ua": FIREFOX}]
+
+
+def test_other_collections_are_left_alone(db):
+    codec = EventCodec(UserAgentDirectory(db))
+    message = {"id": str(uuid.uuid4()), "email": "a@example.com"}
+    assert asyncio.run(codec.encode("contact_messages", [message])) == [message]
+
+
+def test_user_agents_are_interned_once_per_process(db):
+    directory = UserAgentDirectory(db)
+    writes = []
+    collection = db.user_agents
+    original = collection.bulk_write
+
+    async def bulk_write(requests, **kwargs):
+        writes.append(len(requests))
+        return await original(requests, **kwargs)
+
+    collection.bulk_write = bulk_write
+    directory.db = {"user_agents": collection}
+
+    async def scenario():
+        await directory.intern([FIREFOX, FIREFOX, "curl/8.4.0"])
+        await directory.intern([FIREFOX, "curl/8.4.0"])
+
+    asyncio.run(scenario())
+    assert writes == [2]
+
+
+def test_migration_converts_legacy_documents_and_is_resumable(db):
+    codec = EventCodec(UserAgentDirectory(db))
+    legacy = [view() for _ in range(5)]
+
+    async def scenario():
+        await db.portfolio_views.insert_many([dict(document) for document in legacy])
+        # One document was already written in the compact schema
+        await db.portfolio_views.insert_many(await codec.encode("portfolio_views", [view()]))
+        converted = await migrate_collection(db, codec, "portfolio_views", batch_size=2)
+        again = await migrate_collection(db, codec, "portfolio_views", batch_size=2)
+        stored = await db.portfolio_views.find({}, {"_id": 0}).to_list(None)
+        return converted, again, stored, await codec.decode("portfolio_views", stored)
+
+    converted, again, stored, decoded = asyncio.run(scenario())
+    assert (converted, again) == (5, 0)
+    assert all(isinstance(document["id"], Binary) and "user_agent" not in document for document in stored)
+    assert [document["id"] for document in decoded[:5]] == [document["id"] for document in legacy]
+    assert all(document["user_agent"] == FIREFOX for document in decoded)
@@ -0,0 +1,114 @@
+"""Contact admin endpoints through the app, against mongomock
+
+Covers the admin token guard and POST /api/contact-messages/bulk: id lists
+mixed with filters, selections that would match everything, and taking
+deleted messages back out of the analytics rollups.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from tests.conftest import ADMIN_TOKEN as TOKEN
+
+httpx = pytest.importorskip("httpx")
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def db(server):
+    database = mongomock_motor.AsyncMongoMockClient()[f"contact_admin_{uuid.uuid4().hex}"]
+    server.db = database
+    server.analytics_rollups.db = database
+    return database
+
+
+def message(email, minutes_ago, is_read=False):
+    return {
+        "id": str(uuid.uuid4()),
+        "name": "Visitor",
+        "email": email,
+        "subject": "Hello",
+        "message": "Let's talk",
+        "is_read": is_read,
+        "created_at": NOW - timedelta(minutes=minutes_ago),
+    }
+
+
+async def seed(server, db, messages):
+    await db.contact_messages.insert_many([dict(m) for m in messages])
+    await server.analytics_rollups.record("contact_messages", messages)
+
+
+async def post_bulk(server, operations, token=TOKEN):
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = {"X-Admin-Token": token} if token else {}
+        return await client.post("/api/contact-messages/bulk", json={"operations": operations}, headers=headers)
+
+
+def test_admin_endpoints_require_the_token(server, db):
+    assert asyncio.run(post_bulk(server, [{"action": "delete", "before": "2100-01-01T00:00:00"}], token=None)).status_code == 401
+    assert asyncio.run(post_bulk(server, [{"action": "delete", "before": "2100-01-01T00:00:00"}], token="wrong")).status_code == 401
+    server.ADMIN_TOKEN = ""
+    try:
+        assert asyncio.run(post_bulk(server, [{"action": "mark_read", "ids": ["x"]}])).status_code == 503
+    finally:
+        server.ADMIN_TOKEN = TOKEN
+
+
+def test_bulk_mixes_ids_and_filters(server, db):
+    alice = [message("alice@example.com", minutes) for minutes in (1, 2, 3)]
+    bob = [message("bob@example.com", minutes, is_read=True) for minutes in (4, 5)]
+
+    async def scenario():
+        await seed(server, db, alice + bob)
+        response = await post_bulk(server, [
+            {"action": "mark_read", "ids": [alice[0]["id"], alice[1]["id"]]},
+            # Filters combine with ids: only bob's messages in the list are touched
+            {"action": "mark_unread", "ids": [alice[2]["id"], bob[0]["id"]], "email": "bob@example.com"},
+            {"action": "delete", "email": "bob@example.com", "is_read": True},
+        ])
+        stored = {doc["id"]: doc["is_read"] async for doc in db.contact_messages.find({}, {"_id": 0})}
+        return response, stored
+
+    response, stored = asyncio.run(scenario())
+    assert response.status_code == 200
+    # Selections are resolved before writing, so bob[0] (marked unread by the second
+    # operation) is still deleted by the third, which matched it as read
+    assert response.json()["deleted"] == 2
+    assert stored == {alice[0]["id"]: True, alice[1]["id"]: True, alice[2]["id"]: False}
+
+
+@pytest.mark.parametrize("operation", [
+    {"action": "delete"},
+    {"action": "delete", "ids": []},
+    {"action": "mark_read", "email": None},
+])
+def test_selection_of_everything_is_rejected(server, db, operation):
+    response = asyncio.run(post_bulk(server, [operation]))
+    assert response.status_code == 400
+
+
+def test_empty_match_writes_nothing(server, db):
+    response = asyncio.run(post_bulk(server, [{"action": "delete", "ids": ["missing"]}]))
+    assert response.status_code == 200
+    assert response.json() == {"matched": 0, "modified": 0, "deleted": 0}
+
+
+def test_delete_retracts_rollups(server, db):
+    messages = [message("carol@example.com", minutes) for minutes in (1, 2, 3)]
+
+    async def scenario():
+        await seed(server, db, messages)
+        before = (await server.analytics_rollups.totals())["contacts"]
+        response = await post_bulk(server, [{"action": "delete", "ids": [messages[0]["id"], messages[1]["id"]]}])
+        after = (await server.analytics_rollups.totals())["contacts"]
+        return response, before, after
+
+    response, before, after = asyncio.run(scenario())
+    assert response.json()["deleted"] == 2
+    assert (before, after) == (3, 1)
@@ -0,0 +1,137 @@
+"""Keyset pagination of contact messages: cursors, filters and GET /api/contact-messages pages (admin only)"""
+import asyncio
+import base64
+import json
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from contact_queries import contact_messages_filter, decode_cursor, encode_cursor
+
+from tests.conftest import ADMIN_TOKEN as TOKEN
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+ADMIN = {"X-Admin-Token": TOKEN}
+
+
+def raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    document = {"created_at": NOW, "id": "b1"}
+    assert decode_cursor(encode_cursor(document)) == (NOW, "b1")
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not base64!",
+    raw_cursor(["2024-06-01T12:00:00"]),
+    raw_cursor(["yesterday", "b1"]),
+    raw_cursor({"created_at": "2024-06-01T12:00:00", "id": "b1"}),
+    encode_cursor({"created_at": NOW, "id": "b1"})[:-3],
+])
+def test_malformed_or_tampered_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_filter_combinations():
+    assert contact_messages_filter() == {}
+    assert contact_messages_filter(is_read=False) == {"is_read": False}
+    assert contact_messages_filter(email="a@example.com", is_read=True) == {"email": "a@example.com", "is_read": True}
+    query = contact_messages_filter(email="a@example.com", cursor=encode_cursor({"created_at": NOW, "id": "b1"}))
+    assert query == {
+        "email": "a@example.com",
+        "created_at": {"$lte": NOW},
+        "$or": [{"created_at": {"$lt": NOW}}, {"id": {"$lt": "b1"}}],
+    }
+
+
+httpx = pytest.importorskip("httpx")
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+@pytest.fixture
+def messages(server):
+    database = mongomock_motor.AsyncMongoMockClient()[f"contact_pages_{uuid.uuid4().hex}"]
+    server.db = database
+    # Three messages share each timestamp, so pages must break ties on id
+    documents = [
+        {
+            "id": f"{minute}-{n}-{uuid.uuid4().hex[:6]}",
+            "name": "Visitor",
+            "email": "a@example.com" if n % 2 else "b@example.com",
+            "subject": "Hello",
+            "message": "Hi",
+            "is_read": n == 0,
+            "created_at": NOW - timedelta(minutes=minute),
+        }
+        for minute in range(4)
+        for n in range(3)
+    ]
+    asyncio.run(database.contact_messages.insert_many([dict(document) for document in documents]))
+    return documents
+
+
+def fetch_all(server, **params):
+    async def pages():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            seen, cursor, count = [], None, 0
+            while True:
+                query = dict(params, **({"cursor": cursor} if cursor else {}))
+                response = await client.get("/api/contact-messages", params=query, headers=ADMIN)
+                assert response.status_code == 200
+                body = response.json()
+                assert set(body) == {"items", "next_cursor"}
+                seen.extend(item["id"] for item in body["items"])
+                count += 1
+                cursor = body["next_cursor"]
+                if cursor is None:
+                    return seen, count
+
+    return asyncio.run(pages())
+
+
+def expected_order(documents):
+    ordered = sorted(documents, key=lambda document: (document["created_at"], document["id"]), reverse=True)
+    return [document["id"] for document in ordered]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 5, 12, 50])
+def test_pages_cover_every_message_once_across_equal_timestamps(server, messages, limit):
+    seen, pages = fetch_all(server, limit=limit)
+    assert seen == expected_order(messages)
+    assert pages == max(1, -(-len(messages) // limit))
+
+
+def test_pages_with_filters(server, messages):
+    seen, _ = fetch_all(server, limit=2, email="a@example.com")
+    assert seen == expected_order([m for m in messages if m["email"] == "a@example.com"])
+    seen, _ = fetch_all(server, limit=2, is_read=False, email="b@example.com")
+    assert seen == expected_order([m for m in messages if m["email"] == "b@example.com" and not m["is_read"]])
+
+
+@pytest.mark.parametrize("cursor", ["garbage", raw_cursor(["2024-06-01T12:00:00"])])
+def test_bad_cursor_is_a_400(server, messages, cursor):
+    async def get():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/api/contact-messages", params={"cursor": cursor}, headers=ADMIN)
+
+    response = asyncio.run(get())
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+def test_listing_requires_the_admin_token(server, messages):
+    async def get(headers):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/api/contact-messages", headers=headers)
+
+    assert asyncio.run(get({})).status_code == 401
+    assert asyncio.run(get({"X-Admin-Token": "wrong"})).status_code == 401
+    assert asyncio.run(get(ADMIN)).status_code == 200
@@ -0,0 +1,73 @@
+"""GeoIP range database and enrichment, against the synthetic fixture database
+
+Everything is built locally with geoip.fixture_ranges, so no network access
+or MaxMind download is needed.
+"""
+import ipaddress
+
+import pytest
+
+from geoip import UNKNOWN, GeoIPEnricher, RangeDatabase, build_range_database, fixture_ranges
+
+FIXTURE_SIZE = 2000
+
+
+@pytest.fixture(scope="module")
+def ranges():
+    return list(fixture_ranges(FIXTURE_SIZE))
+
+
+@pytest.fixture(scope="module")
+def database(ranges, tmp_path_factory):
+    path = tmp_path_factory.mktemp("geoip") / "fixture.bin"
+    assert build_range_database(ranges, path) == FIXTURE_SIZE
+    database = RangeDatabase(path)
+    yield database
+    database.close()
+
+
+def public(ranges):
+    return [row for row in ranges if ipaddress.ip_address(row[0]).is_global and ipaddress.ip_address(row[1]).is_global]
+
+
+def test_range_bounds(database, ranges):
+    for first, last, country, asn in public(ranges)[::50]:
+        assert database.lookup(first) == (country, asn)
+        assert database.lookup(last) == (country, asn)
+        past = ipaddress.ip_address(last) + 1
+        if past.is_global and not any(row[0] == str(past) for row in ranges):
+            assert database.lookup(str(past)) == UNKNOWN
+
+
+def test_ipv4_mapped_ipv6(database, ranges):
+    first, _, country, asn = public([row for row in ranges if ":" not in row[0]])[0]
+    assert database.lookup(f"::ffff:{first}") == (country, asn)
+
+
+@pytest.mark.parametrize("address", ["10.1.2.3", "127.0.0.1", "192.168.0.1", "::1", "fe80::1", "fd00::1"])
+def test_non_public_addresses_are_unknown(database, address):
+    assert database.lookup(address) == UNKNOWN
+
+
+def test_enricher_memoizes_and_tolerates_garbage(database, ranges):
+    enricher = GeoIPEnricher(database, max_entries=10)
+    first, _, country, asn = public(ranges)[0]
+    assert enricher.lookup(first) == (country, asn)
+    assert enricher.lookup(first) == (country, asn)
+    assert enricher.lookup.cache_info().hits == 1
+    assert enricher.lookup("not an address") == UNKNOWN
+    assert enricher.lookup(None) == UNKNOWN
+    assert GeoIPEnricher(None).lookup(first) == UNKNOWN
+
+
+def test_overlapping_ranges_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        build_range_database([("1.0.0.0", "1.0.0.255", "US", 1), ("1.0.0.128", "1.0.1.0", "AU", 2)], tmp_path / "bad.bin")
+
+
+def test_truncated_file_is_rejected(database, tmp_path):
+    data = database.path.read_bytes()
+    truncated = tmp_path / "truncated.bin"
+    truncated.write_bytes(data[:-1])
+    with pytest.raises(ValueError):
+        RangeDatabase(truncated)
@@ -0,0 +1,90 @@
+"""Event buffer: batched, grouped flushes, bounded queue and draining on close"""
+import asyncio
+
+from ingest import EventBuffer
+
+
+class FakeCollection:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    async def insert_many(self, documents, ordered=True):
+        if self.fail:
+            raise ConnectionError("mongo is down")
+        assert not ordered
+        self.batches.append([document["n"] for document in documents])
+
+
+def database(**collections):
+    return {name: collections.get(name, FakeCollection()) for name in ("portfolio_views", "resume_downloads")}
+
+
+def test_batches_are_grouped_per_collection_and_drained_on_close():
+    db = database()
+    flushed = []
+
+    async def hook(collection, documents):
+        flushed.append((collection, len(documents)))
+
+    async def scenario():
+        buffer = EventBuffer(batch_size=3, flush_interval=60)
+        buffer.add_flush_hook(hook)
+        buffer.start(db)
+        for n in range(4):
+            await buffer.enqueue("portfolio_views", {"n": n})
+        await buffer.enqueue("resume_downloads", {"n": 10})
+        await buffer.close()
+        return buffer.stats
+
+    stats = asyncio.run(scenario())
+    # The first batch filled up at 3 events; close flushed the rest together
+    assert db["portfolio_views"].batches == [[0, 1, 2], [3]]
+    assert db["resume_downloads"].batches == [[10]]
+    assert flushed == [("portfolio_views", 3), ("portfolio_views", 1), ("resume_downloads", 1)]
+    assert stats["enqueued"] == stats["flushed"] == 5
+
+
+def test_partial_batches_are_flushed_after_the_interval():
+    db = database()
+
+    async def scenario():
+        buffer = EventBuffer(batch_size=100, flush_interval=0.01)
+        buffer.start(db)
+        await buffer.enqueue("portfolio_views", {"n": 1})
+        await asyncio.sleep(0.1)
+        written = list(db["portfolio_views"].batches)
+        await buffer.close()
+        return written
+
+    assert asyncio.run(scenario()) == [[1]]
+
+
+def test_full_queue_drops_instead_of_blocking():
+    async def scenario():
+        buffer = EventBuffer(enqueue_timeout=0.01)
+        # A queue with no writer draining it
+        buffer._queue = asyncio.Queue(maxsize=2)
+        results = [await buffer.enqueue("portfolio_views", {"n": n}) for n in range(3)]
+        return results, buffer.stats["dropped"]
+
+    assert asyncio.run(scenario()) == ([True, True, False], 1)
+
+
+def test_failed_writes_without_a_spool_are_counted_and_skip_hooks():
+    db = database(portfolio_views=FakeCollection(fail=True))
+    hooked = []
+
+    async def hook(collection, documents):
+        hooked.append(collection)
+
+    async def scenario():
+        buffer = EventBuffer()
+        buffer.add_flush_hook(hook)
+        buffer.db = db
+        await buffer._flush([("portfolio_views", {"n": 1}), ("resume_downloads", {"n": 2})])
+        return buffer.stats
+
+    stats = asyncio.run(scenario())
+    assert (stats["failed"], stats["flushed"]) == (1, 1)
+    assert hooked == ["resume_downloads"]
@@ -0,0 +1,98 @@
+"""Live analytics stream: coalesced deltas, slow subscribers and resync from the rollups"""
+import asyncio
+
+import orjson
+
+from live import KEEPALIVE_FRAME, LiveAnalytics, sse_frame
+
+
+def parse(frame):
+    event, data = frame.decode().strip().split("\n")
+    return event[len("event: "):], orjson.loads(data[len("data: "):])
+
+
+def drain(subscriber):
+    frames = []
+    while not subscriber.queue.empty():
+        frames.append(subscriber.queue.get_nowait())
+    return frames
+
+
+class FakeRollups:
+    db = object()
+
+    async def totals(self, include_bots=True):
+        return {"views": 10, "downloads": 4, "contacts": 1} if include_bots else {"views": 7, "downloads": 4, "contacts": 1}
+
+
+def test_sse_frame():
+    assert sse_frame("delta", {"a": 1}) == b'event: delta\ndata: {"a":1}\n\n'
+
+
+def test_events_are_coalesced_into_one_delta_per_tick():
+    live = LiveAnalytics(clock=lambda: 1.0)
+    subscriber = live.subscribe()
+
+    async def scenario():
+        await live.record("portfolio_views", [{"page_viewed": "portfolio"}, {"page_viewed": "resume", "is_bot": True}])
+        await live.record("resume_downloads", [{"download_type": "pdf"}])
+        await live.record("unknown", [{}])
+
+    asyncio.run(scenario())
+    assert live.publish() is not None
+    assert live.publish() is None  # nothing new since
+    frames = [parse(frame) for frame in drain(subscriber)]
+    assert frames[0] == ("snapshot", {"t": 1.0, "totals": {"views": 0, "downloads": 0, "contacts": 0},
+                                      "bots": {"views": 0, "downloads": 0, "contacts": 0}})
+    event, delta = frames[1]
+    assert event == "delta" and len(frames) == 2
+    assert delta["totals"] == {"views": 2, "downloads": 1, "contacts": 0}
+    assert delta["delta"] == {"views": 2, "downloads": 1}
+    assert delta["delta_bots"] == {"views": 1}
+    assert delta["delta_breakdown"] == {"views": {"portfolio": 1, "resume": 1}, "downloads": {"pdf": 1}}
+
+
+def test_slow_subscribers_keep_the_latest_frames():
+    live = LiveAnalytics(client_buffer=2)
+    subscriber = live.subscribe()
+    for n in range(3):
+        live.broadcast(f"frame-{n}".encode())
+    assert drain(subscriber) == [b"frame-1", b"frame-2"]
+    live.unsubscribe(subscriber)
+    assert live.stats["dropped"] == 2
+
+
+def test_subscribers_are_capped_and_closed_on_shutdown():
+    live = LiveAnalytics(max_subscribers=1)
+    subscriber = live.subscribe()
+    assert live.subscribe() is None
+    live.close()
+    assert drain(subscriber)[-1] is None
+
+
+def test_resync_replaces_totals_with_the_rollups():
+    live = LiveAnalytics(FakeRollups())
+
+    async def scenario():
+        await live.record("portfolio_views", [{}])
+        await live.resync()
+
+    asyncio.run(scenario())
+    assert live.totals == {"views": 10, "downloads": 4, "contacts": 1}
+    assert live.bots == {"views": 3, "downloads": 0, "contacts": 0}
+    # The pending view is already in the resynced totals, so it is sent without being added twice
+    live.publish(apply=False)
+    assert live.totals["views"] == 10
+
+
+def test_run_sends_keepalives_when_idle():
+    live = LiveAnalytics(tick=0.01, keepalive=0.02, resync_interval=0)
+    subscriber = live.subscribe()
+
+    async def scenario():
+        task = asyncio.create_task(live.run())
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+    asyncio.run(scenario())
+    assert KEEPALIVE_FRAME in drain(subscriber)
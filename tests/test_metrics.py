@@ -0,0 +1,49 @@
+"""Prometheus exposition, per process and across gunicorn workers"""
+import json
+import os
+
+from metrics import Counter, Histogram, Registry, WorkerExposition
+
+from tests.conftest import dead_pid
+
+
+def registry():
+    registry = Registry()
+    requests = Counter("requests", "Requests served", ("route",), registry=registry)
+    latency = Histogram("latency_seconds", "Latency", buckets=(0.1,), registry=registry)
+    requests.inc(route="/api/")
+    latency.observe(0.05)
+    return registry
+
+
+def test_render():
+    assert registry().render() == (
+        "# HELP requests Requests served\n"
+        "# TYPE requests counter\n"
+        'requests{route="/api/"} 1\n'
+        "# HELP latency_seconds Latency\n"
+        "# TYPE latency_seconds histogram\n"
+        'latency_seconds_bucket{le="0.1"} 1\n'
+        'latency_seconds_bucket{le="+Inf"} 1\n'
+        "latency_seconds_sum 0.05\n"
+        "latency_seconds_count 1\n"
+    )
+
+
+def test_every_live_worker_is_rendered_by_whichever_answers(tmp_path):
+    exposition = WorkerExposition(tmp_path, registry=registry())
+    # Another live worker (our parent stands in for it) published earlier; a dead one left its file behind
+    other = os.getppid()
+    (tmp_path / f"{other}.json").write_text(json.dumps([("requests", "counter", "Requests served", [("", '{route="/api/"}', 7)])]))
+    stale = tmp_path / f"{dead_pid()}.json"
+    stale.write_text(json.dumps([("requests", "counter", "Requests served", [("", "", 1)])]))
+
+    text = exposition.render()
+    assert not stale.exists()
+    assert text.count("# TYPE requests counter") == 1
+    me = os.getpid()
+    assert f'requests{{worker="{me}",route="/api/"}} 1' in text
+    assert f'requests{{worker="{other}",route="/api/"}} 7' in text
+    assert f'latency_seconds_count{{worker="{me}"}} 1' in text
+    exposition.remove()
+    assert not (tmp_path / f"{me}.json").exists()
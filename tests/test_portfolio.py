@@ -0,0 +1,69 @@
+"""Portfolio content snapshots: prebuilt documents, encodings and reloading on change"""
+import gzip
+import json
+import os
+
+import orjson
+import pytest
+
+from portfolio import PORTFOLIO_SECTIONS, PortfolioContent
+
+from tests.conftest import BACKEND_DIR
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    path = tmp_path / "resume.json"
+    path.write_bytes((BACKEND_DIR / "data" / "resume.json").read_bytes())
+    return path
+
+
+def rewrite(path, **changes):
+    document = json.loads(path.read_text())
+    document.update(changes)
+    path.write_text(json.dumps(document))
+    # Make the change visible even on filesystems with coarse mtimes
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_documents_are_prebuilt_per_section(data_path):
+    snapshot = PortfolioContent(data_path).snapshot
+    full = orjson.loads(snapshot.document().body)
+    assert full["version"] == snapshot.version
+    assert full["tech_stack"] == snapshot.resume.tech_stack
+    assert orjson.loads(snapshot.document("experience").body) == full["experience"]
+    assert set(orjson.loads(snapshot.document("profile").body)) == set(PORTFOLIO_SECTIONS["profile"])
+    assert snapshot.document("unknown") is None
+
+
+def test_encoded_variants_decode_to_the_body(data_path):
+    document = PortfolioContent(data_path).snapshot.document()
+    encoding, etag, body = document.encoded("gzip")
+    assert encoding == "gzip"
+    assert gzip.decompress(body) == document.body
+    assert etag != document.etag
+    assert document.encoded(None) == (None, document.etag, document.body)
+
+
+def test_reload_on_change_keeps_unchanged_sections(data_path, clock):
+    content = PortfolioContent(data_path, check_interval=5, clock=clock)
+    before = content.current()
+    rewrite(data_path, headline="Site Reliability Engineer")
+    assert content.current() is before
+    clock.now = 5
+    after = content.current()
+    assert after.version != before.version
+    assert after.resume.headline == "Site Reliability Engineer"
+    assert after.document("profile").etag != before.document("profile").etag
+    assert after.document("skills").etag == before.document("skills").etag
+    assert after.resume_keys["json"] != before.resume_keys["json"]
+
+
+def test_invalid_file_keeps_previous_snapshot(data_path):
+    content = PortfolioContent(data_path, check_interval=0)
+    before = content.snapshot
+    data_path.write_text('{"name": ')
+    assert content.refresh() is False
+    assert content.snapshot is before
+    assert content.stats["failed_reloads"] == 1
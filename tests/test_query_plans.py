@@ -0,0 +1,199 @@
+"""Query-plan regression tests for the queries issued by backend/server.py
+
+Each query is explained against a real mongod with the indexes from
+backend/indexes.py, and fails if the winning plan contains a collection
+scan (COLLSCAN) or a blocking in-memory SORT. Set MONGO_TEST_URL to point
+at a server; the module is skipped when none is reachable.
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+pymongo = pytest.importorskip("pymongo")
+
+from contact_queries import (  # noqa: E402
+    CONTACT_SORT,
+    contact_bulk_requests,
+    contact_messages_filter,
+    contact_messages_projection,
+    contact_search_pipeline,
+    encode_cursor,
+)
+from indexes import reconcile_indexes  # noqa: E402
+from rollups import ROLLUP_COLLECTION, rollup_id, series_query  # noqa: E402
+from timeseries import timeseries_pipeline  # noqa: E402
+from visitors import SKETCH_COLLECTION  # noqa: E402
+
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL", "mongodb://localhost:27017")
+TEST_DB = "portfolio_query_plan_tests"
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+
+FORBIDDEN_STAGES = {"COLLSCAN", "SORT"}
+
+
+@pytest.fixture(scope="module")
+def db():
+    client = pymongo.MongoClient(MONGO_TEST_URL, serverSelectionTimeoutMS=500)
+    try:
+        client.admin.command("ping")
+    except pymongo.errors.PyMongoError:
+        pytest.skip(f"No mongod reachable at {MONGO_TEST_URL}")
+    client.drop_database(TEST_DB)
+    database = client[TEST_DB]
+
+    async def create_indexes():
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        motor_client = AsyncIOMotorClient(MONGO_TEST_URL)
+        try:
+            await reconcile_indexes(motor_client[TEST_DB])
+        finally:
+            motor_client.close()
+
+    asyncio.run(create_indexes())
+    seed(database)
+    yield database
+    client.drop_database(TEST_DB)
+    client.close()
+
+
+def seed(database):
+    """Enough documents that the planner has real choices to make"""
+    times = [NOW - timedelta(hours=i) for i in range(200)]
+    database.contact_messages.insert_many([
+        {
+            "id": str(uuid.uuid4()), "name": "n", "email": f"user{i % 7}@example.com", "subject": "s",
+            "message": "m", "created_at": t, "is_read": i % 3 == 0,
+        }
+        for i, t in enumerate(times)
+    ])
+    database.portfolio_views.insert_many([
+        {"id": str(uuid.uuid4()), "ip_address": "10.0.0.1", "visited_at": t, "page_viewed": "portfolio"} for t in times
+    ])
+    database.resume_downloads.insert_many([
+        {"id": str(uuid.uuid4()), "ip_address": "10.0.0.1", "downloaded_at": t, "download_type": "pdf"} for t in times
+    ])
+    database[ROLLUP_COLLECTION].insert_many([
+        {"_id": rollup_id("views", "hour", t), "metric": "views", "granularity": "hour", "bucket": t, "count": 1}
+        for t in times
+    ])
+    database[SKETCH_COLLECTION].insert_many([
+        {"_id": f"{(NOW - timedelta(days=i)):%Y-%m-%d}|w", "day": f"{(NOW - timedelta(days=i)):%Y-%m-%d}"}
+        for i in range(30)
+    ])
+
+
+def plan_stages(explain):
+    """Every stage name in the winning plan(s) of an explain document"""
+    stages = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == "rejectedPlans":
+                    continue
+                if key == "stage" and isinstance(value, str):
+                    stages.append(value)
+                walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+
+    walk(explain)
+    return stages
+
+
+def assert_indexed(explain):
+    stages = plan_stages(explain)
+    assert stages, "explain returned no plan"
+    assert not FORBIDDEN_STAGES.intersection(stages), f"plan uses {sorted(FORBIDDEN_STAGES.intersection(stages))}: {stages}"
+
+
+def cursor_after(database, **filters):
+    """A real cursor from the first page of the admin listing"""
+    first = database.contact_messages.find(contact_messages_filter(**filters)).sort(CONTACT_SORT).limit(10)
+    return encode_cursor(list(first)[-1])
+
+
+CONTACT_FILTERS = [
+    {},
+    {"is_read": False},
+    {"is_read": True},
+    {"email": "user3@example.com"},
+    {"email": "user3@example.com", "is_read": False},
+]
+
+
+@pytest.mark.parametrize("filters", CONTACT_FILTERS)
+@pytest.mark.parametrize("paged", [False, True])
+def test_contact_messages_listing(db, filters, paged):
+    # GET /api/contact-messages and /api/contact-messages/export
+    cursor = cursor_after(db, **filters) if paged else None
+    query = contact_messages_filter(cursor=cursor, **filters)
+    explain = db.contact_messages.find(query, contact_messages_projection("name,email")).sort(CONTACT_SORT).limit(51).explain()
+    assert_indexed(explain)
+
+
+@pytest.mark.parametrize("filters", [{}, {"is_read": False}])
+def test_contact_search(db, filters):
+    # GET /api/contact-messages/search: matches come from the text index; only they are sorted by score
+    pipeline = contact_search_pipeline("user3", 21, projection=contact_messages_projection(None), **filters)
+    stages = plan_stages(db.command("aggregate", "contact_messages", pipeline=pipeline, explain=True))
+    assert "COLLSCAN" not in stages, stages
+    assert any(stage.startswith("TEXT") for stage in stages), stages
+
+
+def test_contact_bulk_selection(db):
+    # POST /api/contact-messages/bulk writes by resolved id lists
+    ids = [doc["id"] for doc in db.contact_messages.find({}, {"id": 1}).limit(5)]
+    (request,) = contact_bulk_requests([("mark_read", ids)])
+    assert_indexed(db.contact_messages.find(request._filter).explain())
+
+
+def test_rollup_totals(db):
+    # AnalyticsRollups.totals
+    ids = [rollup_id(metric, "total") for metric in ("views", "downloads", "contacts")]
+    assert_indexed(db[ROLLUP_COLLECTION].find({"_id": {"$in": ids}}).explain())
+
+
+@pytest.mark.parametrize("granularity", ["hour", "day"])
+def test_rollup_series(db, granularity):
+    # AnalyticsRollups.series (GET /api/analytics?granularity=...)
+    query = series_query(granularity, NOW - timedelta(days=3), NOW)
+    assert_indexed(db[ROLLUP_COLLECTION].find(query).sort("bucket", 1).explain())
+
+
+def test_visitor_sketches(db):
+    # UniqueVisitors.estimate
+    days = [f"{(NOW - timedelta(days=i)):%Y-%m-%d}" for i in range(7)]
+    assert_indexed(db[SKETCH_COLLECTION].find({"day": {"$in": days}}).explain())
+
+
+def timeseries_branches(unit, start, end, include_bots=True):
+    """(collection, branch pipeline) for every collection the timeseries pipeline reads"""
+    pipeline = timeseries_pipeline(unit, start, end, include_bots)
+    branches = [("portfolio_views", pipeline[:2])]
+    for stage in pipeline:
+        if "$unionWith" in stage:
+            branches.append((stage["$unionWith"]["coll"], stage["$unionWith"]["pipeline"]))
+    return branches
+
+
+@pytest.mark.parametrize(
+    "collection,branch",
+    timeseries_branches("day", NOW - timedelta(days=2), NOW)
+    + timeseries_branches("day", NOW - timedelta(days=2), NOW, include_bots=False),
+)
+def test_timeseries_branches(db, collection, branch):
+    # GET /api/analytics/timeseries: each $unionWith branch must start with an indexed $match
+    explain = db.command("aggregate", collection, pipeline=branch, explain=True)
+    assert_indexed(explain)
+
+
+@pytest.mark.parametrize("collection", ["portfolio_views", "resume_downloads", "contact_messages"])
+def test_spool_replay_upsert(db, collection):
+    # SpoolReplayer upserts keyed on id
+    assert_indexed(db[collection].find({"id": str(uuid.uuid4())}).explain())
@@ -0,0 +1,137 @@
+"""Trusted-proxy client resolution and token-bucket rate limiting, without a server"""
+import asyncio
+import ipaddress
+
+import pytest
+
+from rate_limit import (
+    RateLimitMiddleware,
+    SharedTokenBuckets,
+    TokenBuckets,
+    TrustedProxyMiddleware,
+    parse_networks,
+    parse_rule,
+    resolve_client_ip,
+)
+
+PROXIES = parse_networks("127.0.0.1/32,172.28.0.10/32")
+
+
+def http_scope(path="/api/contact", client=("127.0.0.1", 4000), headers=()):
+    return {"type": "http", "method": "POST", "path": path, "client": client, "headers": list(headers)}
+
+
+async def call(app, scope):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages
+
+
+async def ok_app(scope, receive, send):
+    scope["route"] = "matched"
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+@pytest.mark.parametrize("peer, forwarded_for, expected", [
+    ("127.0.0.1", "203.0.113.7", "203.0.113.7"),
+    ("172.28.0.10", "198.51.100.1, 203.0.113.7", "203.0.113.7"),  # the hop nginx saw, not the spoofable left one
+    ("172.28.0.10", "203.0.113.7, 127.0.0.1", "203.0.113.7"),  # trusted hops are skipped
+    ("127.0.0.1", "127.0.0.1", "127.0.0.1"),
+    ("198.51.100.9", "203.0.113.7", "198.51.100.9"),  # untrusted peers cannot claim another address
+    ("127.0.0.1", None, "127.0.0.1"),
+    ("127.0.0.1", " , ", "127.0.0.1"),
+])
+def test_resolve_client_ip(peer, forwarded_for, expected):
+    assert resolve_client_ip(peer, forwarded_for, PROXIES) == expected
+
+
+def test_trusted_proxy_middleware_rewrites_client_in_place():
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen["client"] = scope["client"]
+        await ok_app(scope, receive, send)
+
+    middleware = TrustedProxyMiddleware(app, PROXIES)
+    scope = http_scope(headers=[(b"x-forwarded-for", b"198.51.100.1"), (b"x-forwarded-for", b"203.0.113.7")])
+    asyncio.run(call(middleware, scope))
+    assert seen["client"] == ("203.0.113.7", 4000)
+    # Outer middleware (metrics) reads the route the router set on the same scope
+    assert scope["route"] == "matched"
+
+
+def test_untrusted_peer_keeps_its_address():
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen["client"] = scope["client"]
+
+    scope = http_scope(client=("198.51.100.9", 5000), headers=[(b"x-forwarded-for", b"203.0.113.7")])
+    asyncio.run(call(TrustedProxyMiddleware(app, PROXIES), scope))
+    assert seen["client"] == ("198.51.100.9", 5000)
+
+
+def test_parse_rule():
+    assert parse_rule("5/60") == (5 / 60, 5.0)
+    assert parse_rule("60/60:20") == (1.0, 20.0)
+    assert parse_rule("10") == (10.0, 10.0)
+    assert parse_networks("10.0.0.0/8, ::1") == [ipaddress.ip_network("10.0.0.0/8"), ipaddress.ip_network("::1/128")]
+
+
+@pytest.mark.parametrize("store_factory", [
+    lambda clock, tmp_path: TokenBuckets(clock=clock),
+    lambda clock, tmp_path: SharedTokenBuckets(tmp_path / "buckets", slots=64, clock=clock),
+])
+def test_bucket_burst_and_refill(store_factory, tmp_path, clock):
+    store = store_factory(clock, tmp_path)
+    rule = parse_rule("2/10")  # one token per 5 seconds, burst of 2
+    assert store.take("a", rule) == (True, 0.0)
+    assert store.take("a", rule) == (True, 0.0)
+    allowed, retry_after = store.take("a", rule)
+    assert not allowed and retry_after == pytest.approx(5.0)
+    # Other keys have their own bucket
+    assert store.take("b", rule)[0]
+    clock.now += 2.5
+    allowed, retry_after = store.take("a", rule)
+    assert not allowed and retry_after == pytest.approx(2.5)
+    clock.now += 2.5
+    assert store.take("a", rule)[0]
+    # Refill is capped at the burst
+    clock.now += 1000
+    assert [store.take("a", rule)[0] for _ in range(3)] == [True, True, False]
+
+
+def test_memory_buckets_evict_least_recently_used(clock):
+    store = TokenBuckets(max_entries=2, clock=clock)
+    rule = parse_rule("1/60")
+    store.take("a", rule)
+    store.take("b", rule)
+    store.take("a", rule)
+    store.take("c", rule)
+    assert len(store) == 2
+    # "b" was evicted, so it starts again from a full bucket; "c" was kept
+    assert not store.take("c", rule)[0]
+    assert store.take("b", rule)[0]
+
+
+def test_middleware_rejects_with_429_and_retry_after(clock):
+    rules = {("POST", "/api/contact"): parse_rule("1/60")}
+    middleware = RateLimitMiddleware(ok_app, rules=rules, store=TokenBuckets(clock=clock))
+    assert asyncio.run(call(middleware, http_scope()))[0]["status"] == 200
+    start, body = asyncio.run(call(middleware, http_scope()))
+    assert start["status"] == 429
+    assert dict(start["headers"])[b"retry-after"] == b"60"
+    assert body["body"] == b'{"detail":"Too many requests"}'
+    # Other clients and unlisted routes are unaffected
+    assert asyncio.run(call(middleware, http_scope(client=("10.0.0.2", 1))))[0]["status"] == 200
+    assert asyncio.run(call(middleware, http_scope(path="/api/portfolio")))[0]["status"] == 200
+    clock.now += 60
+    assert asyncio.run(call(middleware, http_scope()))[0]["status"] == 200
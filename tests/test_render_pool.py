@@ -0,0 +1,71 @@
+"""Render pool: single-flight coalescing and recovery from a dead worker"""
+import asyncio
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from render_pool import RenderPool, RenderPoolSaturated
+
+
+def crash_once(marker):
+    # The first render dies like an OOM-killed worker; the retry succeeds
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return "rendered"
+
+
+def always_crash():
+    os._exit(1)
+
+
+def square(value):
+    return value * value
+
+
+def test_dead_worker_is_replaced_and_the_render_retried(tmp_path):
+    pool = RenderPool()
+
+    async def scenario():
+        first = await pool.run("resume", crash_once, str(tmp_path / "crashed"))
+        # The replacement pool keeps serving later renders
+        second = await pool.run("other", square, 7)
+        return first, second
+
+    try:
+        assert asyncio.run(scenario()) == ("rendered", 49)
+    finally:
+        pool.shutdown()
+
+
+def test_render_that_keeps_killing_workers_fails_once_retried():
+    pool = RenderPool()
+
+    async def scenario():
+        with pytest.raises(BrokenProcessPool):
+            await pool.run("resume", always_crash)
+        assert pool.pending == 0
+        return await pool.run("resume", square, 3)
+
+    try:
+        assert asyncio.run(scenario()) == 9
+    finally:
+        pool.shutdown()
+
+
+def test_identical_renders_share_one_and_the_queue_is_bounded():
+    pool = RenderPool(max_pending=1)
+
+    async def scenario():
+        first = pool.run("same", square, 4)
+        second = pool.run("same", square, 4)
+        results = await asyncio.gather(first, second, pool.run("different", square, 5), return_exceptions=True)
+        return results
+
+    try:
+        first, second, third = asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+    assert (first, second) == (16, 16)
+    assert isinstance(third, RenderPoolSaturated)
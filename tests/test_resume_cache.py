@@ -0,0 +1,83 @@
+"""Content-hash keys, ETags and the two-level artifact cache for rendered resumes"""
+import asyncio
+
+import pytest
+
+from resume_cache import ArtifactCache, content_key, etag_for, etag_matches, resume_format_key, variant_key
+from resume_models import load_resume
+
+
+def test_content_key_separates_its_parts():
+    assert content_key("ab", "c") != content_key("a", "bc")
+    assert content_key("a", b"b") == content_key(b"a", "b")
+    assert variant_key("k", "gzip") != variant_key("k", "br")
+
+
+def test_format_keys_follow_the_resume_content():
+    resume = load_resume()
+    changed = resume.model_copy(update={"headline": resume.headline + " (updated)"})
+    for fmt in ("html", "json"):
+        assert resume_format_key(resume, fmt) == resume_format_key(load_resume(), fmt)
+        assert resume_format_key(resume, fmt) != resume_format_key(changed, fmt)
+    assert resume_format_key(resume, "html") != resume_format_key(resume, "json")
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    ("*", True),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"other", "abc"', True),
+    ('"other"', False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, '"abc"') is expected
+
+
+def test_etag_is_known_before_rendering():
+    key = content_key("resume-html", "{}")
+    assert etag_for(key) == f'"{key[:32]}"'
+
+
+def test_renders_once_and_is_shared_between_processes(tmp_path):
+    renders = []
+
+    async def render():
+        renders.append(1)
+        return b"<html>resume</html>"
+
+    first = ArtifactCache(tmp_path)
+    # A second process reads what the first one published instead of rendering again
+    second = ArtifactCache(tmp_path)
+    key = content_key("resume-html", "v1")
+
+    async def scenario():
+        one = await first.get(key, render, "text/html", ".html")
+        again = await first.get(key, render, "text/html", ".html")
+        other = await second.get(key, render, "text/html", ".html")
+        return one, again, other
+
+    one, again, other = asyncio.run(scenario())
+    assert len(renders) == 1
+    assert one is again
+    assert other.body == one.body and other.etag == one.etag
+    assert (tmp_path / f"{key}.html").read_bytes() == b"<html>resume</html>"
+
+
+def test_new_content_is_a_new_key_and_a_new_render(tmp_path):
+    cache = ArtifactCache(tmp_path)
+    bodies = iter([b"v1", b"v2"])
+
+    async def render():
+        return next(bodies)
+
+    async def scenario():
+        old = await cache.get(content_key("resume-json", "v1"), render, "application/json")
+        new = await cache.get(content_key("resume-json", "v2"), render, "application/json")
+        return old, new
+
+    old, new = asyncio.run(scenario())
+    assert (old.body, new.body) == (b"v1", b"v2")
+    assert old.etag != new.etag
+    assert cache.lookup(content_key("resume-json", "v1"), "application/json").body == b"v1"
@@ -0,0 +1,59 @@
+"""GET /api/download-resume: content-keyed ETags, 304 revalidation and download tracking"""
+import asyncio
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+BROWSER = "Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0"
+
+
+@pytest.fixture
+def downloads(server, monkeypatch):
+    enqueued = []
+
+    async def enqueue(collection, document):
+        enqueued.append((collection, document))
+        return True
+
+    monkeypatch.setattr(server.event_buffer, "enqueue", enqueue)
+    return enqueued
+
+
+def download(server, headers=None, **params):
+    async def request():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(
+                "/api/download-resume", params=params, headers={"User-Agent": BROWSER, **(headers or {})}
+            )
+
+    return asyncio.run(request())
+
+
+def test_revalidation_is_a_304_and_not_a_download(server, downloads):
+    response = download(server, format="json", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert response.json()["basics"]
+    assert response.headers["content-length"] == str(len(response.content))
+
+    revalidated = download(server, format="json", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+    assert [(collection, document["download_type"]) for collection, document in downloads] == [
+        ("resume_downloads", "json"),
+    ]
+
+
+def test_etag_changes_with_format_and_encoding(server, downloads):
+    plain = download(server, format="json", headers={"Accept-Encoding": "identity"})
+    gzipped = download(server, format="json", headers={"Accept-Encoding": "gzip"})
+    html = download(server, format="html", headers={"Accept-Encoding": "identity"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.json() == plain.json()
+    assert len({plain.headers["etag"], gzipped.headers["etag"], html.headers["etag"]}) == 3
+    # A stale or foreign ETag gets the full body
+    stale = download(server, format="json", headers={"Accept-Encoding": "identity", "If-None-Match": html.headers["etag"]})
+    assert stale.status_code == 200
+    assert len(downloads) == 4
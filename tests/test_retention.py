@@ -0,0 +1,69 @@
+"""Parquet archive of old events: archive, read back and merge with hot data"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pyarrow")
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from retention import EventArchive, load_events, partition_dir, retention_cutoff  # noqa: E402
+
+NOW = datetime(2024, 6, 10, 12, 0, 0)
+
+
+@pytest.fixture
+def db():
+    return mongomock_motor.AsyncMongoMockClient()[f"retention_{uuid.uuid4().hex}"]
+
+
+def view(when, page="portfolio"):
+    return {"id": str(uuid.uuid4()), "ip_address": "203.0.113.7", "is_bot": False, "visited_at": when, "page_viewed": page}
+
+
+def test_retention_cutoff_is_a_day_boundary():
+    assert retention_cutoff(7, now=NOW) == datetime(2024, 6, 3)
+
+
+def test_archive_moves_old_events_into_day_partitions(db, tmp_path):
+    archive = EventArchive(tmp_path)
+    old = [view(NOW - timedelta(days=9, hours=hours)) for hours in range(3)] + [view(NOW - timedelta(days=8))]
+    recent = [view(NOW)]
+
+    async def scenario():
+        await db.portfolio_views.insert_many([dict(document) for document in old + recent])
+        moved = await archive.archive(db, "portfolio_views", retention_cutoff(7, now=NOW), batch_size=2)
+        return moved, await db.portfolio_views.find({}, {"_id": 0, "id": 1}).to_list(None)
+
+    moved, hot = asyncio.run(scenario())
+    assert moved == 4
+    assert hot == [{"id": recent[0]["id"]}]
+    assert archive.days("portfolio_views") == [datetime(2024, 6, 1), datetime(2024, 6, 2)]
+    assert len(list(partition_dir(tmp_path, "portfolio_views", datetime(2024, 6, 1)).glob("*.parquet"))) == 2
+    frame = archive.read("portfolio_views")
+    assert sorted(frame["id"]) == sorted(document["id"] for document in old)
+    assert list(archive.read("portfolio_views", datetime(2024, 6, 2), datetime(2024, 6, 3))["id"]) == [old[3]["id"]]
+    assert archive.archived_until("portfolio_views", datetime(2024, 6, 2, 6)) == datetime(2024, 6, 3)
+    assert archive.archived_until("portfolio_views", datetime(2024, 6, 3)) is None
+    assert archive.read("resume_downloads").empty
+
+
+def test_load_events_merges_hot_and_cold_without_duplicates(db, tmp_path):
+    archive = EventArchive(tmp_path)
+    old = [view(NOW - timedelta(days=9)), view(NOW - timedelta(days=8))]
+    recent = [view(NOW, page="resume")]
+
+    async def scenario():
+        await db.portfolio_views.insert_many([dict(document) for document in old + recent])
+        await archive.archive(db, "portfolio_views", retention_cutoff(7, now=NOW))
+        # An interrupted run: archived, but not yet deleted from Mongo
+        await db.portfolio_views.insert_one(dict(old[1]))
+        everything = await load_events(db, archive, "portfolio_views")
+        window = await load_events(db, archive, "portfolio_views", NOW - timedelta(days=8, hours=1), NOW)
+        return everything, window
+
+    everything, window = asyncio.run(scenario())
+    assert list(everything["id"]) == [document["id"] for document in old + recent]
+    assert list(everything["page_viewed"]) == ["portfolio", "portfolio", "resume"]
+    assert list(window["id"]) == [old[1]["id"]]
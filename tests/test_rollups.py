@@ -0,0 +1,152 @@
+"""Analytics rollups: $inc upserts, retraction and the backfill rebuild, against mongomock"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from rollups import AnalyticsRollups, BackfillConflict, rollup_id, rollup_updates  # noqa: E402
+
+NOW = datetime(2024, 6, 5, 12, 0, 0)
+
+
+@pytest.fixture
+def db():
+    return mongomock_motor.AsyncMongoMockClient()[f"rollups_{uuid.uuid4().hex}"]
+
+
+def view(when, page="portfolio", is_bot=False, country=None):
+    return {
+        "id": str(uuid.uuid4()),
+        "ip_address": "203.0.113.7",
+        "user_agent": "Mozilla/5.0",
+        "is_bot": is_bot,
+        "browser_family": "firefox",
+        "country": country,
+        "asn": None,
+        "visited_at": when,
+        "page_viewed": page,
+    }
+
+
+def test_updates_coalesce_one_inc_per_rollup_document():
+    views = [view(NOW), view(NOW + timedelta(minutes=1), is_bot=True, country="DE"), view(NOW + timedelta(hours=1))]
+    updates = {update._filter["_id"]: update._doc for update in rollup_updates("portfolio_views", views)}
+    hour = rollup_id("views", "hour", datetime(2024, 6, 5, 12))
+    assert set(updates) == {
+        rollup_id("views", "total"), hour, rollup_id("views", "hour", datetime(2024, 6, 5, 13)),
+        rollup_id("views", "day", datetime(2024, 6, 5)),
+    }
+    assert updates[hour]["$inc"] == {
+        "count": 2, "breakdown.portfolio": 2, "countries.DE": 1, "bots": 1, "bots_breakdown.portfolio": 1,
+        "bots_countries.DE": 1,
+    }
+    assert updates[hour]["$setOnInsert"] == {"metric": "views", "granularity": "hour", "bucket": datetime(2024, 6, 5, 12)}
+    retracted = rollup_updates("portfolio_views", views[:1], sign=-1)[0]._doc["$inc"]
+    assert retracted == {"count": -1, "breakdown.portfolio": -1}
+
+
+def test_record_and_retract(db):
+    views = [view(NOW, page="a.b"), view(NOW, is_bot=True), view(NOW + timedelta(days=1))]
+
+    async def scenario():
+        rollups = AnalyticsRollups(db)
+        await rollups.record("portfolio_views", views)
+        await rollups.record("unknown_collection", views)
+        recorded = await rollups.totals(), await rollups.totals(include_bots=False)
+        await rollups.retract("portfolio_views", views[:1])
+        series = await rollups.series("day", NOW, NOW + timedelta(days=2), include_bots=False)
+        return recorded, await rollups.totals(), series
+
+    (everything, humans), after, series = asyncio.run(scenario())
+    assert (everything["views"], humans["views"]) == (3, 2)
+    assert after["views"] == 2
+    assert [(row["views"], row.get("views_breakdown")) for row in series] == [(0, None), (1, {"portfolio": 1})]
+
+
+def test_totals_fall_back_to_collection_counts_before_a_backfill(db):
+    async def scenario():
+        await db.resume_downloads.insert_many([{"downloaded_at": NOW}, {"downloaded_at": NOW}])
+        return await AnalyticsRollups(db).totals()
+
+    assert asyncio.run(scenario()) == {"views": 0, "downloads": 2, "contacts": 0}
+
+
+def test_backfill_swaps_in_a_rebuilt_collection(db):
+    async def scenario():
+        rollups = AnalyticsRollups(db)
+        # Drifted live counters are replaced wholesale by the rebuild
+        await rollups.record("portfolio_views", [view(NOW)] * 5)
+        await db.portfolio_views.insert_many([view(NOW), view(NOW, page="resume")])
+        await db.contact_messages.insert_one({"created_at": NOW})
+        await rollups.backfill(batch_size=1, clock=lambda: NOW + timedelta(hours=1))
+        names = await db.list_collection_names()
+        return await rollups.totals(), await rollups.series("hour", NOW, NOW + timedelta(hours=1)), names
+
+    totals, series, names = asyncio.run(scenario())
+    assert totals == {"views": 2, "downloads": 0, "contacts": 1}
+    assert series[0]["views_breakdown"] == {"portfolio": 1, "resume": 1}
+    assert "analytics_rollups_rebuild" not in names
+
+
+def test_backfill_refuses_while_events_are_arriving(db):
+    async def scenario():
+        rollups = AnalyticsRollups(db)
+        await rollups.record("portfolio_views", [view(NOW)])
+        await db.portfolio_views.insert_one(view(NOW))
+        with pytest.raises(BackfillConflict):
+            await rollups.backfill(clock=lambda: NOW + timedelta(seconds=30))
+        return await rollups.totals()
+
+    # The live rollups are left alone
+    assert asyncio.run(scenario())["views"] == 1
+
+
+def test_backfill_is_discarded_when_events_arrive_during_it(db):
+    async def scenario():
+        rollups = AnalyticsRollups(db)
+        await db.portfolio_views.insert_one(view(NOW - timedelta(hours=1)))
+        original = rollups._recent_event_source
+        checks = []
+
+        async def recent(since):
+            checks.append(since)
+            if len(checks) == 2:
+                # The check before the swap: an event arrived during the rebuild
+                await db.portfolio_views.insert_one(view(NOW))
+            return await original(since)
+
+        rollups._recent_event_source = recent
+        with pytest.raises(BackfillConflict):
+            await rollups.backfill(clock=lambda: NOW)
+        return await db.list_collection_names()
+
+    names = asyncio.run(scenario())
+    assert "analytics_rollups" not in names and "analytics_rollups_rebuild" not in names
+
+
+def test_backfill_counts_archived_events_once(db, tmp_path):
+    pytest.importorskip("pyarrow")
+    from retention import EventArchive
+
+    archive = EventArchive(tmp_path)
+    old = [view(NOW - timedelta(days=4)), view(NOW - timedelta(days=4), is_bot=True), view(NOW - timedelta(days=3))]
+    recent = [view(NOW), view(NOW, page="resume")]
+
+    async def scenario():
+        await db.portfolio_views.insert_many([dict(document) for document in old + recent])
+        await archive.archive(db, "portfolio_views", NOW - timedelta(days=1))
+        # An interrupted archive run left this one in both places
+        await db.portfolio_views.insert_one(dict(old[0]))
+        rollups = AnalyticsRollups(db)
+        await rollups.backfill(quiet_period=None, archive=archive)
+        totals = await rollups.totals(include_bots=False)
+        series = await rollups.series("day", NOW - timedelta(days=5), NOW + timedelta(days=1))
+        return await db.portfolio_views.count_documents({}), totals, series
+
+    hot, totals, series = asyncio.run(scenario())
+    assert hot == 3
+    assert totals["views"] == 4
+    assert [(row["bucket"].day, row["views"]) for row in series] == [(1, 2), (2, 1), (5, 2)]
@@ -0,0 +1,263 @@
+"""Write-ahead spool, its replayer and the Mongo circuit breaker, without Mongo
+
+Segments live in a temporary directory, Mongo is an in-memory fake
+collection and the breaker runs on an injected clock.
+"""
+import asyncio
+import os
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from tests.conftest import dead_pid
+
+pytest.importorskip("pymongo")
+
+from circuit_breaker import CircuitBreaker, CircuitOpen  # noqa: E402
+from ingest import EventBuffer  # noqa: E402
+from spool import CLAIM_SUFFIX, OPEN_SUFFIX, SEALED_SUFFIX, Spool, SpoolReplayer, decode_records, encode_record  # noqa: E402
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+
+
+class FakeCollection:
+    """Just enough of a motor collection for upserts keyed on id"""
+
+    def __init__(self, fail=False):
+        self.documents = {}
+        self.fail = fail
+
+    async def bulk_write(self, requests, ordered=True):
+        if self.fail:
+            raise ConnectionError("mongo is down")
+        upserted = {}
+        for index, request in enumerate(requests):
+            key = request._filter["id"]
+            if key not in self.documents:
+                self.documents[key] = dict(request._doc["$setOnInsert"])
+                upserted[index] = key
+        return SimpleNamespace(upserted_ids=upserted)
+
+
+def event(number):
+    return {"id": f"event-{number}", "page_viewed": "portfolio", "visited_at": NOW}
+
+
+def test_records_round_trip():
+    data = encode_record("portfolio_views", {**event(1), "_id": "dropped"}) + encode_record("contact_messages", event(2))
+    records, clean = decode_records(data)
+    assert clean
+    assert records == [("portfolio_views", event(1)), ("contact_messages", event(2))]
+
+
+def test_torn_tail_keeps_complete_records():
+    data = b"".join(encode_record("portfolio_views", event(n)) for n in range(3))
+    records, clean = decode_records(data[:-5])
+    assert not clean
+    assert [document["id"] for _, document in records] == ["event-0", "event-1"]
+
+
+def test_corrupt_record_stops_decoding():
+    lines = [encode_record("portfolio_views", event(n)) for n in range(3)]
+    lines[1] = lines[1].replace(b"event-1", b"event-X")
+    records, clean = decode_records(b"".join(lines))
+    assert not clean
+    assert [document["id"] for _, document in records] == ["event-0"]
+
+
+def test_append_rotate_claim_release(tmp_path):
+    spool = Spool(tmp_path, fsync_interval=0)
+    spool.open()
+
+    async def scenario():
+        await spool.append("portfolio_views", [event(1), event(2)])
+        assert spool.pending_bytes > 0
+        spool.rotate()
+        await spool.append("portfolio_views", [event(3)])
+        await spool.close()
+
+    asyncio.run(scenario())
+    sealed = sorted(path.name for path in tmp_path.iterdir())
+    assert len(sealed) == 2 and all(name.endswith(SEALED_SUFFIX) for name in sealed)
+    claimed = spool.claim()
+    assert claimed.name.endswith(CLAIM_SUFFIX) and claimed.name.startswith(sealed[0])
+    assert decode_records(claimed.read_bytes())[0] == [("portfolio_views", event(1)), ("portfolio_views", event(2))]
+    spool.release(claimed)
+    assert sorted(path.name for path in tmp_path.iterdir()) == sealed
+
+
+def test_recover_hands_back_segments_of_dead_processes(tmp_path):
+    pid = dead_pid()
+    orphan_open = tmp_path / f"{1:020d}-{pid}{OPEN_SUFFIX}"
+    orphan_claim = tmp_path / f"{2:020d}-7{SEALED_SUFFIX}.{pid}{CLAIM_SUFFIX}"
+    ours = tmp_path / f"{3:020d}-9{SEALED_SUFFIX}.{os.getpid()}{CLAIM_SUFFIX}"
+    for path in (orphan_open, orphan_claim, ours):
+        path.write_bytes(encode_record("portfolio_views", event(1)))
+    Spool(tmp_path).recover()
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted([
+        f"{1:020d}-{pid}{SEALED_SUFFIX}", f"{2:020d}-7{SEALED_SUFFIX}", ours.name,
+    ])
+
+
+def spool_with(tmp_path, documents):
+    spool = Spool(tmp_path, fsync_interval=0)
+    spool.open()
+
+    async def write():
+        await spool.append("portfolio_views", documents)
+
+    asyncio.run(write())
+    return spool
+
+
+def test_replay_is_idempotent(tmp_path):
+    collection = FakeCollection()
+    hooked = []
+    spool = spool_with(tmp_path, [event(1), event(2)])
+    replayer = SpoolReplayer(spool, CircuitBreaker(), batch_size=1)
+    replayer.db = {"portfolio_views": collection}
+
+    async def hook(name, documents):
+        hooked.extend(document["id"] for document in documents)
+
+    replayer.add_flush_hook(hook)
+    assert asyncio.run(replayer.replay()) == 2
+    # The same events spooled again (a replay interrupted before the segment was deleted)
+    asyncio.run(spool.append("portfolio_views", [event(1), event(2), event(3)]))
+    assert asyncio.run(replayer.replay()) == 1
+    assert sorted(collection.documents) == ["event-1", "event-2", "event-3"]
+    # Rollups and other hooks see each event once
+    assert hooked == ["event-1", "event-2", "event-3"]
+    assert spool.segments() and all(path.name.endswith(OPEN_SUFFIX) for path in spool.segments())
+
+
+def test_failed_replay_releases_the_segment(tmp_path):
+    spool = spool_with(tmp_path, [event(1)])
+    replayer = SpoolReplayer(spool, CircuitBreaker())
+    replayer.db = {"portfolio_views": FakeCollection(fail=True)}
+    with pytest.raises(ConnectionError):
+        asyncio.run(replayer.replay())
+    sealed = [path for path in tmp_path.iterdir() if path.name.endswith(SEALED_SUFFIX)]
+    assert len(sealed) == 1
+    replayer.db = {"portfolio_views": FakeCollection()}
+    assert asyncio.run(replayer.replay()) == 1
+
+
+def test_replay_waits_for_an_open_breaker(tmp_path, clock):
+    spool = spool_with(tmp_path, [event(1)])
+    breaker = CircuitBreaker(failure_threshold=1, clock=clock)
+    breaker._record_failure()
+    replayer = SpoolReplayer(spool, breaker)
+    replayer.db = {"portfolio_views": FakeCollection()}
+    assert asyncio.run(replayer.replay()) == 0
+    assert spool.pending_bytes > 0
+
+
+async def failing_encoder(collection, documents):
+    # Interning user agents writes to Mongo, so the encoder fails with it
+    raise ConnectionError("mongo is down")
+
+
+def test_encoder_failures_trip_the_breaker_and_spool_the_batch(tmp_path, clock):
+    spool = Spool(tmp_path, fsync_interval=0)
+    spool.open()
+    breaker = CircuitBreaker(failure_threshold=2, clock=clock)
+    buffer = EventBuffer(breaker=breaker, spool=spool, encoder=failing_encoder)
+    buffer.db = {"portfolio_views": FakeCollection()}
+
+    async def scenario():
+        await buffer._flush([("portfolio_views", event(1)), ("portfolio_views", event(2))])
+        await buffer._flush([("portfolio_views", event(3))])
+        await spool.close()
+
+    asyncio.run(scenario())
+    assert buffer.stats["spooled"] == 3 and buffer.stats["failed"] == 0
+    assert breaker.state == breaker.OPEN
+    ids = [document["id"] for path in tmp_path.iterdir() for _, document in decode_records(path.read_bytes())[0]]
+    # Spooled as enqueued, not in their encoded form
+    assert sorted(ids) == ["event-1", "event-2", "event-3"]
+
+
+def test_replay_encoder_failures_count_against_the_breaker(tmp_path, clock):
+    spool = spool_with(tmp_path, [event(1)])
+    breaker = CircuitBreaker(failure_threshold=1, clock=clock)
+    replayer = SpoolReplayer(spool, breaker, encoder=failing_encoder)
+    replayer.db = {"portfolio_views": FakeCollection()}
+    with pytest.raises(ConnectionError):
+        asyncio.run(replayer.replay())
+    assert breaker.state == breaker.OPEN
+    assert [path for path in tmp_path.iterdir() if path.name.endswith(SEALED_SUFFIX)]
+
+
+async def succeed():
+    return "ok"
+
+
+async def fail():
+    raise ConnectionError("down")
+
+
+async def stall():
+    await asyncio.sleep(1)
+
+
+def test_breaker_transitions(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+
+    async def scenario():
+        assert await breaker.call(succeed) == "ok"
+        with pytest.raises(ConnectionError):
+            await breaker.call(fail)
+        assert breaker.state == breaker.CLOSED
+        with pytest.raises(ConnectionError):
+            await breaker.call(fail)
+        assert breaker.state == breaker.OPEN
+        # Open: fail fast without calling through
+        with pytest.raises(CircuitOpen):
+            await breaker.call(succeed)
+        clock.now += 10
+        assert breaker.state == breaker.HALF_OPEN
+        # A failed probe re-opens for another reset_timeout
+        with pytest.raises(ConnectionError):
+            await breaker.call(fail)
+        assert breaker.state == breaker.OPEN
+        clock.now += 10
+        assert await breaker.call(succeed) == "ok"
+        assert breaker.state == breaker.CLOSED and breaker.failures == 0
+
+    asyncio.run(scenario())
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5, clock=clock)
+    started = asyncio.Event()
+
+    async def slow_probe():
+        started.set()
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    async def scenario():
+        with pytest.raises(ConnectionError):
+            await breaker.call(fail)
+        clock.now += 5
+        probe = asyncio.create_task(breaker.call(slow_probe))
+        await started.wait()
+        with pytest.raises(CircuitOpen):
+            await breaker.call(succeed)
+        assert await probe == "ok"
+        assert breaker.state == breaker.CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_stalled_calls_count_as_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=1, call_timeout=0.01, clock=clock)
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await breaker.call(stall)
+
+    asyncio.run(scenario())
+    assert breaker.state == breaker.OPEN
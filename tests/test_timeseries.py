@@ -0,0 +1,150 @@
+"""Timeseries rows, the per-bucket cache and GET /api/analytics/timeseries
+
+mongomock cannot run the $unionWith/$dateTrunc pipeline, so the database is
+a fake that answers it with canned groups and records what was asked.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from timeseries import TimeseriesCache, bucket_range, query_timeseries, rows_from_groups
+
+DAY = datetime(2024, 6, 3)
+
+
+class FakeCursor:
+    def __init__(self, groups):
+        self.groups = groups
+
+    async def to_list(self, length=None):
+        return self.groups
+
+
+class FakeCollection:
+    def __init__(self, groups):
+        self.groups = groups
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        start, end = pipeline[0]["$match"]["visited_at"]["$gte"], pipeline[0]["$match"]["visited_at"]["$lt"]
+        return FakeCursor([group for group in self.groups if start <= group["_id"]["bucket"] < end])
+
+
+class FakeDatabase(dict):
+    def __init__(self, groups):
+        super().__init__(portfolio_views=FakeCollection(groups))
+
+    @property
+    def pipelines(self):
+        return self["portfolio_views"].pipelines
+
+
+def group(metric, bucket, count, dim=None):
+    return {"_id": {"metric": metric, "bucket": bucket, "dim": dim}, "count": count}
+
+
+GROUPS = [
+    group("views", DAY, 3, "portfolio"),
+    group("views", DAY, 1, None),
+    group("downloads", DAY + timedelta(days=1), 2, "pdf"),
+    group("contacts", DAY + timedelta(days=2), 1),
+]
+
+
+def test_rows_are_zero_filled_with_breakdowns():
+    rows = rows_from_groups(GROUPS, bucket_range(DAY, DAY + timedelta(days=3), "day"))
+    assert [row["bucket"] for row in rows] == [DAY, DAY + timedelta(days=1), DAY + timedelta(days=2)]
+    assert rows[0]["views"] == 4 and rows[0]["views_breakdown"] == {"portfolio": 3, "unknown": 1}
+    assert rows[1]["downloads"] == 2 and rows[1]["downloads_breakdown"] == {"pdf": 2} and rows[1]["views"] == 0
+    assert rows[2]["contacts"] == 1 and "contacts_breakdown" not in rows[2]
+
+
+def test_bucket_range_starts_weeks_on_monday():
+    assert bucket_range(datetime(2024, 6, 5, 13), datetime(2024, 6, 12), "week") == [DAY, DAY + timedelta(weeks=1)]
+
+
+def test_cached_buckets_are_not_aggregated_again(clock):
+    db = FakeDatabase(GROUPS)
+    cache = TimeseriesCache(ttl=30, clock=clock)
+    end = DAY + timedelta(days=3)
+
+    async def scenario():
+        first = await query_timeseries(db, "day", DAY, end, cache=cache)
+        second = await query_timeseries(db, "day", DAY, end, cache=cache)
+        # A new view on the middle day invalidates only that bucket
+        await cache.invalidate("portfolio_views", [{"visited_at": DAY + timedelta(days=1, hours=5)}])
+        third = await query_timeseries(db, "day", DAY, end, cache=cache)
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+    assert first == second == third
+    assert len(db.pipelines) == 2
+    match = db.pipelines[1][0]["$match"]["visited_at"]
+    assert (match["$gte"], match["$lt"]) == (DAY + timedelta(days=1), DAY + timedelta(days=2))
+
+
+def test_cache_entries_expire_and_are_kept_per_bot_filter(clock):
+    cache = TimeseriesCache(ttl=30, max_entries=2, clock=clock)
+    cache.put("day", DAY, {"views": 4})
+    cache.put("day", DAY, {"views": 3}, include_bots=False)
+    assert cache.get("day", DAY) == {"views": 4}
+    assert cache.get("day", DAY, include_bots=False) == {"views": 3}
+    clock.now = 31
+    assert cache.get("day", DAY) is None
+
+
+httpx = pytest.importorskip("httpx")
+
+
+@pytest.fixture
+def api(server, tmp_path, monkeypatch):
+    from retention import EventArchive
+
+    db = FakeDatabase(GROUPS)
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "event_archive", EventArchive(tmp_path))
+    monkeypatch.setattr(server, "timeseries_cache", TimeseriesCache())
+
+    def get(**params):
+        async def request():
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.get("/api/analytics/timeseries", params=params)
+
+        return asyncio.run(request())
+
+    get.db, get.archive_root = db, tmp_path
+    return get
+
+
+def archive_day(root, collection, day):
+    directory = root / collection / f"date={day:%Y-%m-%d}"
+    directory.mkdir(parents=True)
+    (directory / "part-a-b.parquet").touch()
+
+
+def test_old_ranges_are_served_from_raw_events_until_archived(api):
+    response = api(start="2024-06-03T00:00:00", end="2024-06-06T00:00:00")
+    assert response.status_code == 200
+    assert [row["views"] for row in response.json()["series"]] == [4, 0, 0]
+    assert len(api.db.pipelines) == 1
+
+
+def test_archived_range_is_a_400(api):
+    archive_day(api.archive_root, "resume_downloads", DAY + timedelta(days=1))
+    response = api(start="2024-06-03T00:00:00", end="2024-06-06T00:00:00")
+    assert response.status_code == 400
+    assert "before 2024-06-05" in response.json()["detail"]
+    # Ranges after the archive are still served
+    assert api(start="2024-06-05T00:00:00", end="2024-06-06T00:00:00").status_code == 200
+
+
+def test_default_range_starts_after_the_archive(api):
+    archive_day(api.archive_root, "portfolio_views", DAY)
+    response = api(end="2024-06-06T12:00:00", granularity="day")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["start"] == "2024-06-04T00:00:00"
+    assert [row["downloads"] for row in body["series"]] == [2, 0, 0]
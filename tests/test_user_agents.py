@@ -0,0 +1,83 @@
+"""User-agent classification: bot detection and browser family priority"""
+
+import pytest
+
+from user_agents import UserAgentClassifier
+
+CHROME = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+EDGE = CHROME + " Edg/120.0.2210.91"
+OPERA = CHROME + " OPR/106.0.0.0"
+SAMSUNG = (
+    "Mozilla/5.0 (Linux; Android 13; SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "SamsungBrowser/23.0 Chrome/115.0.0.0 Mobile Safari/537.36"
+)
+SAFARI = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_2) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+    "Version/17.2 Safari/605.1.15"
+)
+CHROME_IOS = (
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+    "CriOS/120.0.6099.119 Mobile/15E148 Safari/604.1"
+)
+FIREFOX = "Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0"
+IE = "Mozilla/5.0 (Windows NT 10.0; WOW64; Trident/7.0; rv:11.0) like Gecko"
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return UserAgentClassifier(max_entries=100)
+
+
+@pytest.mark.parametrize("user_agent, family", [
+    (CHROME, "chrome"),
+    (EDGE, "edge"),
+    (OPERA, "opera"),
+    (SAMSUNG, "samsung"),
+    (SAFARI, "safari"),
+    (CHROME_IOS, "chrome"),
+    (FIREFOX, "firefox"),
+    (IE, "ie"),
+    ("SomeCustomClient/1.0", "other"),
+])
+def test_browsers_are_human_with_the_most_specific_family(classifier, user_agent, family):
+    assert classifier.classify(user_agent) == (False, family)
+
+
+@pytest.mark.parametrize("user_agent", [
+    "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)",
+    "Mozilla/5.0 (compatible; bingbot/2.0; +http://www.bing.com/bingbot.htm)",
+    "Mozilla/5.0 (compatible; Yahoo! Slurp; http://help.yahoo.com/help/us/ysearch/slurp)",
+    "facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)",
+    "Mozilla/5.0 (compatible; AhrefsBot/7.0; +http://ahrefs.com/robot/)",
+    "curl/8.4.0",
+    "python-requests/2.31.0",
+    "Go-http-client/1.1",
+    "PostmanRuntime/7.36.0",
+])
+def test_crawlers_and_scripted_clients_are_bots(classifier, user_agent):
+    assert classifier.classify(user_agent).is_bot
+
+
+@pytest.mark.parametrize("user_agent", [
+    CHROME.replace("Chrome/", "HeadlessChrome/"),
+    "Mozilla/5.0 (Unknown; Linux x86_64) AppleWebKit/538.1 (KHTML, like Gecko) PhantomJS/2.1.1 Safari/538.1",
+    CHROME + " Chrome-Lighthouse",
+])
+def test_headless_browsers_are_bots_with_their_engine_family(classifier, user_agent):
+    info = classifier.classify(user_agent)
+    assert info.is_bot
+    assert info.browser_family in ("chrome", "safari")
+
+
+@pytest.mark.parametrize("user_agent", [None, ""])
+def test_missing_user_agent_counts_as_a_bot(classifier, user_agent):
+    # Real browsers always send one, so these are excluded from human analytics
+    assert classifier.classify(user_agent) == (True, None)
+
+
+def test_matching_is_case_insensitive_and_memoized():
+    classifier = UserAgentClassifier(max_entries=10)
+    assert classifier.classify("GOOGLEBOT/2.1").is_bot
+    assert classifier.classify(FIREFOX.upper()).browser_family == "firefox"
+    classifier.classify(FIREFOX.upper())
+    assert classifier.classify.cache_info().hits == 1
@@ -0,0 +1,120 @@
+"""Unique-visitor sketches and the view dedup cache"""
+import asyncio
+import uuid
+from datetime import datetime
+
+import pytest
+
+from visitors import HyperLogLog, SharedTTLCache, TTLCache, UniqueVisitors
+
+
+def sketch_of(values, precision=12):
+    sketch = HyperLogLog(precision)
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+@pytest.mark.parametrize("cardinality", [10, 1000, 20000, 200000])
+def test_estimate_within_error_bound(cardinality):
+    estimate = sketch_of(f"visitor-{i}" for i in range(cardinality)).count()
+    # 1.04 / sqrt(4096) = 1.6% standard error; allow three of them
+    assert abs(estimate - cardinality) <= max(1, 0.05 * cardinality)
+
+
+def test_duplicates_do_not_count():
+    sketch = sketch_of(["a", "b", "a", "b", "a"])
+    assert sketch.count() == 2
+
+
+def test_merge_is_the_union():
+    left = sketch_of(f"visitor-{i}" for i in range(0, 6000))
+    right = sketch_of(f"visitor-{i}" for i in range(4000, 10000))
+    union = sketch_of(f"visitor-{i}" for i in range(10000))
+    left.merge(right)
+    assert left.to_bytes() == union.to_bytes()
+    assert HyperLogLog(12, left.to_bytes()).count() == union.count()
+
+
+def test_incompatible_sketches_are_rejected():
+    with pytest.raises(ValueError):
+        HyperLogLog(12).merge(HyperLogLog(10))
+    with pytest.raises(ValueError):
+        HyperLogLog(12, b"\0" * 100)
+
+
+def test_dedup_entries_expire(clock):
+    cache = TTLCache(ttl=30, clock=clock)
+    assert not cache.seen("a")
+    clock.now = 29
+    assert cache.seen("a")
+    clock.now = 30
+    assert not cache.seen("a")
+    assert len(cache) == 1
+
+
+def test_dedup_evicts_oldest_when_full(clock):
+    cache = TTLCache(ttl=30, max_entries=2, clock=clock)
+    for key in ("a", "b", "c"):
+        assert not cache.seen(key)
+    assert len(cache) == 2
+    assert cache.seen("c") and cache.seen("b")
+    assert not cache.seen("a")
+
+
+def test_shared_dedup_is_seen_by_every_worker(tmp_path, clock):
+    # Two processes mapping the same table behave like two instances over one file
+    first = SharedTTLCache(tmp_path / "dedup", ttl=30, slots=64, clock=clock)
+    second = SharedTTLCache(tmp_path / "dedup", ttl=30, slots=64, clock=clock)
+    assert not first.seen("a")
+    assert second.seen("a")
+    clock.now = 30
+    assert not second.seen("a")
+    assert first.seen("a")
+    assert len(first) == 1
+
+
+def test_shared_dedup_evicts_the_entry_expiring_soonest(tmp_path, clock):
+    cache = SharedTTLCache(tmp_path / "dedup", ttl=30, slots=2, ways=2, clock=clock)
+    for now, key in enumerate(("a", "b", "c")):
+        clock.now = now
+        assert not cache.seen(key)
+    assert cache.seen("b") and cache.seen("c")
+    assert not cache.seen("a")
+
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def test_compact_merges_past_days_per_process():
+    db = mongomock_motor.AsyncMongoMockClient()[f"visitors_{uuid.uuid4().hex}"]
+    workers = []
+    for number in range(3):
+        visitors = UniqueVisitors()
+        visitors.db = db
+        visitors.worker_id = f"host:{number}"
+        workers.append(visitors)
+
+    async def scenario():
+        # Each worker sees an overlapping slice of the visitors of two past days
+        for number, visitors in enumerate(workers):
+            for i in range(number * 100, number * 100 + 300):
+                visitors.add(f"10.0.{i // 256}.{i % 256}", "ua", when=datetime(2024, 6, 1))
+                visitors.add(f"10.1.{i // 256}.{i % 256}", "ua", when=datetime(2024, 6, 2))
+            await visitors.persist()
+        before = await workers[0].estimate(["2024-06-01", "2024-06-02"])
+        removed = await workers[0].compact(before="2024-06-02")
+        # A late write for the compacted day folds into the merged document on the next run
+        workers[1].add("192.0.2.1", "ua", when=datetime(2024, 6, 1))
+        await workers[1].persist()
+        removed += await workers[2].compact(before="2024-06-03")
+        after = await workers[0].estimate(["2024-06-01", "2024-06-02"])
+        ids = sorted([doc["_id"] async for doc in db.visitor_sketches.find({}, {"_id": 1})])
+        return before, removed, after, ids
+
+    before, removed, after, ids = asyncio.run(scenario())
+    assert ids == ["2024-06-01|merged", "2024-06-02|merged"]
+    assert removed == 7
+    assert after["2024-06-02"] == before["2024-06-02"]
+    assert after["2024-06-01"] in (before["2024-06-01"], before["2024-06-01"] + 1)
+    assert abs(before["2024-06-01"] - 500) <= 25